@@ -1,3 +1,4 @@
+import numpy as np
 import scipy.stats as stats
 from constants import *
 
@@ -48,18 +49,140 @@ def app_type_pop():
     # return result
     return [(i, app_info[i]['popularity']) for i in list(app_info.keys())]
 
-def arrival_bits(app_type, dist = 'deterministic'):
+def size_parameters(app_type):
     min_bits = app_info[app_type]['min_bits']
     max_bits = app_info[app_type]['max_bits']
     mu = (min_bits+max_bits)/2
     sigma = (max_bits-min_bits)/4
-    if dist=='normal':
-        return int(stats.truncnorm.rvs((min_bits-mu)/sigma, (max_bits-mu)/sigma, loc=mu, scale=sigma))
+    return min_bits, max_bits, mu, sigma
+
+# task 크기 분포. (min_bits, max_bits, mu, sigma, size, rng) -> size개의 bit 수
+# rng (np.random.RandomState)가 None이면 np.random에서 뽑음
+# normal은 [min_bits, max_bits]로 자른 정규분포, lognormal은 평균 mu, 표준편차 sigma,
+# pareto는 최소 min_bits, 평균 mu (꼬리가 길어서 max_bits를 넘을 수 있음)
+def _truncated_normal(min_bits, max_bits, mu, sigma, size, rng=None):
+    return stats.truncnorm.rvs((min_bits-mu)/sigma, (max_bits-mu)/sigma, loc=mu, scale=sigma, size=size,
+                               random_state=rng)
+
+def _lognormal(min_bits, max_bits, mu, sigma, size, rng=None):
+    s2 = np.log(1+(sigma/mu)**2)
+    return (np.random if rng is None else rng).lognormal(np.log(mu)-s2/2, np.sqrt(s2), size)
+
+def _pareto(min_bits, max_bits, mu, sigma, size, rng=None):
+    shape = mu/(mu-min_bits)
+    # np.random.pareto는 Lomax(0부터 시작)라서 1을 더하고 min_bits를 곱함
+    return min_bits*(1+(np.random if rng is None else rng).pareto(shape, size))
+
+size_distributions = {
+    'normal': _truncated_normal,
+    'lognormal': _lognormal,
+    'pareto': _pareto,
+}
+
+# app type 하나의 task 크기를 pool_size개씩 한 번에 뽑아 두고 하나씩 꺼내 줌.
+# scipy의 truncnorm.rvs를 한 번 부르는 비용이 수백 us라서 task마다 부르지 않음.
+class SizeSampler:
+    def __init__(self, app_type, dist='normal', pool_size=4096, rng=None):
+        self.parameters = size_parameters(app_type)
+        self.distribution = size_distributions[dist]
+        self.pool_size = pool_size
+        self.rng = rng
+        self.pool = np.zeros(0, dtype=np.int64)
+        self.next_index = 0
+
+    def _refill(self, needed):
+        rest = self.pool[self.next_index:]
+        new = self.distribution(*self.parameters, max(self.pool_size, needed-len(rest)), self.rng)
+        self.pool = np.concatenate([rest, new.astype(np.int64)])
+        self.next_index = 0
+
+    def draw(self, n=None):
+        count = 1 if n is None else n
+        if self.next_index+count > len(self.pool):
+            self._refill(count)
+        result = self.pool[self.next_index:self.next_index+count]
+        self.next_index += count
+        return int(result[0]) if n is None else result
+
+    # counts[i]개씩 뽑은 크기의 합들 (task counts[i]개가 한꺼번에 도착했을 때 총 bit 수)
+    def draw_sums(self, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        totals = np.concatenate([[0], np.cumsum(self.draw(int(counts.sum())))])
+        ends = np.cumsum(counts)
+        return totals[ends]-totals[ends-counts]
+
+# (app_type, dist) -> SizeSampler. np.random에서 뽑는 sampler들.
+# pool이 process 안에 남아 있으므로 np.random.seed를 다시 줘도 이미 뽑아 둔 크기가 먼저 나옴.
+# env (MEC_v1, Environment_sosam, BatchedMEC_v1)는 이걸 쓰지 않고 자기 cache를 가짐
+samplers = {}
+
+# cache가 None이면 module의 samplers를 같이 씀.
+def size_sampler(app_type, dist, rng=None, cache=None):
+    if cache is None:
+        cache = samplers
+    sampler = cache.get((app_type, dist))
+    if sampler is None:
+        sampler = cache[(app_type, dist)] = SizeSampler(app_type, dist, rng=rng)
+    return sampler
+
+# 모든 sampler의 pool과 위치. np.random 상태와 같이 저장해 두면 (MEC_v1.snapshot(include_rng=True)) 같은 크기가 다시 나옴
+def sampler_states(cache=None):
+    cache = samplers if cache is None else cache
+    return {key: (sampler.pool, sampler.next_index) for key, sampler in cache.items()}
+
+def set_sampler_states(states, cache=None):
+    cache = samplers if cache is None else cache
+    for key, sampler in cache.items():
+        sampler.pool, sampler.next_index = states.get(key, (np.zeros(0, dtype=np.int64), 0))
+
+# cache의 sampler pool을 모두 비움. 다음 크기부터 np.random (sampler에 rng를 줬으면 그 rng)에서 새로 뽑음
+def reset_samplers(cache=None):
+    set_sampler_states({}, cache)
+
+def arrival_bits(app_type, dist = 'deterministic'):
+    min_bits, max_bits, mu, sigma = size_parameters(app_type)
+    if dist in size_distributions:
+        return size_sampler(app_type, dist).draw()
     elif dist=='deterministic':
         return mu
     else:
         return 1
 
+# ServerNode.random_task_generation이 쓰는 node별 table.
+# app_types 중 app_info 순서대로 (app type, popularity, task 크기)를 미리 정리해 두고
+# 모든 app의 poisson 개수를 np.random.poisson 한 번으로 뽑음.
+# block step 분량을 미리 뽑아 두고 한 step씩 꺼내 줌. block=1이면 예전처럼 step마다
+# app_info 순서대로 뽑으므로 np.random에서 나오는 값이 그대로임.
+# block>1이면 분포는 같지만, 다른 node나 agent가 중간에 np.random을 쓰면 뽑히는 순서가 달라짐.
+# dist가 'deterministic'이 아니면 task마다 크기를 SizeSampler에서 뽑아서 더함.
+# rng를 주면 np.random 대신 rng에서 뽑음 (크기는 cache의 sampler에서)
+class ArrivalGenerator:
+    def __init__(self, app_types, block=1, dist='deterministic', rng=None, cache=None):
+        self.app_types = [app_type for app_type in app_info if app_type in app_types]
+        self.popularity = np.array([app_info[app_type]['popularity'] for app_type in self.app_types])
+        self.bits = [arrival_bits(app_type) for app_type in self.app_types]
+        self.samplers = [size_sampler(app_type, dist, rng, cache) for app_type in self.app_types] \
+            if dist in size_distributions else None
+        self.rng = rng
+        self.block = block
+        self.task_rate = None
+        self.counts = []
+        self.next_row = 0
+
+    # [(app type, 이번 step에 도착한 총 bit 수)], task_rate가 바뀌면 미리 뽑아 둔 것은 버림
+    def next(self, task_rate):
+        if task_rate != self.task_rate or self.next_row == len(self.counts):
+            self.task_rate = task_rate
+            random = np.random if self.rng is None else self.rng
+            self.counts = random.poisson(task_rate*self.popularity, size=(self.block, len(self.app_types))).tolist()
+            self.next_row = 0
+        counts = self.counts[self.next_row]
+        self.next_row += 1
+        if self.samplers is None:
+            return [(app_type, number*bits) for app_type, bits, number in zip(self.app_types, self.bits, counts)]
+        return [(app_type, int(sampler.draw(number).sum()))
+                for app_type, sampler, number in zip(self.app_types, self.samplers, counts)]
+
 def main():
     import numpy as np
     result =[]
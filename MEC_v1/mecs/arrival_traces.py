@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+미리 뽑아 둔 task 도착 trace.
+
+generate_traces가 (episode, step, client, app) 모양의 도착 bit 수를 .npy로 쓰고,
+같은 이름의 .json에 task_rate, app 순서, size_dist, seed를 남김.
+ArrivalTrace는 .npy를 np.load(mmap_mode='r')로 열기 때문에 여러 process가 같은 file을
+복사 없이 (OS page cache를 같이) 읽음. pickle할 때는 path만 넘기므로 rollout worker의
+make_env나 copy.deepcopy로 env를 넘겨도 다시 mmap으로 엶.
+MEC_v1.use_trace(trace)로 켜면 _step_generation이 poisson을 뽑는 대신 trace를 읽음.
+
+python arrival_traces.py traces.npy --episodes 100 --steps 1000 --task-rate 10 --apps 1 2 3 --seed 0
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from applications import app_info, arrival_bits, size_distributions, size_sampler
+
+
+def metadata_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def generate_traces(path, episodes, steps, task_rate, applications, clients=1, size_dist='deterministic', seed=None):
+    """
+    ServerNode.random_task_generation과 같은 분포로 episodes x steps x clients 만큼 도착을 뽑아 path(.npy)에 씀.
+    app 순서는 app_info 순서 (random_task_generation이 poisson을 뽑는 순서)이고,
+    client가 하나이고 size_dist='deterministic'이면 np.random.seed(seed) 후 MEC_v1을 steps씩 돌린 것과 같은 값이 나옴.
+    episode 하나씩 뽑아서 쓰므로 file이 RAM보다 커도 됨.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    app_types = [app_type for app_type in app_info if app_type in applications]
+    rates = task_rate*np.array([app_info[app_type]['popularity'] for app_type in app_types])
+    bits = np.array([arrival_bits(app_type) for app_type in app_types])
+    # module의 sampler pool에 남은 크기를 쓰지 않도록 sampler를 새로 만듦 (seed가 같으면 같은 file)
+    cache = dict()
+    samplers = [size_sampler(app_type, size_dist, cache=cache) for app_type in app_types] \
+        if size_dist in size_distributions else None
+
+    sizes = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                      shape=(episodes, steps, clients, len(app_types)))
+    for episode in range(episodes):
+        for client in range(clients):
+            counts = np.random.poisson(rates, size=(steps, len(app_types)))
+            if samplers is None:
+                sizes[episode, :, client] = counts*bits
+            else:
+                for i, sampler in enumerate(samplers):
+                    sizes[episode, :, client, i] = sampler.draw_sums(counts[:, i])
+    sizes.flush()
+    del sizes
+    with open(metadata_path(path), 'w') as f:
+        json.dump({'task_rate': task_rate, 'applications': app_types, 'clients': clients,
+                   'size_dist': size_dist, 'seed': seed}, f)
+    return ArrivalTrace(path)
+
+
+class ArrivalTrace:
+    """ generate_traces가 쓴 file을 읽기 전용 mmap으로 엶 """
+
+    def __init__(self, path):
+        self.path = path
+        self.sizes = np.load(path, mmap_mode='r')
+        with open(metadata_path(path)) as f:
+            self.metadata = json.load(f)
+        self.applications = self.metadata['applications']
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @property
+    def steps(self):
+        return self.sizes.shape[1]
+
+    # (steps, clients, apps). episode 수보다 큰 index는 처음부터 다시 씀
+    def episode(self, index):
+        return self.sizes[index % len(self.sizes)]
+
+    def check(self, task_rate, applications, clients):
+        if self.metadata['task_rate'] != task_rate or sorted(self.applications) != sorted(applications) \
+                or self.metadata['clients'] < clients:
+            raise ValueError('trace {} was generated for task_rate {}, applications {}, {} clients'.format(
+                self.path, self.metadata['task_rate'], self.applications, self.metadata['clients']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--task-rate', type=float, default=10)
+    parser.add_argument('--apps', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--clients', type=int, default=1)
+    parser.add_argument('--size-dist', default='deterministic',
+                        choices=['deterministic'] + list(size_distributions))
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    trace = generate_traces(args.path, args.episodes, args.steps, args.task_rate, args.apps,
+                            args.clients, args.size_dist, args.seed)
+    print('{}: {} episodes x {} steps x {} clients x {} apps'.format(args.path, *trace.sizes.shape))
+
+
+if __name__ == '__main__':
+    main()
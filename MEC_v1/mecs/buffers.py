@@ -1,49 +1,196 @@
+import os
+import numpy as np
+
 class TaskBuffer:
-    def __init__(self, max_size=100):#, initial_storage=0):
-        # super.__init__(max_size)
-        self.storage = list()
+    # max_size 크기의 ring buffer. 가득 차면 가장 오래된 것 자리에 덮어씀.
+    def __init__(self, max_size=100):
         self.max_size = max_size
+        self.storage = [None]*max_size
+        self.total = 0      # 지금까지 add된 개수. 가장 최근 것은 (total-1)%max_size 자리에 있음
+
+    def __len__(self):
+        return min(self.total, self.max_size)
+
+    # index : 처음부터 센 전체 index
+    def _get(self, index):
+        return self.storage[index % self.max_size]
 
     def add(self, data):
-        self.storage.append(data)
-        if len(self.storage) > self.max_size:
-            self.storage = self.storage[1:]
-        else:
-            pass
+        self.storage[self.total % self.max_size] = data
+        self.total += 1
 
+    # 최근 것부터 거꾸로 보는 view. 복사하지 않음.
     def get_buffer(self):
-        return self.storage[::-1]
+        return ReversedView(self)
 
     def get_last_obj(self):
-        if self.storage:
-            return self.storage[-1]
+        if self.total:
+            return self._get(self.total-1)
         else:
             return None
 
+# ring buffer를 최근 것부터 보여줌. buffer에 add하면 보이는 내용도 바뀜.
+class ReversedView:
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __iter__(self):
+        buffer = self.buffer
+        for index in range(buffer.total-1, buffer.total-1-len(buffer), -1):
+            yield buffer._get(index)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('buffer index out of range')
+        return self.buffer._get(self.buffer.total-1-i)
+
+
+# (timestamp, size) 쌍만 담는 numpy 버전. 같은 method를 가짐.
+class ArrayTaskBuffer(TaskBuffer):
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.times = np.zeros(max_size)
+        self.sizes = np.zeros(max_size)
+        self.total = 0
+
+    def _get(self, index):
+        index %= self.max_size
+        return self.times[index], self.sizes[index]
+
+    def add(self, data):
+        index = self.total % self.max_size
+        self.times[index], self.sizes[index] = data
+        self.total += 1
+
+    # 최근 것부터의 (times, sizes) 배열
+    def get_arrays(self):
+        index = (self.total-1-np.arange(len(self))) % self.max_size
+        return self.times[index], self.sizes[index]
+
+
+# TaskQueue.arrival_size_buffer용. TaskBuffer에 더해서
+# mean_arrival/last_arrival이 매번 buffer 전체를 뒤집어서 훑지 않도록
+# interval별 window 합과 마지막 timestamp의 합을 add할 때마다 누적해 둠.
+# time은 add되는 순서대로 줄어들지 않는다고 가정함 (queue에 들어오는 순서).
+# 원소 하나씩 python에서 읽는 일이 많아서 numpy 버전보다 list 버전이 더 빠름.
+class ArrivalStats(TaskBuffer):
+    def __init__(self, max_size=100):
+        super(ArrivalStats, self).__init__(max_size)
+        self.windows = dict()   # interval -> [window 시작 index, window 합]
+        self.last_time = None
+        self.last_sum = 0
+
+    def add(self, data):
+        time, size = data
+        index = self.total % self.max_size
+        old = self.storage[index] if self.total >= self.max_size else None
+        self.storage[index] = data
+        self.total += 1
+        for window in self.windows.values():
+            window[1] += size
+        if time == self.last_time:
+            self.last_sum += size
+        else:
+            self.last_time, self.last_sum = time, size
+        # 가득 차 있었으면 가장 오래된 것이 밀려남
+        if old is not None:
+            first = self.total - self.max_size - 1
+            for window in self.windows.values():
+                if window[0] == first:
+                    window[0] += 1
+                    window[1] -= old[1]
+            if old[0] == self.last_time:
+                self.last_sum -= old[1]
+
+    # time > t - interval인 것들의 합
+    def window_sum(self, t, interval):
+        storage, max_size = self.storage, self.max_size
+        first, end = self.total - len(self), self.total
+        window = self.windows.get(interval)
+        if window is None:
+            window = self.windows[interval] = [end, 0]
+        start, result = window
+        while start < end and storage[start % max_size][0] <= t - interval:
+            result -= storage[start % max_size][1]
+            start += 1
+        while start > first and storage[(start-1) % max_size][0] > t - interval:
+            start -= 1
+            result += storage[start % max_size][1]
+        if start == end:
+            result = 0
+        window[0], window[1] = start, result
+        return result
+
+    # time == t인 것들의 합
+    def time_sum(self, t):
+        if self.last_time == t:
+            return self.last_sum
+        return 0
+
+    # (times, sizes) array (오래된 것부터)와 합들. window cache는 window_sum이 다시 만듦
+    def snapshot(self):
+        stored = [self._get(index) for index in range(self.total-len(self), self.total)]
+        return (np.array([data[0] for data in stored], dtype=np.int64), np.array([data[1] for data in stored], dtype=np.float64),
+                self.total, self.last_time, self.last_sum)
+
+    def restore(self, state):
+        times, sizes, self.total, self.last_time, self.last_sum = state
+        self.storage = [None]*self.max_size
+        for index, data in zip(range(self.total-len(times), self.total), zip(times.tolist(), sizes.tolist())):
+            self.storage[index % self.max_size] = data
+        self.windows = dict()
+
 # For TD3 agents
+# (state, next_state, action, reward, done)를 field마다 미리 할당한 array에 담음.
+# array 모양은 처음 add한 transition을 보고 정하고, 처음 add할 때 max_size개 분량을 한 번에 할당함
+# (기본 1e6개에 state_dim이 90인 float64 state면 x, y만으로 약 1.4 GB).
+# r, d는 float64, x, y, u는 처음 값이 float이 아니면 float64로 둬서 뒤에 오는 float 값이 잘리지 않음.
+# dtypes={'x': np.float32, ...}로 field별 dtype을 직접 줄 수 있음.
+# memmap_dir을 주면 array를 그 directory의 file(np.memmap)로 만들어서 RAM에 다 올리지 않음.
 class ReplayBuffer(object):
-	def __init__(self, max_size=1e6):
-		self.storage = []
-		self.max_size = max_size
+	fields = ('x', 'y', 'u', 'r', 'd')
+
+	def __init__(self, max_size=1e6, memmap_dir=None, dtypes=None):
+		self.storage = None
+		self.max_size = int(max_size)
+		self.memmap_dir = memmap_dir
+		self.dtypes = dtypes or {}
 		self.ptr = 0
+		self.size = 0
+
+	def __len__(self):
+		return self.size
+
+	def _allocate(self, data):
+		self.storage = []
+		for field, value in zip(self.fields, data):
+			value = np.asarray(value)
+			shape = (self.max_size,) + value.shape
+			dtype = self.dtypes.get(field)
+			if dtype is None:
+				dtype = value.dtype if field in ('x', 'y', 'u') and np.issubdtype(value.dtype, np.floating) else np.float64
+			if self.memmap_dir is None:
+				self.storage.append(np.zeros(shape, dtype=dtype))
+			else:
+				if not os.path.exists(self.memmap_dir):
+					os.makedirs(self.memmap_dir)
+				path = os.path.join(self.memmap_dir, '{}.dat'.format(field))
+				self.storage.append(np.memmap(path, dtype=dtype, mode='w+', shape=shape))
 
 	def add(self, data):
-		if len(self.storage) == self.max_size:
-			self.storage[int(self.ptr)] = data
-			self.ptr = (self.ptr + 1) % self.max_size
-		else:
-			self.storage.append(data)
+		if self.storage is None:
+			self._allocate(data)
+		for array, value in zip(self.storage, data):
+			array[self.ptr] = value
+		self.ptr = (self.ptr + 1) % self.max_size
+		self.size = min(self.size + 1, self.max_size)
 
 	def sample(self, batch_size):
-		ind = np.random.randint(0, len(self.storage), size=batch_size)
-		x, y, u, r, d = [], [], [], [], []
-
-		for i in ind:
-			X, Y, U, R, D = self.storage[i]
-			x.append(np.array(X, copy=False))
-			y.append(np.array(Y, copy=False))
-			u.append(np.array(U, copy=False))
-			r.append(np.array(R, copy=False))
-			d.append(np.array(D, copy=False))
-
-		return np.array(x), np.array(y), np.array(u), np.array(r).reshape(-1, 1), np.array(d).reshape(-1, 1)
+		ind = np.random.randint(0, self.size, size=batch_size)
+		x, y, u, r, d = (array[ind] for array in self.storage)
+		return x, y, u, r.reshape(-1, 1), d.reshape(-1, 1)
@@ -1,12 +1,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import logging
-import uuid
 from constants import *
+from id_provider import new_id
 
 class Channel:
     def __init__(self, channel_type, fading=None, rate=None):
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.channel_type = channel_type
         self.bw = []
         self.max_coverage = []
@@ -32,7 +32,7 @@ class Channel:
             self.down = rate[1]
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     def get_channel_type(self):
         return self.channel_type
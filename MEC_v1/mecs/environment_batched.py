@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from environment import Environment
+from applications import app_info, arrival_bits, reset_samplers, size_distributions, size_sampler
+from channels import Channel
+from constants import *
+from cost_functions import *
+
+# MEC_v1(environment_ppo_under1latent_cost1_univ)과 같은 동작을 하는 환경 N개를 한 번에 step 함.
+# ServerNode/TaskQueue 객체 대신 queue 길이, arrival buffer, explosion counter를 (N, apps) 배열로 들고 있음.
+# edge queue는 offload할 때 task 단위로 쪼개지므로 task 크기를 (N, apps, capacity) ring buffer로 들고 있고,
+# cloud queue는 자기 cpu로만 처리하므로 길이만 들고 있음.
+# client 하나, server 하나인 linked pair만 지원함 (MEC_v1.step과 같음).
+class BatchedMEC_v1(Environment):
+    def __init__(self, num_envs, task_rate, *applications, time_delta=10*MS, use_beta=True, empty_reward=True, cost_type=1,
+                 max_length=10*GB, buffer_size=100, estimate_interval=100, capacity=64, size_dist='deterministic'):
+        super().__init__()
+        self.num_envs = num_envs
+        self.applications = applications
+        self.task_rate = task_rate#/time_delta
+        self.reset_info = list()
+        self.use_beta = use_beta
+        self.empty_reward = empty_reward
+        self.cost_type = cost_type
+        self.max_length = max_length
+        self.buffer_size = buffer_size
+        self.estimate_interval = estimate_interval
+        self.capacity = capacity
+
+        number_of_apps = len(applications)
+        # state에서 각 app이 들어가는 자리 (app_type-1)
+        self.state_index = np.array(applications) - 1
+        # random_task_generation은 app_info 순서대로 poisson을 뽑으므로 그 순서를 기억해 둠
+        self.generation_order = [applications.index(app_type) for app_type in app_info if app_type in applications]
+        self.arrival_rates = np.array([task_rate*app_info[applications[i]]['popularity'] for i in self.generation_order])
+        self.arrival_bits = np.array([arrival_bits(app_type) for app_type in applications])
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        # MEC_v1처럼 env마다 따로 가지고, 전부 reset할 때 pool을 비움
+        self.sampler_cache = dict()
+        self.size_samplers = [size_sampler(app_type, size_dist, cache=self.sampler_cache) for app_type in applications] \
+            if size_dist in size_distributions else None
+        self.workloads = np.array([app_info[app_type]['workload'] for app_type in applications])
+
+        self.edge_capability = np.zeros(num_envs)
+        self.cloud_capability = np.zeros(num_envs)
+        self.channel_rate = np.zeros(num_envs)
+        self.timestamp = np.zeros(num_envs, dtype=np.int64)
+        self._make_queues(number_of_apps)
+
+    def _make_queues(self, number_of_apps):
+        shape = (self.num_envs, number_of_apps)
+        self.edge_length = np.zeros(shape)
+        self.cloud_length = np.zeros(shape)
+        self.edge_exploded = np.zeros(shape, dtype=np.int64)
+        self.cloud_exploded = np.zeros(shape, dtype=np.int64)
+        # edge queue의 task 크기들 (FIFO)
+        self.edge_tasks = np.zeros(shape+(self.capacity,))
+        self.edge_head = np.zeros(shape, dtype=np.int64)
+        self.edge_count = np.zeros(shape, dtype=np.int64)
+        # TaskBuffer(max_size=buffer_size)와 같은 (timestamp, size) 기록
+        self.edge_arrivals = self._make_buffer(shape)
+        self.cloud_arrivals = self._make_buffer(shape)
+
+    def _make_buffer(self, shape):
+        return {
+            'time' : np.full(shape+(self.buffer_size,), -1, dtype=np.int64),
+            'size' : np.zeros(shape+(self.buffer_size,)),
+            'ptr' : np.zeros(shape, dtype=np.int64)
+        }
+
+    def init_linked_pair(self, edge_capability, cloud_capability, channel):
+        # capability는 scalar나 (N,) 배열
+        self.edge_capability[:] = edge_capability
+        self.cloud_capability[:] = cloud_capability
+        self.channel_rate[:] = Channel(channel).get_rate()
+
+        self.reset_info.append((edge_capability, cloud_capability, channel))
+        state,_,_ = self.get_status()
+        self.state_dim = state.shape[1]
+        self.action_dim = len(self.applications)+1
+        if self.use_beta:
+            self.action_dim *=2
+        return state
+
+    def get_number_of_apps(self):
+        return len(self.applications)
+
+    # env_ids가 None이면 전부 reset. 항상 전체 (N, state_dim) state를 돌려줌.
+    def reset(self, empty_reward=True, env_ids=None):
+        self.empty_reward = empty_reward
+        if env_ids is None:
+            env_ids = np.arange(self.num_envs)
+            reset_samplers(self.sampler_cache)
+        self.timestamp[env_ids] = 0
+        for array in (self.edge_length, self.cloud_length, self.edge_exploded, self.cloud_exploded,
+                      self.edge_tasks, self.edge_head, self.edge_count):
+            array[env_ids] = 0
+        for buffer in (self.edge_arrivals, self.cloud_arrivals):
+            buffer['time'][env_ids] = -1
+            buffer['size'][env_ids] = 0
+            buffer['ptr'][env_ids] = 0
+        reset_state,_,_ = self.get_status()
+        return reset_state
+
+    def _node_status(self, length, exploded, buffer):
+        t = self.timestamp[:, None, None]
+        recent = buffer['time'] > t - self.estimate_interval
+        estimated_arrival = np.where(recent, buffer['size'], 0).sum(axis=2)
+        estimated_arrival = estimated_arrival/np.minimum(self.timestamp+1, self.estimate_interval)[:, None]/self.max_length*100
+
+        last = (buffer['ptr'] - 1) % self.buffer_size
+        last_time = np.take_along_axis(buffer['time'], last[..., None], axis=2)[..., 0]
+        last_size = np.take_along_axis(buffer['size'], last[..., None], axis=2)[..., 0]
+        last_arrival = np.where(last_time == self.timestamp[:, None], last_size, 0)/self.max_length*100
+
+        state = np.zeros((self.num_envs, 5, 8))
+        state[:, 0, self.state_index] = estimated_arrival
+        state[:, 1, self.state_index] = last_arrival
+        state[:, 2, self.state_index] = length/self.max_length*100
+        state[:, 3, self.state_index] = exploded
+        state[:, 4, self.state_index] = self.workloads
+        return state.reshape(self.num_envs, -1)
+
+    def get_status(self):
+        state = self._node_status(self.edge_length, self.edge_exploded, self.edge_arrivals)
+        failed_to_generate = self.edge_exploded.sum(axis=1)
+        failed_to_offload = np.zeros(self.num_envs, dtype=np.int64)
+        if self.use_beta:
+            cloud_state = self._node_status(self.cloud_length, self.cloud_exploded, self.cloud_arrivals)
+            failed_to_offload = self.cloud_exploded.sum(axis=1)
+            state = np.concatenate((state, cloud_state), axis=1)
+        return state, failed_to_offload, failed_to_generate
+
+    # action : (N, action_dim), cloud : (apps,) 또는 (N, apps)
+    def step(self, action, cloud):
+        action = np.asarray(action).reshape(self.num_envs, -1)
+        cloud = np.broadcast_to(np.asarray(cloud, dtype=float), self.edge_length.shape)
+        q0, failed_to_generate, q1 = self._step_generation()
+        if self.use_beta:
+            action_alpha = action[:, :int(self.action_dim/2)]
+            action_beta = action[:, int(self.action_dim/2):]
+        else:
+            action_alpha, action_beta = action, None
+
+        used_edge_cpus, q2 = self._step_alpha(action_alpha)
+        used_cloud_cpus, new_state, failed_to_offload, q3 = self._step_beta(action_beta, cloud)
+        cost = self.get_cost(used_edge_cpus, used_cloud_cpus, q0, q3, failed_to_offload, failed_to_generate)
+        self.timestamp += 1
+        return new_state, cost, failed_to_offload+failed_to_generate
+
+    def _step_generation(self):
+        initial_qlength = self.get_total_qlength()
+        number_of_tasks = np.empty(self.edge_length.shape, dtype=np.int64)
+        number_of_tasks[:, self.generation_order] = np.random.poisson(self.arrival_rates, size=self.edge_length.shape)
+        if self.size_samplers is None:
+            data_size = number_of_tasks*self.arrival_bits
+        else:
+            data_size = np.zeros(self.edge_length.shape)
+            for i, sampler in enumerate(self.size_samplers):
+                data_size[:, i] = sampler.draw_sums(number_of_tasks[:, i])
+
+        arrived = data_size > 0
+        new_length = self.edge_length + data_size
+        accepted = arrived & (new_length <= self.max_length)
+        rejected = arrived & ~accepted
+        self._buffer_add(self.edge_arrivals, data_size[..., None], arrived.astype(np.int64))
+        self._push_edge_tasks(data_size, accepted)
+        self.edge_length = np.where(accepted, new_length, self.edge_length)
+        self.edge_exploded = np.where(accepted, np.maximum(0, self.edge_exploded-1), self.edge_exploded)
+        self.edge_exploded = np.where(rejected, np.minimum(10, self.edge_exploded+1), self.edge_exploded)
+        failed_to_generate = rejected.sum(axis=1)
+
+        after_qlength = self.get_total_qlength()
+        return initial_qlength, failed_to_generate, after_qlength
+
+    def _step_alpha(self, action):
+        alpha = action[:, :-1]
+        # ServerNode.do_tasks -> TaskQueue.served(type=1)
+        to_be_served = np.trunc(alpha*self.edge_capability[:, None]/self.workloads).astype(np.int64)
+        served_bits, _, _ = self._serve_edge(to_be_served)
+        used_edge_cpus = (served_bits*self.workloads).sum(axis=1)
+        return used_edge_cpus, self.get_total_qlength()
+
+    def _step_beta(self, action, action_cloud):
+        if self.use_beta:
+            beta = action[:, :-1]
+            # ServerNode.offload_tasks -> _probe -> TaskQueue.served(type=0)
+            tx_allocs = np.minimum(self.edge_length, beta*self.channel_rate[:, None]).astype(np.int64)
+            tx_allocs[self.max_length < self.cloud_length+tx_allocs] = 0
+            offloaded_bits, pieces, number_of_pieces = self._serve_edge(tx_allocs)
+
+            # ServerNode.offloaded_tasks : _probe를 통과했으므로 모두 도착함
+            self._buffer_add(self.cloud_arrivals, pieces, number_of_pieces)
+            self.cloud_length = self.cloud_length + offloaded_bits
+            self.cloud_exploded = np.maximum(0, self.cloud_exploded-number_of_pieces)
+
+        # cloud의 ServerNode.do_tasks : 길이만 알면 됨
+        to_be_served = np.trunc(action_cloud*self.cloud_capability[:, None]/self.workloads).astype(np.int64)
+        served_bits = np.clip(to_be_served, 0, self.cloud_length)
+        served_bits[action_cloud == 0] = 0
+        self.cloud_length = self.cloud_length - served_bits
+        used_cloud_cpus = (served_bits*self.workloads).sum(axis=1)
+
+        after_qlength = self.get_total_qlength()
+        state, failed_to_offload, _ = self.get_status()
+        return used_cloud_cpus, state, failed_to_offload, after_qlength
+
+    # 앞에서부터 budget만큼 edge queue의 task를 처리함. 마지막 task는 부분적으로 처리됨 (offload면 child task).
+    # 처리된 bits, 처리된 조각들의 크기 (N, apps, K), 조각 수를 돌려줌
+    def _serve_edge(self, budget):
+        window = min(self.capacity, 64)
+        while True:
+            index = (self.edge_head[..., None] + np.arange(window)) % self.capacity
+            valid = np.arange(window) < self.edge_count[..., None]
+            sizes = np.where(valid, np.take_along_axis(self.edge_tasks, index, axis=2), 0)
+            cum_sizes = np.cumsum(sizes, axis=2)
+            # window 안의 task를 다 처리하고도 budget이 남는 queue가 있으면 window를 늘림
+            if window == self.capacity or not np.any((cum_sizes[..., -1] <= budget) & (self.edge_count > window)):
+                break
+            window = min(self.capacity, 2*window)
+
+        done = ((cum_sizes <= budget[..., None]) & valid).sum(axis=2)
+        served_bits = np.where(done > 0, np.take_along_axis(cum_sizes, np.maximum(done-1, 0)[..., None], axis=2)[..., 0], 0)
+        remained = budget - served_bits
+        partial = (done < self.edge_count) & (remained > 0)
+
+        pieces = np.where(np.arange(window) < done[..., None], sizes, 0)
+        n, a = np.nonzero(partial)
+        pieces[n, a, done[n, a]] = remained[n, a]
+        self.edge_tasks[n, a, index[n, a, done[n, a]]] -= remained[n, a]
+        served_bits = served_bits + np.where(partial, remained, 0)
+
+        self.edge_length = self.edge_length - served_bits
+        self.edge_head = (self.edge_head + done) % self.capacity
+        self.edge_count = self.edge_count - done
+        return served_bits, pieces, done + partial
+
+    def _push_edge_tasks(self, data_size, accepted):
+        if np.any(self.edge_count + accepted > self.capacity):
+            self._grow_edge_tasks()
+        n, a = np.nonzero(accepted)
+        tail = (self.edge_head[n, a] + self.edge_count[n, a]) % self.capacity
+        self.edge_tasks[n, a, tail] = data_size[n, a]
+        self.edge_count = self.edge_count + accepted
+
+    def _grow_edge_tasks(self):
+        index = (self.edge_head[..., None] + np.arange(self.capacity)) % self.capacity
+        tasks = np.take_along_axis(self.edge_tasks, index, axis=2)
+        self.edge_tasks = np.concatenate((tasks, np.zeros_like(tasks)), axis=2)
+        self.edge_head[:] = 0
+        self.capacity *= 2
+
+    # sizes (N, apps, K)의 앞 counts개를 순서대로 기록. buffer_size보다 많으면 마지막 것들만 남음.
+    def _buffer_add(self, buffer, sizes, counts):
+        j = np.arange(sizes.shape[2])
+        kept = (j < counts[..., None]) & (j >= counts[..., None]-self.buffer_size)
+        n, a, k = np.nonzero(kept)
+        position = (buffer['ptr'][n, a] + k) % self.buffer_size
+        buffer['time'][n, a, position] = self.timestamp[n]
+        buffer['size'][n, a, position] = sizes[n, a, k]
+        buffer['ptr'] = (buffer['ptr'] + counts) % self.buffer_size
+
+    def get_total_qlength(self, normalize=1):
+        qlength = self.edge_length/self.max_length*normalize
+        if self.use_beta:
+            qlength = np.concatenate((qlength, self.cloud_length/self.max_length*normalize), axis=1)
+        return qlength
+
+    def get_cost(self, used_edge_cpus, used_cloud_cpus, before, after, failed_to_offload, failed_to_generate):
+        # cost_functions.get_drift_cost를 env마다 적용. 합은 builtin sum 순서 그대로.
+        grown = sum(after.T) > sum(before.T)
+        if self.empty_reward:
+            drift_cost = after-before-(after==0)*before
+        else:
+            drift_cost = after-before
+        drift_cost = np.where(grown[:, None], after, drift_cost)
+        fail_cost = ((failed_to_offload+failed_to_generate) > 0).astype(float)
+        return total_cost({'edge' : used_edge_cpus}, {'cloud' : used_cloud_cpus}, drift_cost.T, option=self.cost_type) + fail_cost
@@ -13,9 +13,10 @@ from applications import *
 from channels import *
 from constants import *
 from cost_functions import *
+from profiling import PhaseProfiler
 
 class MEC_v1(Environment):
-    def __init__(self, task_rate, *applications, time_delta=10*MS, use_beta=True, empty_reward=True, cost_type=1):
+    def __init__(self, task_rate, *applications, time_delta=10*MS, use_beta=True, empty_reward=True, cost_type=1, generation_block=1, size_dist='deterministic'):
         super().__init__()
         self.applications = applications
         self.task_rate = task_rate#/time_delta
@@ -23,8 +24,27 @@ class MEC_v1(Environment):
         self.use_beta = use_beta
         self.empty_reward = empty_reward
         self.cost_type = cost_type
+        # client마다 random_task_generation이 미리 뽑아 둘 step 수 (applications.ArrivalGenerator)
+        self.generation_block = generation_block
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        self.profiler = None
+        # set_rng로 주는 도착용 np.random.RandomState. None이면 np.random
+        self.rng = None
+        # 이 env의 task 크기 sampler들 (applications.size_sampler의 cache). reset마다 pool을 비우므로
+        # np.random.seed(s) 후 reset하면 처음 만든 env와 같은 크기가 나옴.
+        # episode 중간에 seed만 다시 주면 이미 뽑아 둔 pool이 먼저 나오므로 같지 않음
+        self.sampler_cache = dict()
+        # use_trace로 켜는 arrival trace. trace_next는 다음 episode 번호, trace_sizes는 이번 episode의 (steps, clients, apps)
+        self.trace = None
+        self.trace_next = 0
+        self.trace_sizes = None
+        # 처음 reset에서 만든 직후의 snapshot과 state. 그 다음 reset부터는 node를 새로 만들지 않고 이걸 restore함
+        self.initial_snapshot = None
+        self.initial_state = None
 
     def init_linked_pair(self, edge_capability, cloud_capability, channel):
+        self.initial_snapshot = None
         client = self.add_client(edge_capability)
         client.make_application_queues(*self.applications)
 
@@ -44,13 +64,18 @@ class MEC_v1(Environment):
         return state
 
     def add_client(self, cap):
-        client = ServerNode(cap, True)
+        client = ServerNode(cap, True, self.generation_block, self.size_dist)
+        client.rng, client.sampler_cache = self.rng, self.sampler_cache
         self.clients[client.get_uuid()] = client
+        if self.profiler is not None:
+            self.profiler.instrument_node(client)
         return client
 
     def add_server(self, cap):
         server = ServerNode(cap)
         self.servers[server.get_uuid()] = server
+        if self.profiler is not None:
+            self.profiler.instrument_node(server)
         return server
 
     def add_link(self, client, server, up_channel, down_channel=None):
@@ -86,20 +111,126 @@ class MEC_v1(Environment):
         del self.reset_info
 
     def reset(self, empty_reward=True):
+        if self.initial_snapshot is not None:
+            trace_next = self.trace_next
+            self.restore(self.initial_snapshot)
+            self.empty_reward = empty_reward
+            self.trace_next, self.trace_sizes = trace_next, None
+            reset_samplers(self.sampler_cache)
+            return self.initial_state.copy()
+
         task_rate = self.task_rate
         applications = self.applications
         reset_info = self.reset_info
         use_beta = self.use_beta
         cost_type = self.cost_type
+        generation_block = self.generation_block
+        size_dist = self.size_dist
+        profiler = self.profiler
+        rng, sampler_cache = self.rng, self.sampler_cache
+        trace, trace_next = self.trace, self.trace_next
         self.__del__()
-        self.__init__(task_rate, *applications, use_beta = use_beta, empty_reward=empty_reward, cost_type=cost_type)
+        self.__init__(task_rate, *applications, use_beta = use_beta, empty_reward=empty_reward, cost_type=cost_type, generation_block=generation_block, size_dist=size_dist)
+        self.profiler = profiler
+        self.rng, self.sampler_cache = rng, sampler_cache
+        self.trace, self.trace_next = trace, trace_next
+        reset_samplers(self.sampler_cache)
         for reset_info in reset_info:
             self.init_linked_pair(*reset_info)
+        self.initial_snapshot = self.snapshot()
         reset_state,_,_ = self.get_status()
+        self.initial_state = reset_state.copy()
         return reset_state
 
+    # 지금 상태 (timestamp, 모든 node의 queue와 미리 뽑아 둔 도착, trace 위치)를 array 위주의 dict로 떠 둠.
+    # include_rng=True면 np.random (set_rng를 했으면 그 rng) 상태와 task 크기 sampler의 pool도 넣어서
+    # restore 후 같은 도착이 다시 나오게 함.
+    # 같은 env나, 같은 reset_info로 만든 다른 MEC_v1에 restore할 수 있음.
+    def snapshot(self, include_rng=False):
+        random = np.random if self.rng is None else self.rng
+        return {'timestamp': self.timestamp,
+                'nodes': [node.snapshot() for node in list(self.clients.values()) + list(self.servers.values())],
+                'trace': (self.trace_next, self.trace_sizes),
+                'rng': (random.get_state(), sampler_states(self.sampler_cache)) if include_rng else None}
+
+    def restore(self, snapshot):
+        nodes = list(self.clients.values()) + list(self.servers.values())
+        if len(nodes) != len(snapshot['nodes']):
+            raise ValueError('snapshot has {} nodes, this environment has {}'.format(len(snapshot['nodes']), len(nodes)))
+        for node, node_state in zip(nodes, snapshot['nodes']):
+            node.restore(node_state)
+        self.timestamp = snapshot['timestamp']
+        self.trace_next, self.trace_sizes = snapshot['trace']
+        if snapshot['rng'] is not None:
+            (np.random if self.rng is None else self.rng).set_state(snapshot['rng'][0])
+            set_sampler_states(snapshot['rng'][1], self.sampler_cache)
+
+    # 이 env의 도착 (poisson 개수와 task 크기)을 np.random 대신 rng (np.random.RandomState)에서 뽑음.
+    # task 크기 sampler의 pool도 새로 만듦. rng=None이면 다시 np.random을 씀.
+    # client마다 미리 뽑아 둔 도착 (generation_block)은 버림
+    def set_rng(self, rng):
+        self.rng = rng
+        self.sampler_cache = dict()
+        for node in list(self.clients.values()) + list(self.servers.values()):
+            node.rng, node.sampler_cache = self.rng, self.sampler_cache
+            node.arrival_generator = None
+
+    # 지금 상태에서 갈라진 MEC_v1 n개를 MEC_v1Forks로 돌려줌. deepcopy하지 않고 같은 reset_info로 env를 만든 뒤
+    # snapshot을 restore하므로 profiler는 따라가지 않음. reset하면 이 env와 같은 처음 상태로 돌아감.
+    # fork마다 np.random.RandomState(seeds[i])에서 도착을 뽑고 np.random은 건드리지 않음.
+    # seeds를 안 주면 np.random에서 뽑음. seeds를 모두 같게 주면 모든 fork에 같은 도착이 오므로
+    # (common random numbers) action이나 policy끼리 비교할 때 cost 차이의 분산이 줄어듦.
+    # trace를 쓰고 있으면 fork들이 같은 trace를 이어서 읽음.
+    def fork(self, n, seeds=None):
+        if seeds is None:
+            seeds = np.random.randint(2**31, size=n)
+        if len(seeds) != n:
+            raise ValueError('{} seeds for {} forks'.format(len(seeds), n))
+        snapshot = self.snapshot()
+        envs = list()
+        for seed in seeds:
+            env = MEC_v1(self.task_rate, *self.applications, use_beta=self.use_beta, empty_reward=self.empty_reward,
+                         cost_type=self.cost_type, generation_block=self.generation_block, size_dist=self.size_dist)
+            env.silence = self.silence
+            for reset_info in self.reset_info:
+                env.init_linked_pair(*reset_info)
+            env.trace = self.trace
+            env.restore(snapshot)
+            env.set_rng(np.random.RandomState(seed))
+            env.initial_snapshot, env.initial_state = self.initial_snapshot, self.initial_state
+            envs.append(env)
+        return MEC_v1Forks(envs)
+
+    # step의 각 단계(_step_generation, _step_alpha, _step_beta, get_status, get_cost)와
+    # ServerNode method들의 시간, 호출 수, 메모리 block 증감을 모으기 시작함. reset 후에도 유지됨.
+    # dump_every step마다 dump_path에 JSON 한 줄씩 (없으면 logger로) 남김.
+    # 메모리 block 증감은 allocations=True일 때만 셈 (느려짐).
+    def enable_profiling(self, dump_every=0, dump_path=None, allocations=False):
+        if self.profiler is None:
+            self.profiler = PhaseProfiler(dump_every, dump_path, allocations)
+            self.profiler.instrument(self, ['_step_generation', '_step_alpha', '_step_beta', 'get_status', 'get_cost'])
+            self.profiler.instrument(self, ['step'], count_steps=True)
+            for node in list(self.clients.values()) + list(self.servers.values()):
+                self.profiler.instrument_node(node)
+        return self.profiler
+
+    def profile_report(self):
+        if self.profiler is None:
+            return 'profiling is off (call enable_profiling first)'
+        return self.profiler.report()
+
+    # _step_generation이 poisson을 뽑는 대신 arrival_traces.ArrivalTrace를 읽게 함.
+    # reset할 때마다 (처음 reset 전에 step하면 그때) start_episode부터 한 episode씩 넘어감.
+    # episode가 trace의 steps보다 길면 그 episode의 처음부터 다시 씀. trace=None이면 다시 sampling함.
+    def use_trace(self, trace, start_episode=0):
+        if trace is not None:
+            trace.check(self.task_rate, self.applications, len(self.clients))
+        self.trace = trace
+        self.trace_next = start_episode
+        self.trace_sizes = None
+
     def get_status(self):
-        edge_state, cloud_state, link_state = list(), list(), list()
+        edge_state, cloud_state = list(), list()
         failed_to_offload, failed_to_generate = 0, 0
         for client in self.clients.values():
             temp_state = client.get_status(self.timestamp)
@@ -112,8 +243,7 @@ class MEC_v1(Environment):
                 temp_state = server.get_status(self.timestamp)
                 cloud_state += temp_state
                 failed_to_offload +=sum(temp_state[24:32])
-            for link in self.links:
-                link_state.extend([self.clients[link[0]].sample_channel_rate(link[1]),self.servers[link[1]].sample_channel_rate(link[0])])
+            # link의 channel rate는 state에 들어가지 않으므로 sample하지 않음 (fading이 없어서 random draw도 없음)
 
             state = edge_state + cloud_state
 
@@ -131,7 +261,7 @@ class MEC_v1(Environment):
         else:
             action_alpha = action
 
-        used_edge_cpus, inter_state, q2 = self._step_alpha(action_alpha)
+        used_edge_cpus, q2 = self._step_alpha(action_alpha)
         used_cloud_cpus, new_state, failed_to_offload, q3 = self._step_beta(action_beta, np.array(cloud).reshape(-1,len(cloud)))
         # fail_cost = self.get_fail_cost(failed_to_offload, failed_to_generate)
         # cost = self.get_cost(used_edge_cpus, used_cloud_cpus, get_drift_cost(q0, q3, self.empty_reward), get_fail_cost(failed_to_offload, failed_to_generate))
@@ -148,10 +278,10 @@ class MEC_v1(Environment):
         for client_id, alpha in list(zip(self.clients.keys(), action)):
             used_edge_cpus[client_id] = self.clients[client_id].do_tasks(alpha)
 
-        state, _, _ = self.get_status()
+        # 중간 state는 step에서 쓰지 않으므로 get_status는 _step_beta 끝에서 한 번만 부름
         after_qlength = self.get_total_qlength()
         # lyap_drift = get_drift_cost(initial_Lyap, after_Lyap)
-        return used_edge_cpus, state, after_qlength
+        return used_edge_cpus, after_qlength
 
 
     def _step_beta(self, action, action_cloud):
@@ -182,8 +312,16 @@ class MEC_v1(Environment):
     def _step_generation(self):
         initial_qlength= self.get_total_qlength()
         if not self.silence: print("###### random task generation start! ######")
-        for client in self.clients.values():
-            arrival_size, failed_to_generate = client.random_task_generation(self.task_rate, self.timestamp, *self.applications)
+        if self.trace is None:
+            for client in self.clients.values():
+                arrival_size, failed_to_generate = client.random_task_generation(self.task_rate, self.timestamp, *self.applications)
+        else:
+            if self.trace_sizes is None:
+                self.trace_sizes = self.trace.episode(self.trace_next)
+                self.trace_next += 1
+            arrivals = self.trace_sizes[self.timestamp % len(self.trace_sizes)].tolist()
+            for client, client_arrivals in zip(self.clients.values(), arrivals):
+                arrival_size, failed_to_generate = client.task_arrival(zip(self.trace.applications, client_arrivals), self.timestamp, *self.applications)
         if not self.silence: print("###### random task generation ends! ######")
         after_qlength = self.get_total_qlength()
 
@@ -205,3 +343,31 @@ class MEC_v1(Environment):
         drift_cost = get_drift_cost(before,after,self.empty_reward)
         fail_cost = get_fail_cost(failed_to_offload, failed_to_generate)
         return total_cost(used_edge_cpus, used_cloud_cpus, drift_cost, option=self.cost_type) + fail_cost
+
+
+# MEC_v1.fork가 돌려주는 env 묶음. step은 fork마다 action 하나씩 받아서 모두 한 step 진행하고
+# (states, costs, failed)를 fork 순서대로 쌓아서 돌려줌. fork 하나는 envs[i]로 따로 써도 됨
+class MEC_v1Forks:
+    def __init__(self, envs):
+        self.envs = envs
+
+    def __len__(self):
+        return len(self.envs)
+
+    def __getitem__(self, index):
+        return self.envs[index]
+
+    def __iter__(self):
+        return iter(self.envs)
+
+    # actions: (n, action_dim). cloud는 모든 fork가 같이 쓰는 (apps,)나 fork마다 하나씩 (n, apps)
+    def step(self, actions, cloud):
+        cloud = np.asarray(cloud)
+        if cloud.ndim == 1:
+            cloud = [cloud]*len(self.envs)
+        states, costs, failed = zip(*[env.step(np.asarray(action).reshape(1, -1), env_cloud)
+                                      for env, action, env_cloud in zip(self.envs, actions, cloud)])
+        return np.stack(states), np.array(costs), np.array(failed)
+
+    def reset(self):
+        return np.stack([env.reset() for env in self.envs])
@@ -0,0 +1,43 @@
+import itertools
+import uuid
+
+# task, queue, node, channel의 id를 만드는 곳.
+# 기본은 process 안에서 1부터 하나씩 늘어나는 int라서 seed가 같으면 id도 똑같이 나옴.
+# (0은 client_index 같은 곳에서 False로 읽히기 때문에 쓰지 않음)
+# 여러 process/machine에서 만든 id가 겹치면 안 되는 경우에는 set_id_provider(UUIDProvider())로 바꿔서 씀.
+
+class CounterProvider(object):
+    def __init__(self, start=1):
+        self.start = start
+        self.counter = itertools.count(start)
+
+    def new_id(self):
+        return next(self.counter)
+
+    def reset(self):
+        self.counter = itertools.count(self.start)
+
+
+class UUIDProvider(object):
+    def new_id(self):
+        return uuid.uuid4().hex
+
+    def reset(self):
+        pass
+
+
+_provider = CounterProvider()
+
+def new_id():
+    return _provider.new_id()
+
+def get_id_provider():
+    return _provider
+
+def set_id_provider(provider):
+    global _provider
+    _provider = provider
+
+# counter를 처음으로 되돌림. 아직 살아있는 env가 있으면 id가 겹칠 수 있으니 env를 새로 만들기 전에만 부를 것.
+def reset_ids():
+    _provider.reset()
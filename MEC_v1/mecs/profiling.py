@@ -0,0 +1,140 @@
+import bisect
+import functools
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 시간 histogram의 칸 경계 (us): 1, 2, 4, ..., 2^20 (~1초)
+time_bins_us = [2.0 ** i for i in range(21)]
+
+# env.enable_profiling()이 감싸는 ServerNode method들
+node_methods = ('do_tasks', 'offload_tasks', 'offloaded_tasks', 'probed',
+                'random_task_generation', 'get_status', 'sample_channel_rate',
+                'get_queue_lengths')
+
+
+class PhaseStats:
+    """ phase 하나의 호출 수, 걸린 시간, 늘어난 메모리 block 수 """
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.
+        self.max_time = 0.
+        self.allocations = 0
+        self.histogram = [0] * (len(time_bins_us) + 1)
+
+    def add(self, seconds, allocations):
+        self.calls += 1
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+        self.allocations += allocations
+        self.histogram[bisect.bisect_left(time_bins_us, seconds * 1e6)] += 1
+
+    def percentile(self, q):
+        """ histogram에서 구한 q-percentile (us). 그 값이 들어 있는 칸의 위쪽 경계 """
+        if self.calls == 0:
+            return 0.
+        rank = np.searchsorted(np.cumsum(self.histogram), q / 100 * self.calls)
+        edges = time_bins_us + [np.inf]
+        return min(edges[rank], self.max_time * 1e6)
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'total_ms': self.total_time * 1e3,
+            'mean_us': self.total_time / max(self.calls, 1) * 1e6,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': self.max_time * 1e6,
+            'allocated_blocks': self.allocations,
+            'histogram': list(self.histogram),
+        }
+
+
+class PhaseProfiler:
+    """
+    instance method를 감싸서 phase별 wall time, 호출 수를 모음.
+    allocations=True면 메모리 block 증감 (sys.getallocatedblocks의 차이, 안쪽 phase까지 포함)도 모으는데,
+    getallocatedblocks가 heap 크기에 비례해서 느리므로 그만큼 시간이 부풀려짐.
+    켜지 않으면 아무것도 감싸지 않으므로 비용이 없음.
+    dump_every step마다 지금까지의 통계를 dump_path에 JSON 한 줄로 붙이거나
+    (dump_path가 없으면) logger로 report를 남김.
+    """
+
+    def __init__(self, dump_every=0, dump_path=None, allocations=False):
+        self.stats = {}
+        self.allocations = allocations
+        self.steps = 0
+        self.dump_every = dump_every
+        self.dump_path = dump_path
+
+    def instrument(self, obj, names, prefix='', count_steps=False):
+        for name in names:
+            method = getattr(obj, name)
+            if getattr(method, 'profiled', False):
+                continue
+            stats = self.stats.setdefault(prefix + name, PhaseStats())
+            setattr(obj, name, self.timed(method, stats, count_steps))
+
+    def timed(self, method, stats, count_steps):
+        allocated_blocks = sys.getallocatedblocks if self.allocations \
+            else int
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            blocks = allocated_blocks()
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.add(time.perf_counter() - start,
+                          allocated_blocks() - blocks)
+                if count_steps:
+                    self.step_done()
+        wrapper.profiled = True
+        return wrapper
+
+    def instrument_node(self, node):
+        self.instrument(node, [name for name in node_methods
+                               if hasattr(node, name)],
+                        prefix=type(node).__name__ + '.')
+
+    def step_done(self):
+        self.steps += 1
+        if self.dump_every and self.steps % self.dump_every == 0:
+            self.dump()
+
+    def to_dict(self):
+        return {'steps': self.steps,
+                'phases': {name: stats.to_dict()
+                           for name, stats in self.stats.items()}}
+
+    def dump(self):
+        if self.dump_path is None:
+            logger.info('profile after %d steps\n%s', self.steps, self.report())
+            return
+        with open(self.dump_path, 'a') as f:
+            f.write(json.dumps(self.to_dict()) + '\n')
+
+    def reset(self):
+        for stats in self.stats.values():
+            stats.__init__()
+        self.steps = 0
+
+    def report(self):
+        lines = ['{:40s} {:>8s} {:>10s} {:>9s} {:>9s} {:>9s} {:>10s}'.format(
+            'phase', 'calls', 'total ms', 'mean us', 'p50 us', 'p99 us',
+            'blocks')]
+        for name, stats in sorted(self.stats.items(),
+                                  key=lambda item: -item[1].total_time):
+            s = stats.to_dict()
+            lines.append(
+                '{:40s} {calls:8d} {total_ms:10.1f} {mean_us:9.1f} '
+                '{p50_us:9.0f} {p99_us:9.0f} {allocated_blocks:10d}'.format(
+                    name, **s))
+        return '\n'.join(lines)
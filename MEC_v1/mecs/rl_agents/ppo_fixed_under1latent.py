@@ -4,6 +4,7 @@ _parent = str(pathlib.Path(os.getcwd()).parent)
 sys.path.append(_parent)
 import torch
 import argparse
+import functools
 import json
 import numpy as np
 from datetime import datetime
@@ -14,8 +15,16 @@ from datetime import datetime
 from constants import *
 import environment_ppo_under1latent_cost1_univ as environment
 import pickle
-from rl.ppo_fixed_len import PPO
-from rl.ppo_utils import *
+from rl_networks.ppo_fixed_len import PPO, ActorCritic, device
+from rl_networks.ppo_utils import *
+from rl_networks.rollout_workers import RolloutWorkers, EvaluationWorkers
+
+
+# worker process 안에서도 env를 만들 수 있도록 module 최상위에 둠
+def make_env(task_rate, applications, use_beta, cost_type, edge_capability, cloud_capability, channel):
+    env = environment.MEC_v1(task_rate, *applications, use_beta=use_beta, cost_type=cost_type)
+    env.init_linked_pair(edge_capability, cloud_capability, channel)
+    return env
 
 
 def main():
@@ -41,13 +50,17 @@ def main():
 
     parser.add_argument('--update_timestep', default = 1000, metavar='N', help="update policy every n timesteps", type=int)
     parser.add_argument('--action_std', default = 0.5 , metavar='N', help="constant std for action distribution (Multivariate Normal)", type=float)
-    parser.add_argument('--K_epochs', default = 80  , metavar='N', help="update policy for K epochs")
+    parser.add_argument('--K_epochs', default = 80  , metavar='N', help="update policy for K epochs", type=int)
+    parser.add_argument('--minibatch_size', default = 250 , metavar='N', help="minibatch size for each epoch (0: full batch)", type=int)
+    parser.add_argument('--target_kl', default = 0.02 , metavar='N', help="stop the update early when approx KL exceeds 1.5*target_kl (0: never)", type=float)
     parser.add_argument('--eps_clip', default = 0.2 , metavar='N', help="clip parameter for PPO", type=float)
     parser.add_argument('--gamma', default = 0.9   , metavar='N', help="discount factor", type=float)
 
     parser.add_argument('--lr', default = 0.0003 , metavar='N', help="parameters for Adam optimizer", type=float)
     parser.add_argument('--betas', default = (0.9, 0.999), metavar='N')
-    parser.add_argument('--random_seed', default = 1, metavar='N', type=float)
+    parser.add_argument('--random_seed', default = 1, metavar='N', type=int)
+    parser.add_argument('--num_workers', default = 0, metavar='N', help="number of rollout worker processes (0: collect in this process)", type=int)
+    parser.add_argument('--eval_workers', default = 0, metavar='N', help="number of evaluation worker processes (0: evaluate in this process)", type=int)
     #############################################
 
     args = parser.parse_args()
@@ -75,11 +88,15 @@ def main():
     update_timestep = args.update_timestep
     action_std = args.action_std
     K_epochs = args.K_epochs
+    minibatch_size = args.minibatch_size
+    target_kl = args.target_kl
     eps_clip = args.eps_clip
     gamma = args.gamma
     lr = args.lr
     betas = args.betas
     random_seed = args.random_seed
+    num_workers = args.num_workers
+    eval_workers = args.eval_workers
     ##################################################################
 
     ############## save parameters ##############
@@ -97,8 +114,8 @@ def main():
             json.dump(args_dict, f, indent='\t')
     # import pdb; pdb.set_trace()
     # creating environment
-    env = environment.MEC_v1(task_rate, *applications, use_beta=use_beta, cost_type=cost_type)
-    state = env.init_for_sosam(edge_capability, cloud_capability, channel)
+    env_args = (task_rate, applications, use_beta, cost_type, edge_capability, cloud_capability, channel)
+    env = make_env(*env_args)
     state_dim = env.state_dim
     action_dim = env.action_dim
 
@@ -108,8 +125,9 @@ def main():
         # env.seed(random_seed)
         np.random.seed(random_seed)
 
-    memory = Memory()
-    ppo = PPO(state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip)
+    memory = RolloutBuffer(update_timestep, state_dim, action_dim, device)
+    ppo = PPO(state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip,
+              minibatch_size=minibatch_size, target_kl=target_kl)
 
     # logging variables
     running_reward = 0
@@ -117,9 +135,51 @@ def main():
     time_step = 0
     evaluations_empty_reward = []
     evaluations = []
+    update_stats = []
     # evaluations_empty_reward_1000 = []
     # evaluations_1000 = []
 
+    # evaluation episode들을 worker process에 나눠서 돌림
+    if eval_workers:
+        evaluators = EvaluationWorkers(ActorCritic, state_dim, action_dim, action_std, eval_workers)
+        evaluate = evaluators.evaluate
+    else:
+        evaluate = evaluate_policy_batched
+
+    # training loop with rollout workers : update_timestep을 num_workers가 나눠서 모음
+    if num_workers:
+        workers = RolloutWorkers(functools.partial(make_env, *env_args), ActorCritic, state_dim, action_dim, action_std, cloud_policy,
+            num_workers, update_timestep//num_workers, max_timesteps, seed=random_seed)
+        i_episode = 0
+        while i_episode < max_episodes:
+            episodes = workers.collect(ppo.policy_old, memory, device)
+            ppo.update(memory)
+            update_stats.append(ppo.update_stats)
+            memory.clear_memory()
+            for episode_reward, episode_length in episodes:
+                running_reward += episode_reward
+                avg_length += episode_length
+
+            evaluations_empty_reward.append(evaluate(env, ppo, cloud_policy, epsd_length=max_timesteps*2))
+            evaluations.append(evaluate(env, ppo, cloud_policy, epsd_length=max_timesteps*2, empty_reward=False))
+            if save:
+                np.save("{}/eval_empty_reward".format(eval_dir), evaluations_empty_reward)
+                np.save("{}/eval".format(eval_dir), evaluations)
+                with open("{}/update_stats.json".format(eval_dir), 'w') as f:
+                    json.dump(update_stats, f)
+            if save and (i_episode+len(episodes))//50 > i_episode//50:
+                ppo.save('env3_{}_{}'.format(i_episode+len(episodes), max_timesteps), directory=model_dir)
+
+            i_episode += len(episodes)
+            if episodes:
+                print('Episode {} \t Avg length: {} \t Avg reward: {}'.format(i_episode, int(avg_length/len(episodes)), int(running_reward/len(episodes))))
+            running_reward = 0
+            avg_length = 0
+        workers.close()
+        if eval_workers:
+            evaluators.close()
+        return
+
     # training loop
     for i_episode in range(1, max_episodes+1):
         state = env.reset()
@@ -141,7 +201,7 @@ def main():
                 print("---------------------------------------")
                 print("------action\t{}".format(action))
                 print("---------------------------------------")
-            state, cost, done = env.step(t, action, cloud_policy, silence=silence)
+            state, cost, done = env.step(action, cloud_policy)
             if t%250==0:
                 print("new_estimated arrival: {}".format(state[:8]))
                 print("new_just arrived: {}".format(state[8:16]))
@@ -160,6 +220,7 @@ def main():
             # update if its time
             if time_step % update_timestep == 0:
                 ppo.update(memory)
+                update_stats.append(ppo.update_stats)
                 memory.clear_memory()
                 time_step = 0
             running_reward += reward
@@ -174,13 +235,15 @@ def main():
 
         avg_length += t
         # import pdb; pdb.set_trace()
-        evaluations_empty_reward.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=max_timesteps*2))
-        evaluations.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=max_timesteps*2, empty_reward=False))
+        evaluations_empty_reward.append(evaluate(env, ppo, cloud_policy, epsd_length=max_timesteps*2))
+        evaluations.append(evaluate(env, ppo, cloud_policy, epsd_length=max_timesteps*2, empty_reward=False))
         # evaluations_empty_reward_1000.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=1000))
         # evaluations_1000.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=1000, empty_reward=False))
         if save:
             np.save("{}/eval_empty_reward".format(eval_dir), evaluations_empty_reward)
             np.save("{}/eval".format(eval_dir), evaluations)
+            with open("{}/update_stats.json".format(eval_dir), 'w') as f:
+                json.dump(update_stats, f)
         # np.save("{}/eval_empty_reward_1000".format(eval_dir), evaluations_empty_reward_1000)
         # np.save("{}/eval_1000".format(eval_dir), evaluations_1000)
         # stop training if avg_reward > solved_reward
@@ -201,6 +264,8 @@ def main():
             print('Episode {} \t Avg length: {} \t Avg reward: {}'.format(i_episode, avg_length, running_reward))
             running_reward = 0
             avg_length = 0
+    if eval_workers:
+        evaluators.close()
 
 if __name__ == '__main__':
     main()
@@ -41,13 +41,15 @@ def main():
 
     parser.add_argument('--update_timestep', default = 1000, metavar='N', help="update policy every n timesteps", type=int)
     parser.add_argument('--action_std', default = 0.5 , metavar='N', help="constant std for action distribution (Multivariate Normal)", type=float)
-    parser.add_argument('--K_epochs', default = 80  , metavar='N', help="update policy for K epochs")
+    parser.add_argument('--K_epochs', default = 80  , metavar='N', help="update policy for K epochs", type=int)
+    parser.add_argument('--minibatch_size', default = 250 , metavar='N', help="minibatch size for each epoch (0: full batch)", type=int)
+    parser.add_argument('--target_kl', default = 0.02 , metavar='N', help="stop the update early when approx KL exceeds 1.5*target_kl (0: never)", type=float)
     parser.add_argument('--eps_clip', default = 0.2 , metavar='N', help="clip parameter for PPO", type=float)
     parser.add_argument('--gamma', default = 0.9   , metavar='N', help="discount factor", type=float)
 
     parser.add_argument('--lr', default = 0.0003 , metavar='N', help="parameters for Adam optimizer", type=float)
     parser.add_argument('--betas', default = (0.9, 0.999), metavar='N')
-    parser.add_argument('--random_seed', default = 1, metavar='N', type=float)
+    parser.add_argument('--random_seed', default = 1, metavar='N', type=int)
     #############################################
 
     args = parser.parse_args()
@@ -75,6 +77,8 @@ def main():
     update_timestep = args.update_timestep
     action_std = args.action_std
     K_epochs = args.K_epochs
+    minibatch_size = args.minibatch_size
+    target_kl = args.target_kl
     eps_clip = args.eps_clip
     gamma = args.gamma
     lr = args.lr
@@ -111,7 +115,8 @@ def main():
         np.random.seed(random_seed)
 
     memory = Memory()
-    ppo = PPO(state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip)
+    ppo = PPO(state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip,
+              minibatch_size=minibatch_size, target_kl=target_kl)
 
     # logging variables
     running_reward = 0
@@ -119,6 +124,7 @@ def main():
     time_step = 0
     evaluations_empty_reward = []
     evaluations = []
+    update_stats = []
     # evaluations_empty_reward_1000 = []
     # evaluations_1000 = []
 
@@ -167,6 +173,7 @@ def main():
             # update if its time
             if time_step % update_timestep == 0:
                 ppo.update(memory)
+                update_stats.append(ppo.update_stats)
                 memory.clear_memory()
                 time_step = 0
             running_reward += reward
@@ -181,13 +188,15 @@ def main():
 
         avg_length += t
         # import pdb; pdb.set_trace()
-        evaluations_empty_reward.append(evaluate_policy_new_network(env, ppo, cloud_policy, memory, epsd_length=max_timesteps*2))
-        evaluations.append(evaluate_policy_new_network(env, ppo, cloud_policy, memory, epsd_length=max_timesteps*2, empty_reward=False))
+        evaluations_empty_reward.append(evaluate_policy_batched(env, ppo, cloud_policy, epsd_length=max_timesteps*2))
+        evaluations.append(evaluate_policy_batched(env, ppo, cloud_policy, epsd_length=max_timesteps*2, empty_reward=False))
         # evaluations_empty_reward_1000.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=1000))
         # evaluations_1000.append(evaluate_policy(env, ppo, cloud_policy, memory, epsd_length=1000, empty_reward=False))
         if save:
             np.save("{}/eval_empty_reward".format(eval_dir), evaluations_empty_reward)
             np.save("{}/eval".format(eval_dir), evaluations)
+            with open("{}/update_stats.json".format(eval_dir), 'w') as f:
+                json.dump(update_stats, f)
         # np.save("{}/eval_empty_reward_1000".format(eval_dir), evaluations_empty_reward_1000)
         # np.save("{}/eval_1000".format(eval_dir), evaluations_1000)
         # stop training if avg_reward > solved_reward
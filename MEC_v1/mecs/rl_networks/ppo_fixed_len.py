@@ -3,9 +3,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 from torch.distributions import MultivariateNormal
 import numpy as np
-import os, sys
+import os, sys, time
 sys.path.append(os.path.dirname(__file__))
-from ppo_utils import Memory
+from ppo_utils import Memory, RolloutBuffer
 
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
@@ -55,6 +55,13 @@ class ActorCritic(nn.Module):
 
         return action.detach()
 
+    def act_deterministic(self, state):
+        x = F.tanh(self.affine1(state))
+        x = F.tanh(self.affine2(x))
+        alpha = self.alpha_action_mean(x)
+        beta = self.beta_action_mean(x)
+        return torch.cat((alpha,beta),dim=1)
+
     def evaluate(self, state, action):
         # import pdb; pdb.set_trace()
         x = F.tanh(self.affine1(state))
@@ -76,7 +83,7 @@ class ActorCritic(nn.Module):
         return action_logprobs, torch.squeeze(state_value), dist_entropy
 
 class PPO:
-    def __init__(self, state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip, c1=0.01, c2=1):
+    def __init__(self, state_dim, action_dim, action_std, lr, betas, gamma, K_epochs, eps_clip, c1=0.01, c2=1, minibatch_size=None, target_kl=None):
         self.lr = lr
         self.betas = betas
         self.gamma = gamma
@@ -86,11 +93,15 @@ class PPO:
         self.policy = ActorCritic(state_dim, action_dim, action_std).to(device)
         self.optimizer = torch.optim.Adam(self.policy.parameters(), lr=lr, betas=betas)
         self.policy_old = ActorCritic(state_dim, action_dim, action_std).to(device)
+        self.policy_old.load_state_dict(self.policy.state_dict())
 
         self.MseLoss = nn.MSELoss()
 
         self.c1 = c1
         self.c2 = c2
+        self.minibatch_size = minibatch_size
+        self.target_kl = target_kl
+        self.update_stats = []
 
     def select_action(self, state, memory):
         state = torch.FloatTensor(state.reshape(1, -1)).to(device)
@@ -98,42 +109,71 @@ class PPO:
         action = F.softmax(action.reshape(2,-1)/2).cpu().data.numpy().flatten()
         return action
 
+    # evaluation용 : memory에 쌓지 않고 여러 state의 평균 action을 한 번에 구함
+    def select_actions(self, states):
+        states = torch.FloatTensor(np.asarray(states).reshape(len(states), -1)).to(device)
+        with torch.no_grad():
+            action = self.policy_old.act_deterministic(states)
+        action = F.softmax(action.reshape(len(states),2,-1)/2, dim=2)
+        return action.reshape(len(states),-1).cpu().numpy()
+
     def update(self, memory, c1=0.01, c2=1):
-        # Monte Carlo estimate of rewards:
-        rewards = []
-        discounted_reward = 0
-        for reward in reversed(memory.rewards):
-            discounted_reward = reward + (self.gamma * discounted_reward)
-            rewards.insert(0, discounted_reward)
+        # Monte Carlo estimate of rewards (memory : Memory or RolloutBuffer):
+        rewards = memory.discounted_returns(self.gamma)
 
         # Normalizing the rewards:
-        rewards = torch.tensor(rewards).to(device)
+        rewards = torch.as_tensor(rewards).to(device)
         rewards = (rewards - rewards.mean()) / (rewards.std() + 1e-5)
 
         # convert list to tensor
-        old_states = torch.squeeze(torch.stack(memory.states).to(device)).detach()
-        old_actions = torch.squeeze(torch.stack(memory.actions).to(device)).detach()
-        old_logprobs = torch.squeeze(torch.stack(memory.logprobs)).to(device).detach()
+        old_states, old_actions, old_logprobs = memory.get_tensors(device)
 
         # Optimize policy for K epochs:
-        for _ in range(self.K_epochs):
-            # Evaluating old actions and values :
-            logprobs, state_values, dist_entropy = self.policy.evaluate(old_states, old_actions)
-
-            # Finding the ratio (pi_theta / pi_theta__old):
-            ratios = torch.exp(logprobs - old_logprobs.detach())
-
-            # Finding Surrogate Loss:
-            advantages = rewards - state_values.detach()
-            surr1 = ratios * advantages
-            surr2 = torch.clamp(ratios, 1-self.eps_clip, 1+self.eps_clip) * advantages
-            # loss = -torch.min(surr1, surr2) + 0.5*self.MseLoss(state_values, rewards) - 0.01*dist_entropy
-            loss = -torch.min(surr1, surr2) + self.c1*self.MseLoss(state_values, rewards) - self.c2*dist_entropy
-
-            # take gradient step
-            self.optimizer.zero_grad()
-            loss.mean().backward()
-            self.optimizer.step()
+        # minibatch_size가 없으면 원래처럼 전체 batch를 섞지 않고 한 번에 씀.
+        # target_kl이 있으면 approx KL이 1.5*target_kl을 넘는 minibatch에서 gradient step 없이 멈춤.
+        n = len(old_states)
+        minibatch_size = self.minibatch_size or n
+        self.update_stats = []
+        stop = False
+        for epoch in range(self.K_epochs):
+            start = time.time()
+            if minibatch_size >= n:
+                batches = [slice(None)]
+            else:
+                batches = torch.randperm(n, device=device).split(minibatch_size)
+            kls, clip_fractions, losses = [], [], []
+            for batch in batches:
+                # Evaluating old actions and values :
+                logprobs, state_values, dist_entropy = self.policy.evaluate(old_states[batch], old_actions[batch])
+
+                # Finding the ratio (pi_theta / pi_theta__old):
+                log_ratios = logprobs - old_logprobs[batch].detach()
+                ratios = torch.exp(log_ratios)
+
+                # Finding Surrogate Loss:
+                advantages = rewards[batch] - state_values.detach()
+                surr1 = ratios * advantages
+                surr2 = torch.clamp(ratios, 1-self.eps_clip, 1+self.eps_clip) * advantages
+                # loss = -torch.min(surr1, surr2) + 0.5*self.MseLoss(state_values, rewards) - 0.01*dist_entropy
+                loss = -torch.min(surr1, surr2) + self.c1*self.MseLoss(state_values, rewards[batch]) - self.c2*dist_entropy
+
+                with torch.no_grad():
+                    kls.append(((ratios - 1) - log_ratios).mean().item())
+                    clip_fractions.append(((ratios - 1).abs() > self.eps_clip).float().mean().item())
+                    losses.append(loss.mean().item())
+                if self.target_kl and kls[-1] > 1.5*self.target_kl:
+                    stop = True
+                    break
+
+                # take gradient step
+                self.optimizer.zero_grad()
+                loss.mean().backward()
+                self.optimizer.step()
+
+            self.update_stats.append({'epoch': epoch, 'time': time.time()-start, 'approx_kl': np.mean(kls),
+                'clip_fraction': np.mean(clip_fractions), 'loss': np.mean(losses)})
+            if stop:
+                break
 
         # Copy new weights into old policy:
         self.policy_old.load_state_dict(self.policy.state_dict())
@@ -1,5 +1,7 @@
 import copy
 import numpy as np
+import torch
+from scipy import signal
 
 class Memory:
     def __init__(self):
@@ -14,10 +16,159 @@ class Memory:
         del self.logprobs[:]
         del self.rewards[:]
 
-def evaluate_policy_new_network(env, policy, cloud_policy, memory, epsd_length=1000, eval_episodes=10, empty_reward=True):
+    # Monte Carlo estimate of rewards
+    def discounted_returns(self, gamma):
+        returns, _ = compute_returns(self.rewards, gamma)
+        return returns
+
+    def get_tensors(self, device):
+        old_states = torch.squeeze(torch.stack(self.states).to(device)).detach()
+        old_actions = torch.squeeze(torch.stack(self.actions).to(device)).detach()
+        old_logprobs = torch.squeeze(torch.stack(self.logprobs)).to(device).detach()
+        return old_states, old_actions, old_logprobs
+
+
+# y[t] = x[t] + discount*y[t+1]. is_terminals[t]가 True인 t에서 끊어서 (y[t] = x[t]) episode마다
+# 뒤집은 구간에 lfilter를 한 번씩 씀
+def _discounted_sum(x, discount, is_terminals=None):
+    y = np.empty(len(x))
+    stops = [len(x)] if is_terminals is None else list(np.flatnonzero(np.asarray(is_terminals, dtype=bool))+1) + [len(x)]
+    start = 0
+    for stop in stops:
+        if stop > start:
+            y[start:stop] = signal.lfilter([1], [1, -discount], x[start:stop][::-1])[::-1]
+        start = stop
+    return y
+
+
+# discounted return과 (values가 있으면) GAE advantage.
+# is_terminals[t]가 True면 t에서 episode가 끝난 것으로 보고 그 뒤의 reward와 value를 더하지 않음.
+def compute_returns(rewards, gamma, is_terminals=None, values=None, last_value=0, gae_lambda=0.95):
+    rewards = np.asarray(rewards, dtype=float)
+    returns = _discounted_sum(rewards, gamma, is_terminals)
+    advantages = None
+    if values is not None:
+        values = np.asarray(values, dtype=float).reshape(-1)
+        next_values = np.append(values[1:], last_value)
+        if is_terminals is not None:
+            next_values[np.asarray(is_terminals, dtype=bool)] = 0
+        deltas = rewards + gamma*next_values - values
+        advantages = _discounted_sum(deltas, gamma*gae_lambda, is_terminals)
+    return returns, advantages
+
+
+# Memory의 list 대신 쓰는 미리 할당된 tensor. list처럼 append/extend/del을 쓸 수 있음.
+# capacity를 넘으면 두 배로 늘림.
+class _Column:
+    def __init__(self, storage, scalar=False):
+        self.storage = storage
+        self.scalar = scalar
+        self.size = 0
+
+    def _grow(self):
+        self.storage = torch.cat((self.storage, torch.zeros_like(self.storage)))
+
+    def append(self, value):
+        if self.size == len(self.storage):
+            self._grow()
+        self.storage[self.size] = torch.as_tensor(value).detach().reshape(self.storage.shape[1:])
+        self.size += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def view(self):
+        return self.storage[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if self.scalar:
+            return self.storage[index].item()
+        # Memory에 들어가던 것과 같은 (1, dim) 모양
+        return self.storage[index:index+1]
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    # index 하나나 slice를 지우고 남은 row를 앞으로 당김
+    def __delitem__(self, index):
+        if index == slice(None):
+            self.size = 0
+            return
+        if isinstance(index, slice):
+            removed = list(range(*index.indices(self.size)))
+        else:
+            if index < 0:
+                index += self.size
+            if not 0 <= index < self.size:
+                raise IndexError('column index out of range')
+            removed = [index]
+        keep = torch.ones(self.size, dtype=torch.bool, device=self.storage.device)
+        keep[removed] = False
+        kept = self.storage[:self.size][keep]
+        self.storage[:len(kept)] = kept
+        self.size = len(kept)
+
+
+# Memory와 같은 방식으로 쓰지만, step마다 tensor를 list에 쌓는 대신 (T, dim) tensor에 index로 씀.
+class RolloutBuffer:
+    def __init__(self, capacity, state_dim, action_dim, device=torch.device("cpu")):
+        self.states = _Column(torch.zeros(capacity, state_dim, device=device))
+        self.actions = _Column(torch.zeros(capacity, action_dim, device=device))
+        self.logprobs = _Column(torch.zeros(capacity, device=device))
+        self.rewards = _Column(torch.zeros(capacity, dtype=torch.float64), scalar=True)
+        self.is_terminals = _Column(torch.zeros(capacity, dtype=torch.bool), scalar=True)
+
+    def clear_memory(self):
+        del self.actions[:]
+        del self.states[:]
+        del self.logprobs[:]
+        del self.rewards[:]
+        del self.is_terminals[:]
+
+    # is_terminals를 rewards와 같이 채웠을 때만 episode 경계에서 끊음
+    def discounted_returns(self, gamma):
+        is_terminals = None
+        if len(self.is_terminals) == len(self.rewards):
+            is_terminals = self.is_terminals.view().numpy()
+        returns, _ = compute_returns(self.rewards.view().numpy(), gamma, is_terminals)
+        return returns
+
+    def compute_returns_and_advantages(self, gamma, values, last_value=0, gae_lambda=0.95):
+        is_terminals = None
+        if len(self.is_terminals) == len(self.rewards):
+            is_terminals = self.is_terminals.view().numpy()
+        return compute_returns(self.rewards.view().numpy(), gamma, is_terminals, values, last_value, gae_lambda)
+
+    def get_tensors(self, device):
+        return self.states.view().to(device).detach(), self.actions.view().to(device).detach(), self.logprobs.view().to(device).detach()
+
+# trace (arrival_traces.ArrivalTrace)를 주면 매번 trace의 0, 1, ... 번째 episode로 평가하므로
+# 어느 policy든 같은 도착을 봄. 끝나면 env의 trace 설정을 원래대로 돌려놓음.
+def _use_trace(env, trace):
+    if trace is None:
+        return None
+    previous = (env.trace, env.trace_next)
+    env.use_trace(trace)
+    return previous
+
+def _restore_trace(env, previous):
+    if previous is not None:
+        env.use_trace(*previous)
+
+def evaluate_policy_new_network(env, policy, cloud_policy, memory, epsd_length=1000, eval_episodes=10, empty_reward=True, trace=None):
     print("---------------------------------------")
     print("EVALUATION STARTED")
     print("---------------------------------------")
+    previous_trace = _use_trace(env, trace)
     eval_mem = Memory()
     # import pdb; pdb.set_trace()
     eval_mem.actions = list(memory.actions)
@@ -46,12 +197,14 @@ def evaluate_policy_new_network(env, policy, cloud_policy, memory, epsd_length=1
     print("Evaluation over %d episodes: %f" % (eval_episodes, avg_reward))
     print("---------------------------------------")
     del eval_mem
+    _restore_trace(env, previous_trace)
     return avg_rewards
 
-def evaluate_policy(env, policy, cloud_policy, memory, epsd_length=1000, eval_episodes=10, empty_reward=True):
+def evaluate_policy(env, policy, cloud_policy, memory, epsd_length=1000, eval_episodes=10, empty_reward=True, trace=None):
     print("---------------------------------------")
     print("EVALUATION STARTED")
     print("---------------------------------------")
+    previous_trace = _use_trace(env, trace)
     eval_mem = Memory()
     # import pdb; pdb.set_trace()
     eval_mem.actions = list(memory.actions)
@@ -80,4 +233,39 @@ def evaluate_policy(env, policy, cloud_policy, memory, epsd_length=1000, eval_ep
     print("Evaluation over %d episodes: %f" % (eval_episodes, avg_reward))
     print("---------------------------------------")
     del eval_mem
+    _restore_trace(env, previous_trace)
+    return avg_rewards
+
+
+# evaluate_policy와 같은 reward list를 돌려주지만 memory를 복사하거나 쌓지 않음.
+# env를 eval_episodes개 복사해서 동시에 돌리고, 매 step 살아있는 episode들의 state를 한 번에 policy에 넣어
+# 평균 action(deterministic)으로 진행함.
+def evaluate_policy_batched(env, policy, cloud_policy, epsd_length=1000, eval_episodes=10, empty_reward=True, trace=None):
+    print("---------------------------------------")
+    print("EVALUATION STARTED")
+    print("---------------------------------------")
+    envs = [copy.deepcopy(env) for _ in range(eval_episodes)]
+    if trace is not None:
+        for i, e in enumerate(envs):
+            e.use_trace(trace, i)
+    obs = [e.reset(empty_reward) for e in envs]
+    avg_rewards = [0]*eval_episodes
+    running = list(range(eval_episodes))
+    for t in range(epsd_length):
+        actions = policy.select_actions([obs[i] for i in running])
+        still_running = []
+        for i, action in zip(running, actions):
+            obs[i], cost, failed = envs[i].step(action.reshape(1,-1), cloud_policy)
+            avg_rewards[i] -= cost
+            if failed or t==epsd_length-1:
+                print("episode length {}".format(t))
+            else:
+                still_running.append(i)
+        running = still_running
+        if not running:
+            break
+
+    print("---------------------------------------")
+    print("Evaluation over %d episodes: %f" % (eval_episodes, np.mean(avg_rewards)))
+    print("---------------------------------------")
     return avg_rewards
@@ -0,0 +1,189 @@
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torch.nn.functional as F
+import os, sys
+sys.path.append(os.path.dirname(__file__))
+from ppo_utils import Memory
+
+# rollout을 K개의 worker process에서 나눠서 모음.
+# worker마다 자기 env와 seed를 가지고 policy_old를 cpu에서 돌려서 (state, action, logprob, reward)를
+# shared memory tensor에 써 놓으면, learner가 그걸 Memory에 합쳐서 PPO.update 함.
+# env와 policy는 worker 안에서 make_env(), actor_critic(state_dim, action_dim, action_std)로 만들기 때문에
+# 둘 다 pickle 가능해야 함 (module 최상위 함수/class나 functools.partial).
+
+def _env_step(env, t, action, cloud_policy):
+    if hasattr(env, 'step_together'):
+        return env.step_together(t, action, cloud_policy)
+    return env.step(action, cloud_policy)
+
+
+def _worker(index, make_env, actor_critic, policy_args, cloud_policy, steps, max_timesteps, seed, buffers, commands, results):
+    torch.set_num_threads(1)
+    # worker는 항상 cpu에서 돌림
+    sys.modules[actor_critic.__module__].device = torch.device("cpu")
+    if seed is not None:
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+
+    env = make_env()
+    policy = actor_critic(*policy_args)
+    memory = Memory()
+    state = env.reset()
+    t = 0
+    episode_reward = 0
+    while True:
+        state_dict = commands.get()
+        if state_dict is None:
+            break
+        policy.load_state_dict(state_dict)
+        episode_rewards, episode_lengths = [], []
+        with torch.no_grad():
+            for i in range(steps):
+                action = policy.act(torch.FloatTensor(state.reshape(1, -1)), memory)
+                action = F.softmax(action.reshape(2,-1)/2, dim=1).numpy().flatten()
+                state, cost, done = _env_step(env, t, action.reshape(1,-1), cloud_policy)
+                buffers['rewards'][i] = -cost
+                episode_reward -= cost
+                t += 1
+                if done or t == max_timesteps:
+                    buffers['dones'][i] = True
+                    episode_rewards.append(episode_reward)
+                    episode_lengths.append(t)
+                    state = env.reset()
+                    t = 0
+                    episode_reward = 0
+                else:
+                    buffers['dones'][i] = False
+        # collect()가 worker들의 chunk를 이어 붙이므로 episode 중간에 끝난 chunk도 마지막 step을 끝으로 표시함.
+        # 그러지 않으면 compute_returns가 다음 worker의 reward까지 이어서 더함
+        buffers['dones'][steps-1] = True
+        buffers['states'].copy_(torch.cat(memory.states))
+        buffers['actions'].copy_(torch.cat(memory.actions))
+        buffers['logprobs'].copy_(torch.cat(memory.logprobs))
+        memory.clear_memory()
+        results.put((index, episode_rewards, episode_lengths))
+
+
+class RolloutWorkers:
+    def __init__(self, make_env, actor_critic, state_dim, action_dim, action_std, cloud_policy, num_workers, steps_per_worker,
+                 max_timesteps, seed=None):
+        self.num_workers = num_workers
+        self.steps_per_worker = steps_per_worker
+        ctx = mp.get_context('spawn')
+        self.results = ctx.Queue()
+        self.commands = []
+        self.buffers = []
+        self.processes = []
+        for index in range(num_workers):
+            buffers = {
+                'states' : torch.zeros(steps_per_worker, state_dim).share_memory_(),
+                'actions' : torch.zeros(steps_per_worker, action_dim).share_memory_(),
+                'logprobs' : torch.zeros(steps_per_worker).share_memory_(),
+                'rewards' : torch.zeros(steps_per_worker, dtype=torch.float64).share_memory_(),
+                'dones' : torch.zeros(steps_per_worker, dtype=torch.bool).share_memory_()
+            }
+            commands = ctx.Queue()
+            worker_seed = None if seed is None else int(seed)+index
+            process = ctx.Process(target=_worker, args=(index, make_env, actor_critic, (state_dim, action_dim, action_std),
+                cloud_policy, steps_per_worker, max_timesteps, worker_seed, buffers, commands, self.results), daemon=True)
+            process.start()
+            self.buffers.append(buffers)
+            self.commands.append(commands)
+            self.processes.append(process)
+
+    # 모든 worker가 policy로 steps_per_worker씩 모은 것을 worker 순서대로 memory 뒤에 붙임.
+    # 이번에 끝난 episode들의 (reward, length) 리스트를 돌려줌.
+    def collect(self, policy, memory, device=torch.device("cpu")):
+        state_dict = {k: v.detach().cpu() for k, v in policy.state_dict().items()}
+        for commands in self.commands:
+            commands.put(state_dict)
+        finished = {}
+        for _ in range(self.num_workers):
+            index, episode_rewards, episode_lengths = self.results.get()
+            finished[index] = list(zip(episode_rewards, episode_lengths))
+
+        for buffers in self.buffers:
+            memory.states.extend(buffers['states'].clone().to(device).unsqueeze(1).unbind(0))
+            memory.actions.extend(buffers['actions'].clone().to(device).unsqueeze(1).unbind(0))
+            memory.logprobs.extend(buffers['logprobs'].clone().to(device).unsqueeze(1).unbind(0))
+            memory.rewards.extend(buffers['rewards'].tolist())
+            if hasattr(memory, 'is_terminals'):
+                memory.is_terminals.extend(buffers['dones'].tolist())
+        return [episode for index in range(self.num_workers) for episode in finished[index]]
+
+    def close(self):
+        for commands in self.commands:
+            commands.put(None)
+        for process in self.processes:
+            process.join()
+
+
+def _env_info(env):
+    return type(env), env.task_rate, tuple(env.applications), env.use_beta, env.cost_type, list(env.reset_info)
+
+
+def _make_env_from_info(env_class, task_rate, applications, use_beta, cost_type, reset_info):
+    env = env_class(task_rate, *applications, use_beta=use_beta, cost_type=cost_type)
+    for info in reset_info:
+        env.init_linked_pair(*info)
+    return env
+
+
+# evaluation worker : episode 하나를 policy 평균 action(deterministic)으로 돌림.
+# env는 객체 대신 만들 때 썼던 인자와 reset_info만 받아서 worker 안에서 다시 만듦.
+_eval_policy = None
+
+def _init_eval_worker(actor_critic, policy_args):
+    global _eval_policy
+    torch.set_num_threads(1)
+    sys.modules[actor_critic.__module__].device = torch.device("cpu")
+    _eval_policy = actor_critic(*policy_args)
+
+
+def _evaluate_episode(args):
+    state_dict, env_info, cloud_policy, epsd_length, empty_reward, seed = args
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    _eval_policy.load_state_dict(state_dict)
+    env = _make_env_from_info(*env_info)
+    obs = env.reset(empty_reward)
+    avg_reward = 0
+    with torch.no_grad():
+        for t in range(epsd_length):
+            action = _eval_policy.act_deterministic(torch.FloatTensor(obs.reshape(1, -1)))
+            action = F.softmax(action.reshape(2,-1)/2, dim=1).numpy().flatten()
+            obs, cost, failed = _env_step(env, t, action.reshape(1,-1), cloud_policy)
+            avg_reward -= cost
+            if failed:
+                break
+    return avg_reward, t
+
+
+class EvaluationWorkers:
+    def __init__(self, actor_critic, state_dim, action_dim, action_std, num_workers):
+        ctx = mp.get_context('spawn')
+        self.pool = ctx.Pool(num_workers, initializer=_init_eval_worker, initargs=(actor_critic, (state_dim, action_dim, action_std)))
+
+    # evaluate_policy_batched와 같은 모양으로 부를 수 있음. episode마다 seed를 따로 줘서 worker 수와 상관없이 결과가 같음.
+    def evaluate(self, env, policy, cloud_policy, epsd_length=1000, eval_episodes=10, empty_reward=True, seed=None):
+        print("---------------------------------------")
+        print("EVALUATION STARTED")
+        print("---------------------------------------")
+        if seed is None:
+            seed = np.random.randint(2**31 - eval_episodes)
+        state_dict = {k: v.detach().cpu() for k, v in policy.policy_old.state_dict().items()}
+        env_info = _env_info(env)
+        jobs = [(state_dict, env_info, cloud_policy, epsd_length, empty_reward, seed+i) for i in range(eval_episodes)]
+        avg_rewards = []
+        for avg_reward, t in self.pool.map(_evaluate_episode, jobs):
+            print("episode length {}".format(t))
+            avg_rewards.append(avg_reward)
+        print("---------------------------------------")
+        print("Evaluation over %d episodes: %f" % (eval_episodes, np.mean(avg_rewards)))
+        print("---------------------------------------")
+        return avg_rewards
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -1,10 +1,10 @@
 import logging
-import uuid
 import copy
 import numpy as np
 
 import applications
 from task import Task
+from id_provider import new_id
 from task_queue import TaskQueue
 
 logger = logging.getLogger(__name__)
@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 # class ServerNode(Node):
 class ServerNode:
-    def __init__(self, computation_capability, is_random_task_generating=False):
+    def __init__(self, computation_capability, is_random_task_generating=False, generation_block=1, size_dist='deterministic'):
         super().__init__()
         # self.map = whole_map
         # self.x = x
@@ -20,13 +20,18 @@ class ServerNode:
         # 연결된 uuid와 그와 통신하는 protocol과 그 해당하는 rate?이 필요함..protocol에 포함될수도.
         self.links_to_lower = {} # 하위 device와 통신
         self.links_to_higher = {} # 상위 device와 통신
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.mobility = False
         # self.schedule_method = schedule_method
         self.computation_capability = computation_capability  # clocks/tick
         self.number_of_applications = 0
         self.queue_list = {} # 어플마다 각자의 큐가 필요함.
         self.is_random_task_generating = is_random_task_generating
+        # random_task_generation이 몇 step 분량의 poisson 개수를 미리 뽑아 둘지 (applications.ArrivalGenerator)
+        self.generation_block = generation_block
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        self.arrival_generator = None
 
     def __del__(self):
         iter = list(self.queue_list.keys())
@@ -38,6 +43,7 @@ class ServerNode:
         for application_type in application_types:
             self.queue_list[application_type] = TaskQueue(application_type)
             self.number_of_applications += 1
+        self.arrival_generator = None
         return
 
     # 모든 application에 대한 액션 alpha, 실제 활용한 총 cpu 비율 return
@@ -120,27 +126,16 @@ class ServerNode:
     # 사실 하위 device에서 offload 받은 task를 전해 받아야 함.
     # 일단 simulation을 위해 그냥 만들어 놓음. 하..
     def random_task_generation(self, task_rate, arrival_timestamp, *app_types):
-        app_type_list = applications.app_type_list()
-        app_type_pop = applications.app_type_pop()
-        this_app_type_list = list(self.queue_list.keys())
-        random_id = uuid.uuid4()
-        # queue_list = {}
-        # task_type = np.random.choice(app_type_list, app_type_pop)
+        if self.arrival_generator is None:
+            self.arrival_generator = applications.ArrivalGenerator(self.queue_list, self.generation_block, self.size_dist)
+        random_id = new_id()
         arrival_size = np.zeros(len(app_types))
         failed_to_generate = 0
-        for app_type, population in app_type_pop:
-            if app_type in this_app_type_list:
-                data_size = np.random.poisson(task_rate*population)*applications.arrival_bits(app_type)
-                if data_size >0:
-                    task = Task(app_type, data_size, client_index = random_id.hex, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
-                    failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
-                    arrival_size[app_type-1]= data_size
-                    # print("arrival of app_type{} : {}".format(app_type, data_size))
-                else:
-                    pass
-                    # print("no arrival of app_type{} occured".format(app_type))
-            else:
-                pass
+        for app_type, data_size in self.arrival_generator.next(task_rate):
+            if data_size > 0:
+                task = Task(app_type, data_size, client_index = random_id, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
+                failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
+                arrival_size[app_type-1]= data_size
         # self.arrival_size_buffer.add(arrival_size)
         return arrival_size, failed_to_generate
     #
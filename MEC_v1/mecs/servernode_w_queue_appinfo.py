@@ -1,10 +1,10 @@
 import logging
-import uuid
 import copy
 import numpy as np
 
 import applications
 from task import Task
+from id_provider import new_id
 from task_queue import TaskQueue
 
 logger = logging.getLogger(__name__)
@@ -12,12 +12,12 @@ logger = logging.getLogger(__name__)
 
 # class ServerNode(Node):
 class ServerNode:
-    def __init__(self, computational_capability, is_random_task_generating=False):
+    def __init__(self, computational_capability, is_random_task_generating=False, generation_block=1, size_dist='deterministic'):
         super().__init__()
         # self.map = whole_map
         # self.x = x
         # self.y = y
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         # dict ( id of linked node : { 'node' : obj. of the linked node, 'channel' : channel between this node and the linked node } )
         self.links_to_lower = {} # 하위 device와 통신
         self.links_to_higher = {} # 상위 device와 통신
@@ -27,6 +27,17 @@ class ServerNode:
         self.number_of_applications = 0
         self.queue_list = {} # 어플마다 각자의 큐가 필요함.
         self.is_random_task_generating = is_random_task_generating
+        # random_task_generation이 몇 step 분량의 poisson 개수를 미리 뽑아 둘지 (applications.ArrivalGenerator)
+        self.generation_block = generation_block
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        # 도착을 뽑을 np.random.RandomState와 그 size sampler cache. None이면 np.random (env.set_rng)
+        self.rng = None
+        self.sampler_cache = None
+        self.arrival_generator = None
+        # get_status의 cache. (key, state list)와 app_type -> (key, queue 하나의 값들)
+        self.status_cache = None
+        self.queue_status_cache = {}
 
     def __del__(self):
         iter = list(self.queue_list.keys())
@@ -38,6 +49,7 @@ class ServerNode:
         for application_type in application_types:
             self.queue_list[application_type] = TaskQueue(application_type)
             self.number_of_applications += 1
+        self.arrival_generator = None
         return
 
     # 모든 application에 대한 액션 alpha, 실제 활용한 총 cpu 비율 return
@@ -119,27 +131,21 @@ class ServerNode:
     # 사실 하위 device에서 offload 받은 task를 전해 받아야 함.
     # 일단 simulation을 위해 그냥 만들어 놓음. 하..
     def random_task_generation(self, task_rate, arrival_timestamp, *app_types):
-        app_type_list = applications.app_type_list()
-        app_type_pop = applications.app_type_pop()
-        this_app_type_list = list(self.queue_list.keys())
-        random_id = uuid.uuid4()
-        # queue_list = {}
-        # task_type = np.random.choice(app_type_list, app_type_pop)
+        if self.arrival_generator is None:
+            self.arrival_generator = applications.ArrivalGenerator(self.queue_list, self.generation_block, self.size_dist,
+                                                                   self.rng, self.sampler_cache)
+        return self.task_arrival(self.arrival_generator.next(task_rate), arrival_timestamp, *app_types)
+
+    # [(app type, 도착한 총 bit 수)]를 queue에 넣음. random_task_generation과 trace replay (MEC_v1.use_trace)가 같이 씀
+    def task_arrival(self, arrivals, arrival_timestamp, *app_types):
+        random_id = new_id()
         arrival_size = np.zeros(len(app_types))
         failed_to_generate = 0
-        for app_type, population in app_type_pop:
-            if app_type in this_app_type_list:
-                data_size = np.random.poisson(task_rate*population)*applications.arrival_bits(app_type)
-                if data_size >0:
-                    task = Task(app_type, data_size, client_index = random_id.hex, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
-                    failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
-                    arrival_size[app_type-1]= data_size
-                    # print("arrival of app_type{} : {}".format(app_type, data_size))
-                else:
-                    pass
-                    # print("no arrival of app_type{} occured".format(app_type))
-            else:
-                pass
+        for app_type, data_size in arrivals:
+            if data_size > 0:
+                task = Task(app_type, data_size, client_index = random_id, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
+                failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
+                arrival_size[app_type-1]= data_size
         # self.arrival_size_buffer.add(arrival_size)
         return arrival_size, failed_to_generate
     #
@@ -183,6 +189,23 @@ class ServerNode:
     #                 index, task.computation_over, task.data_size,
     #                 task.client_index)
 
+    # queue들과 미리 뽑아 둔 도착 개수 (ArrivalGenerator)의 상태. link와 capability는 바뀌지 않으므로 넣지 않음
+    def snapshot(self):
+        generator = self.arrival_generator
+        return {'queues': {app_type: queue.snapshot() for app_type, queue in self.queue_list.items()},
+                'generator': None if generator is None else (generator.task_rate, generator.counts, generator.next_row)}
+
+    def restore(self, state):
+        for app_type, queue_state in state['queues'].items():
+            self.queue_list[app_type].restore(queue_state)
+        self.arrival_generator = None
+        if state['generator'] is not None:
+            self.arrival_generator = applications.ArrivalGenerator(self.queue_list, self.generation_block, self.size_dist,
+                                                                   self.rng, self.sampler_cache)
+            self.arrival_generator.task_rate, self.arrival_generator.counts, self.arrival_generator.next_row = state['generator']
+        self.status_cache = None
+        self.queue_status_cache = {}
+
     def get_higher_node_ids(self):
         return list(self.links_to_higher.keys())
 
@@ -206,9 +229,16 @@ class ServerNode:
         return list(self.queue_list.keys())
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
+    # queue마다 (version, time, estimate_interval)이 같으면 지난번 값을 다시 씀.
+    # 바뀐 queue가 하나도 없으면 (dirty가 아니면) 만들어 둔 state list를 그대로 돌려줌.
     def get_status(self, time, estimate_interval=100, involve_capability=False):
+        versions = tuple(queue.version for queue in self.queue_list.values())
+        key = (time, estimate_interval, involve_capability, versions)
+        if self.status_cache is not None and self.status_cache[0] == key:
+            return list(self.status_cache[1])
+
         queue_estimated_arrivals = np.zeros(8)
         queue_arrivals = np.zeros(8)
         queue_lengths = np.zeros(8)
@@ -216,16 +246,23 @@ class ServerNode:
         app_info = np.zeros(8)
         # arrival_rates = np.zeros(8)
         for app_type, queue in self.queue_list.items():
-            queue_estimated_arrivals[app_type-1] = queue.mean_arrival(time, estimate_interval)
-            queue_arrivals[app_type-1] = queue.last_arrival(time)
-            queue_lengths[app_type-1] = queue.get_length()
-            queue_exploded[app_type-1] = queue.is_exploded()
-            app_info[app_type-1] = applications.app_info[app_type]["workload"]
+            queue_key = (queue.version, time, estimate_interval)
+            cached = self.queue_status_cache.get(app_type)
+            if cached is None or cached[0] != queue_key:
+                cached = (queue_key, (queue.mean_arrival(time, estimate_interval), queue.last_arrival(time),
+                                      queue.get_length(), queue.is_exploded(),
+                                      applications.app_info[app_type]["workload"]))
+                self.queue_status_cache[app_type] = cached
+            i = app_type-1
+            queue_estimated_arrivals[i], queue_arrivals[i], queue_lengths[i], queue_exploded[i], app_info[i] = cached[1]
             # if queue.is_exploded()>0:
             #     import pdb; pdb.set_trace()
             # arrival_rates[queue.app_type-1] = queue.estimate_arrival_rate()
         # 아 채널 스테이트도 받아와야 하는데 ㅠㅠ 일단 메인에서 받는다
         if involve_capability:
-            return list(queue_lengths) + [self.computational_capability/GHZ]
-        return list(queue_estimated_arrivals)+list(queue_arrivals)+list(queue_lengths)+list(queue_exploded)+list(app_info)
+            status = list(queue_lengths) + [self.computational_capability/GHZ]
+        else:
+            status = list(queue_estimated_arrivals)+list(queue_arrivals)+list(queue_lengths)+list(queue_exploded)+list(app_info)
+        self.status_cache = (key, status)
+        return list(status)
         # return list(queue_lengths) + [self.computational_capability/1000000000]
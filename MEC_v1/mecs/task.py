@@ -1,8 +1,13 @@
 import uuid
-import copy
+import numpy as np
 import applications
+from id_provider import new_id
 
 class Task(object):
+    __slots__ = ('client_index', 'server_index', 'application_type', 'data_size', 'is_start', 'computation_over', 'uuid',
+                 'received_data_size', 'parent_uuid', 'child_uuid', 'arrival_timestamp', 'start_timestamp', 'end_timestamp',
+                 'share')
+
     def __init__(self, application_type, data_size, client_index = None, server_index = None, arrival_timestamp=None):
         self.client_index = client_index # 이게 오프로드된 작업이라면 요청한 client가 있지
         self.server_index = server_index # 이게 여기서 오프로드시켰다면 오프로드 시킨 server가 있지.
@@ -10,7 +15,7 @@ class Task(object):
         self.data_size = data_size
         self.is_start = False
         self.computation_over = 0
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.received_data_size = 0
         self.parent_uuid = None
         self.child_uuid = None
@@ -18,15 +23,40 @@ class Task(object):
         self.arrival_timestamp = arrival_timestamp
         self.start_timestamp = None # 혹시 몰라서. task별 waiting time 필요할 수도 있음.
         self.end_timestamp = None # 마찬가지.
+        self.share = 0 # scheduler가 나눠준 computation 비율 (WholeMap)
 
     # def __del__(self):
     #     print("deleted")
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
+
+    # __init__이 id 말고 기본으로 넣는 값들
+    _defaults = {'client_index': None, 'server_index': None, 'is_start': False, 'computation_over': 0,
+                 'received_data_size': 0, 'parent_uuid': None, 'child_uuid': None, 'arrival_timestamp': None,
+                 'start_timestamp': None, 'end_timestamp': None, 'share': 0}
+
+    # __slots__ 이전에 pickle된 Task는 state로 __dict__가 그대로 들어옴
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = dict(state[0] or {}, **state[1])
+        # uuid.UUID를 id로 쓰던 때 저장한 task는 hex 문자열로 바꿔서 get_uuid()와 맞춤
+        for name in ('uuid', 'parent_uuid', 'child_uuid'):
+            if isinstance(state.get(name), uuid.UUID):
+                state[name] = state[name].hex
+        # 그 뒤에 생긴 slot (share 등)은 __init__의 기본값으로 채움. make_child_task가 모든 slot을 읽음
+        for name, value in dict(self._defaults, **state).items():
+            setattr(self, name, value)
 
+    # deepcopy 대신 field를 그대로 옮기고 id만 새로 줌
     def make_child_task(self, offload_data_bits):
-        new_task = copy.deepcopy(self)
+        new_task = Task.__new__(Task)
+        for name in self.__slots__:
+            setattr(new_task, name, getattr(self, name))
+        new_task.uuid = new_id()
         new_task.parent_uuid = self.get_uuid()
         self.child_uuid = new_task.get_uuid()
         new_task.data_size = offload_data_bits
@@ -70,3 +100,20 @@ class Task(object):
             return 1
         else :
             return 0
+
+
+# TaskQueue.snapshot/restore용. task들을 slot마다 array 하나로 모으고 (None이 섞이면 object array) 다시 Task로 만듦
+def tasks_to_columns(tasks):
+    return {name: np.array([getattr(task, name) for task in tasks]) for name in Task.__slots__}
+
+def columns_to_tasks(columns):
+    if not len(columns['uuid']):
+        return []
+    values = [columns[name].tolist() for name in Task.__slots__]
+    tasks = []
+    for row in zip(*values):
+        task = Task.__new__(Task)
+        for name, value in zip(Task.__slots__, row):
+            setattr(task, name, value)
+        tasks.append(task)
+    return tasks
@@ -1,11 +1,11 @@
-import uuid
 import logging
 import collections
 import numpy as np
 import applications
 
 from task import *
-from buffers import TaskBuffer
+from id_provider import new_id
+from buffers import TaskBuffer, ArrivalStats
 from constants import *
 
 logger = logging.getLogger(__name__)
@@ -13,13 +13,15 @@ logger = logging.getLogger(__name__)
 class TaskQueue(object):
 
     def __init__(self, app_type, max_length=10*GB):
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.max_length = max_length
         self.tasks = collections.OrderedDict()
         self.length = 0
         self.app_type = app_type
-        self.arrival_size_buffer = TaskBuffer(max_size=100)
+        self.arrival_size_buffer = ArrivalStats(max_size=100)
         self.exploded = 0
+        # 길이, 도착 기록, exploded가 바뀔 때마다 올림. ServerNode.get_status cache의 key
+        self.version = 0
         logger.info('Task queue of app. type {} with max length {} is initiallized'.format(app_type, max_length))
 
     def __del__(self):
@@ -39,11 +41,13 @@ class TaskQueue(object):
     def remove_task(self, task_id):
         logger.debug('Task %s removed', task_id)
         del self.tasks[task_id]
+        self.version += 1
 
     def remove_multiple_tasks(self, task_list):
         for task_id in task_list:
             logger.debug('Task %s removed', task_id)
             del self.tasks[task_id]
+        self.version += 1
 
     def abort_task(self, task_id):
         logger.info('Task %s aborted', task_id)
@@ -54,6 +58,7 @@ class TaskQueue(object):
     def arrived(self, task, arrival_timestamp):
         task_id = task.get_uuid()
         task_length = task.data_size
+        self.version += 1
         self.arrival_size_buffer.add((arrival_timestamp, task_length))
         new_length = self.length + task_length
         if new_length <= self.max_length:
@@ -63,7 +68,7 @@ class TaskQueue(object):
             self.exploded = max(0, self.exploded-1)
             return True
         else:
-            logger.info('queue exploded, app type {}, queuelength {}'.format(self.app_type, self.length))
+            logger.info('queue exploded, app type %s, queuelength %s', self.app_type, self.length)
             del task
             self.exploded = min(10, self.exploded+1)
             return False
@@ -120,13 +125,21 @@ class TaskQueue(object):
             if not silence: print("########### task_queue.served ends ###########")
             return resource, offloaded_tasks
 
+    # 길이, exploded, 도착 기록과 task들을 slot별 array로 (MEC_v1.snapshot)
+    def snapshot(self):
+        return {'tasks': tasks_to_columns(self.tasks.values()), 'length': self.length, 'exploded': self.exploded,
+                'arrivals': self.arrival_size_buffer.snapshot()}
+
+    # Task 객체는 새로 만듦. version은 되돌리지 않고 올려서 get_status cache가 예전 값을 쓰지 않게 함
+    def restore(self, state):
+        self.tasks = collections.OrderedDict((task.uuid, task) for task in columns_to_tasks(state['tasks']))
+        self.length = state['length']
+        self.exploded = state['exploded']
+        self.arrival_size_buffer.restore(state['arrivals'])
+        self.version += 1
+
     def mean_arrival(self, t, interval=10, normalize=100):
-        result = 0
-        for time, data_size in self.arrival_size_buffer.get_buffer():
-            if time > t - interval:
-                result += data_size
-            else:
-                break
+        result = self.arrival_size_buffer.window_sum(t, interval)
         if not normalize:
             return result/min(t+1,interval)
         else:
@@ -144,7 +157,7 @@ class TaskQueue(object):
         return 0
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     def get_length(self, normalize=100):
         if not normalize:
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark case들. 모두 seed를 고정하고 (steps, seconds, phases)를 돌려줌.
+case마다 필요한 tree를 import하므로 run.py가 case 하나씩 새 process에서 부름.
+"""
+import itertools
+import time
+
+import numpy as np
+
+from common import PhaseTimer, use_tree
+
+
+def env_step(tree, steps, task_rate, apps, seed):
+    use_tree(tree)
+    from constants import GHZ, WIRED
+    cloud = [1 / apps] * apps
+    if tree == 'mecs':
+        import environment_ppo as E
+        env = E.Environment_sosam(task_rate, *range(1, apps + 1),
+                                  use_beta=True)
+        env.init_for_sosam(3*1e2*GHZ, 2.1*1e3*GHZ, WIRED)
+        step = lambda t, action: env.step_together(t, action, cloud)
+    else:
+        import environment_ppo_under1latent_cost1_univ as E
+        env = E.MEC_v1(task_rate, *range(1, apps + 1), use_beta=True,
+                       cost_type=0)
+        env.init_linked_pair(4*1e2*GHZ, 2.4*1e3*GHZ, WIRED)
+        step = lambda t, action: env.step(action, cloud)
+    np.random.seed(seed)
+    rng = np.random.RandomState(seed + 1)
+    # alpha, beta 각각 action_dim/2 칸짜리 분배
+    actions = rng.dirichlet(np.ones(env.action_dim // 2),
+                            (steps, 2)).reshape(steps, 1, -1)
+
+    env.reset()
+    timer = PhaseTimer()
+    for name in ('_step_generation', '_step_alpha', '_step_beta', 'get_status',
+                 'get_cost'):
+        timer.wrap(env, name)
+    start = time.perf_counter()
+    t = 0
+    for i in range(steps):
+        with timer.phase('step'):
+            _, _, done = step(t, actions[i])
+        t += 1
+        if done:
+            env.reset()
+            t = 0
+    return steps, time.perf_counter() - start, timer.summary()
+
+
+def env_sosam_step(steps=2000, task_rate=10, apps=3, seed=0):
+    """ Environment_sosam.step_together (mecs/environment_ppo.py) """
+    return env_step('mecs', steps, task_rate, apps, seed)
+
+
+def mec_v1_step(steps=2000, task_rate=10, apps=3, seed=0):
+    """ MEC_v1.step (MEC_v1/mecs/environment_ppo_under1latent_cost1_univ.py) """
+    return env_step('MEC_v1', steps, task_rate, apps, seed)
+
+
+def task_queue_served(steps=5000, depth=100, queue='TaskQueue', seed=0):
+    """ depth개의 task가 쌓여 있는 queue에서 TaskQueue.served로 5개 분량씩 처리 """
+    use_tree('mecs')
+    import applications
+    import task_queue
+    from task import Task
+    app_type = 1
+    task_size = 1000
+    queue = getattr(task_queue, queue)(app_type)
+    workload = applications.app_info[app_type]['workload']
+    rng = np.random.RandomState(seed)
+    sizes = rng.randint(task_size // 2, task_size * 3 // 2, 1024)
+    count = itertools.count()
+
+    def refill(t):
+        while queue.length < depth * task_size:
+            queue.arrived(Task(app_type, int(sizes[next(count) % 1024]),
+                               arrival_timestamp=t), t)
+
+    timer = PhaseTimer()
+    refill(0)
+    start = time.perf_counter()
+    for t in range(steps):
+        with timer.phase('served'):
+            queue.served(5 * task_size * workload)
+        with timer.phase('arrived'):
+            refill(t)
+    return steps, time.perf_counter() - start, timer.summary()
+
+
+def server_get_status(steps=5000, task_rate=10, apps=8, seed=0):
+    """ task를 만들고 있는 ServerNode (mecs/servernode_w_queue.py)의 get_status """
+    use_tree('mecs')
+    from constants import GHZ
+    from servernode_w_queue import ServerNode
+    np.random.seed(seed)
+    app_types = list(range(1, apps + 1))
+    node = ServerNode(3*1e2*GHZ, True)
+    node.make_application_queues(*app_types)
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    for t in range(steps):
+        node.random_task_generation(task_rate, t, *app_types)
+        with timer.phase('get_status'):
+            node.get_status(t)
+    return steps, time.perf_counter() - start, timer.summary()
+
+
+def wholemap_tick(steps=2000, arrival_rate=0.003, apps=8, depth=0, mobiles=100,
+                  seed=0):
+    """
+    WholeMap.simulate_one_time. arrival_rate (모바일 도착률), apps (applications.csv
+    앞에서부터 쓸 app 수), depth (처음부터 server에 쌓여 있는 실행 중 task 수)를 바꿔 가며 잼.
+    """
+    use_tree('mecs')
+    import logging
+    from mecs import scheduler
+    from mecs.wholemap import WholeMap
+    logging.disable(logging.CRITICAL)
+    my_map = WholeMap(300, 300, arrival_rate, 0.00001, seed=seed)
+    for name in list(my_map.applications)[apps:]:
+        del my_map.applications[name]
+    my_map.add_server(150, 150, 30000, scheduler.RRScheduler().schedule)
+    server = my_map.servers[0]
+    for i in range(depth):
+        # 끝나지 않을 만큼 큰 task
+        server.task_ready(server.get_info_about_offload(
+            -i, list(my_map.applications)[0], 10 ** 12))
+    my_map.add_mobiles(0, mobiles)
+
+    timer = PhaseTimer()
+    for name in ('mobile_arrive', 'mobile_departure', 'all_mobiles_move',
+                 'all_mobiles_proceed_and_offload', 'all_servers_do_tick',
+                 'all_servers_log', 'all_mobiles_log'):
+        timer.wrap(my_map, name)
+    start = time.perf_counter()
+    for t in range(steps):
+        my_map.simulate_one_time(t)
+    return steps, time.perf_counter() - start, timer.summary()
+
+
+# case 이름 : (함수, 기본으로 도는 parameter grid)
+# --quick이면 grid의 첫 번째 값들만 씀
+cases = {
+    'env_sosam_step': (env_sosam_step, {'task_rate': [10, 20],
+                                        'apps': [3, 8]}),
+    'mec_v1_step': (mec_v1_step, {'task_rate': [10, 20], 'apps': [3, 8]}),
+    'task_queue_served': (task_queue_served,
+                          {'depth': [100, 10000],
+                           'queue': ['TaskQueue', 'ArrayTaskQueue']}),
+    'server_get_status': (server_get_status, {'apps': [3, 8]}),
+    'wholemap_tick': (wholemap_tick, {'arrival_rate': [0.0003, 0.003],
+                                      'apps': [3, 8], 'depth': [0, 100]}),
+}
+
+
+def grid(name, quick=False):
+    _, params = cases[name]
+    keys = sorted(params)
+    values = [params[key][:1] if quick else params[key] for key in keys]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
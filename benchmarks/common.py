@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import collections
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# mecs/와 MEC_v1/mecs/는 같은 이름의 flat module(task_queue, constants, ...)을 쓰므로
+# 한 process에는 한 tree만 올림
+trees = {
+    'mecs': [root, os.path.join(root, 'mecs')],
+    'MEC_v1': [os.path.join(root, 'MEC_v1', 'mecs')],
+}
+
+
+def use_tree(tree):
+    sys.path[:0] = trees[tree]
+
+
+class PhaseTimer:
+    """ phase마다 걸린 시간을 모아서 percentile로 요약함 """
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+
+    def wrap(self, obj, name, phase=None):
+        """ obj.name 호출을 시간 재는 함수로 바꿈 (instance 속성으로 덮어씀) """
+        method = getattr(obj, name)
+        samples = self.samples[phase or name]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(obj, name, timed)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def summary(self):
+        return {name: latency_summary(samples)
+                for name, samples in self.samples.items() if samples}
+
+
+def latency_summary(samples):
+    us = np.asarray(samples) * 1e6
+    p50, p90, p99 = np.percentile(us, [50, 90, 99])
+    return {'count': len(us), 'mean_us': float(us.mean()),
+            'p50_us': float(p50), 'p90_us': float(p90), 'p99_us': float(p99)}
+
+
+def peak_rss_mb():
+    # linux는 kB, macOS는 bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def case_key(result):
+    # step 수가 달라도 steps/sec은 비교할 수 있음
+    params = {k: v for k, v in result['params'].items() if k != 'steps'}
+    return result['case'] + json.dumps(params, sort_keys=True)
+
+
+def run_in_subprocess(script, case, params):
+    """ case 하나를 새 process에서 돌려서 (peak RSS가 섞이지 않게) 결과 dict를 받음 """
+    out = subprocess.run(
+        [sys.executable, script, '--worker', case, json.dumps(params)],
+        check=True, stdout=subprocess.PIPE, text=True).stdout
+    # 시뮬레이터가 stdout에 print하는 것이 있으므로 마지막 줄만 씀
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'node': platform.node(),
+            'cpus': os.cpu_count()}
+
+
+def save_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({'machine': machine_info(), 'results': results}, f,
+                  indent=2, sort_keys=True)
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    baseline JSON과 같은 (case, params)끼리 steps/sec을 비교함.
+    tolerance보다 많이 느려진 것의 수를 돌려줌.
+    """
+    with open(baseline_path) as f:
+        baseline = {case_key(result): result
+                    for result in json.load(f)['results']}
+    regressions = 0
+    for result in results:
+        old = baseline.get(case_key(result))
+        if old is None:
+            print('{:60s} (no baseline)'.format(label(result)))
+            continue
+        ratio = result['steps_per_sec'] / old['steps_per_sec']
+        regressed = ratio < 1 - tolerance
+        regressions += regressed
+        print('{:60s} {:10.1f} -> {:10.1f} steps/sec  x{:.2f}{}'.format(
+            label(result), old['steps_per_sec'], result['steps_per_sec'],
+            ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def label(result):
+    params = ' '.join('{}={}'.format(k, v)
+                      for k, v in sorted(result['params'].items())
+                      if k not in ('steps', 'seed'))
+    return '{} {}'.format(result['case'], params)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+WholeMap.simulate_one_time (--event-driven이면 simulate_until)의 ticks/sec을 log 설정별로 잼.
+  sync        : 예전처럼 handler가 simulation thread에서 바로 씀
+  async       : config.init_logger() 기본값. queue에 넣고 handler thread가 씀
+  async-quiet : async + MECS_HOT_PATH_LOGGING=0 (arrived/served/do_tick의 log 호출을 건너뜀)
+  off         : handler 없음 (logging.disable)
+hot_path_logging은 import할 때 정해지므로 설정마다 process를 따로 띄움.
+
+python benchmarks/logging_overhead.py --ticks 20000 --mobiles 300
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# mode : (MECS_HOT_PATH_LOGGING, init_logger의 asynchronous, None이면 log 끔)
+modes = {
+    'sync': ('1', False),
+    'async': ('1', True),
+    'async-quiet': ('0', True),
+    'off': ('0', None),
+}
+
+
+def run(mode, ticks, mobiles, seed, event_driven):
+    sys.path[:0] = [root, os.path.join(root, 'mecs')]
+    import logging
+    from mecs import config, scheduler
+    from mecs.wholemap import WholeMap
+
+    asynchronous = modes[mode][1]
+    log_dir = tempfile.mkdtemp()
+    if asynchronous is None:
+        logging.disable(logging.CRITICAL)
+    else:
+        config.init_logger(asynchronous=asynchronous, console_level='WARNING',
+                           filename=os.path.join(log_dir, 'mecs.log'))
+    my_map = WholeMap(300, 300, 0.0003, 0.00001, seed=seed)
+    my_map.add_server(150, 150, 30000, scheduler.RRScheduler().schedule)
+    my_map.add_mobiles(0, mobiles)
+
+    start = time.perf_counter()
+    if event_driven:
+        my_map.simulate_until(ticks)
+    else:
+        for t in range(ticks):
+            my_map.simulate_one_time(t)
+    # 밀린 log를 다 쓸 때까지 포함
+    config.stop_queue_listener()
+    elapsed = time.perf_counter() - start
+    log_size = os.path.getsize(os.path.join(log_dir, 'mecs.log')) \
+        if asynchronous is not None else 0
+    shutil.rmtree(log_dir)
+    return {'mode': mode, 'ticks': ticks, 'seconds': elapsed,
+            'ticks_per_sec': ticks / elapsed, 'log_bytes': log_size}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--mobiles', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--event-driven', action='store_true',
+                        help='simulate_one_time 대신 simulate_until로 돌림')
+    parser.add_argument('--modes', nargs='+', default=list(modes),
+                        choices=list(modes))
+    parser.add_argument('--worker', choices=list(modes), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run(args.worker, args.ticks, args.mobiles, args.seed,
+                             args.event_driven)))
+        return
+
+    for mode in args.modes:
+        env = dict(os.environ, MECS_HOT_PATH_LOGGING=modes[mode][0])
+        out = subprocess.run(
+            [sys.executable, __file__, '--worker', mode,
+             '--ticks', str(args.ticks), '--mobiles', str(args.mobiles),
+             '--seed', str(args.seed)]
+            + (['--event-driven'] if args.event_driven else []),
+            env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+        result = json.loads(out.splitlines()[-1])
+        print('{mode:12s} {ticks_per_sec:10.1f} ticks/sec  '
+              '({seconds:.2f} s, log {log_bytes} bytes)'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
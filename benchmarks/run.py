@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+시뮬레이터 속도 benchmark. case마다 steps/sec, phase별 latency percentile, peak RSS를 보여 줌.
+
+python benchmarks/run.py                        # 모든 case, 모든 grid
+python benchmarks/run.py --quick wholemap_tick  # grid 첫 값만
+python benchmarks/run.py --save benchmarks/baseline.json
+python benchmarks/run.py --compare benchmarks/baseline.json --tolerance 0.1
+--compare는 baseline보다 tolerance 넘게 느려진 case가 있으면 exit code 1로 끝남.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cases
+from common import (compare, label, peak_rss_mb, run_in_subprocess,
+                    save_results)
+
+
+def worker(case, params):
+    function, _ = cases.cases[case]
+    steps, seconds, phases = function(**params)
+    return {'case': case, 'params': params, 'steps': steps,
+            'seconds': seconds, 'steps_per_sec': steps / seconds,
+            'phases': phases, 'peak_rss_mb': peak_rss_mb()}
+
+
+def report(result):
+    print('{:60s} {:10.1f} steps/sec  peak RSS {:7.1f} MB'.format(
+        label(result), result['steps_per_sec'], result['peak_rss_mb']))
+    for name, summary in sorted(result['phases'].items()):
+        print('    {:34s} p50 {p50_us:9.1f}  p90 {p90_us:9.1f}  '
+              'p99 {p99_us:9.1f} us  (x{count})'.format(name, **summary))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('cases', nargs='*',
+                        help='돌릴 case (기본: 전부): ' + ', '.join(cases.cases))
+    parser.add_argument('--quick', action='store_true',
+                        help='grid마다 첫 번째 값만 씀')
+    parser.add_argument('--steps', type=int, help='case 기본 step 수 대신 씀')
+    parser.add_argument('--save', help='결과를 baseline JSON으로 저장')
+    parser.add_argument('--compare', help='이 baseline JSON과 비교')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--worker', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        case, params = args.worker
+        print(json.dumps(worker(case, json.loads(params))))
+        return
+
+    unknown = set(args.cases) - set(cases.cases)
+    if unknown:
+        parser.error('unknown case: ' + ', '.join(sorted(unknown)))
+    results = []
+    for case in args.cases or list(cases.cases):
+        for params in cases.grid(case, args.quick):
+            if args.steps:
+                params['steps'] = args.steps
+            result = run_in_subprocess(os.path.abspath(__file__), case, params)
+            report(result)
+            results.append(result)
+    if args.save:
+        save_results(args.save, results)
+    if args.compare:
+        print()
+        if compare(results, args.compare, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
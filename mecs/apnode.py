@@ -1,6 +1,6 @@
 import logging
-import uuid
 
+from mecs.id_provider import new_id
 from mecs.node import Node
 
 logger = logging.getLogger(__name__)
@@ -13,7 +13,7 @@ class APNode(Node):
         self.y = y
         self.channels = {}
         self.tasks = []
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.node_type = 3  # 3 : AP node
 
     def get_info_about_offload(self, index, application_type,
@@ -24,7 +24,7 @@ class APNode(Node):
         logger.info('Server at (%d,%d)' % (self.x, self.y))
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     def get_status(self):
         return {'x': self.x, 'y': self.y,
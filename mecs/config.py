@@ -1,12 +1,24 @@
+import atexit
 import logging
 import logging.config
+import logging.handlers
+import numbers
+import os
+import queue
+
+# MECS_HOT_PATH_LOGGING=0 으로 띄우면 TaskQueue.arrived/served, ServerNode.do_tick의
+# log 호출 자체를 건너뜀. import할 때 한 번 읽으므로 도중에 바꿀 수 없음.
+hot_path_logging = os.environ.get('MECS_HOT_PATH_LOGGING', '1') != '0'
+
+_listener = None
 
 
 def initialize_mecs():
     init_logger()
 
 
-def init_logger():
+def init_logger(asynchronous=True, level='DEBUG', console_level='INFO',
+                filename='mecs.log'):
     logging.config.dictConfig({
         'version': 1,
         'disable_existing_loggers': False,
@@ -19,14 +31,14 @@ def init_logger():
         'handlers': {
             'console': {
                 'class': 'logging.StreamHandler',
-                'level': 'INFO',
+                'level': console_level,
                 'formatter': 'default',
                 'stream': 'ext://sys.stderr',
             },
             'file': {
                 'class': 'logging.FileHandler',
-                'level': 'DEBUG',
-                'filename': 'mecs.log',
+                'level': level,
+                'filename': filename,
                 'mode': 'w',
                 'formatter': 'default'
             },
@@ -37,7 +49,54 @@ def init_logger():
         'loggers': {
             '': {
                 'handlers': ['console', 'file'],
-                'level': 'DEBUG',
+                'level': level,
             },
         },
     })
+    if asynchronous:
+        start_queue_listener()
+
+
+def start_queue_listener():
+    """
+    root logger의 handler들을 thread 하나로 옮기고, 시뮬레이션 쪽에는 queue에 넣기만 하는 handler를 둠.
+    message는 handler thread에서 format함.
+    """
+    global _listener
+    stop_queue_listener()
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers,
+                                               respect_handler_level=True)
+    _listener.start()
+
+
+def stop_queue_listener():
+    """ queue에 남은 log를 다 쓰고 handler thread를 멈춤 """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_queue_listener)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare는 넣기 전에 message를 format하므로, args가 숫자나 문자열뿐이면
+    format하지 않고 record를 그대로 넘김. (나중에 바뀔 수 있는 객체가 args에 있으면 지금 format)
+    """
+    immutable = (str, numbers.Number, type(None))
+
+    def prepare(self, record):
+        args = record.args
+        if record.exc_info or (args and not (
+                isinstance(args, tuple)
+                and all(isinstance(arg, self.immutable) for arg in args))):
+            return super().prepare(record)
+        return record
@@ -17,7 +17,7 @@ from utilities import *
 from constants import *
 
 class Environment_sosam:
-    def __init__(self, task_rate, *applications, time_delta=10*MS, use_beta=False, empty_reward=True):
+    def __init__(self, task_rate, *applications, time_delta=10*MS, use_beta=False, empty_reward=True, generation_block=1, size_dist='deterministic'):
         self.task_rate = task_rate#/time_delta
         self.clients = {}
         self.servers = {}
@@ -29,6 +29,19 @@ class Environment_sosam:
         self.use_beta = use_beta
         self.max_episode_steps = 4000
         self.empty_reward = empty_reward
+        # client마다 random_task_generation이 미리 뽑아 둘 step 수 (applications.ArrivalGenerator)
+        self.generation_block = generation_block
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        # set_rng로 주는 도착용 np.random.RandomState. None이면 np.random
+        self.rng = None
+        # 이 env의 task 크기 sampler들 (applications.size_sampler의 cache). reset마다 pool을 비우므로
+        # np.random.seed(s) 후 reset하면 처음 만든 env와 같은 크기가 나옴.
+        # episode 중간에 seed만 다시 주면 이미 뽑아 둔 pool이 먼저 나오므로 같지 않음
+        self.sampler_cache = dict()
+        # 처음 reset에서 만든 직후의 snapshot과 state. 그 다음 reset부터는 node를 새로 만들지 않고 이걸 restore함
+        self.initial_snapshot = None
+        self.initial_state = None
 
     def get_number_of_apps(self):
         return len(self.applications)
@@ -43,20 +56,85 @@ class Environment_sosam:
         del self.reset_infos
 
     def reset(self, empty_reward=True):
+        if self.initial_snapshot is not None:
+            self.restore(self.initial_snapshot)
+            self.empty_reward = empty_reward
+            reset_samplers(self.sampler_cache)
+            return self.initial_state.copy()
 
         task_rate = self.task_rate
         applications = self.applications
         reset_infos = self.reset_infos
         use_beta = self.use_beta
+        generation_block = self.generation_block
+        size_dist = self.size_dist
+        rng, sampler_cache = self.rng, self.sampler_cache
         self.__del__()
-        self.__init__(task_rate, *applications, use_beta = use_beta, empty_reward=empty_reward)
+        self.__init__(task_rate, *applications, use_beta = use_beta, empty_reward=empty_reward, generation_block=generation_block, size_dist=size_dist)
+        self.rng, self.sampler_cache = rng, sampler_cache
+        reset_samplers(self.sampler_cache)
         for reset_info in reset_infos:
             self.init_for_sosam(*reset_info)
+        self.initial_snapshot = self.snapshot()
         reset_state,_,_ = self.get_status(0)
+        self.initial_state = reset_state.copy()
         return reset_state
 
+    # 모든 node의 queue와 미리 뽑아 둔 도착을 array 위주의 dict로 떠 둠. 시간은 step_together에 넘기는 값이라 넣지 않음.
+    # include_rng=True면 np.random (set_rng를 했으면 그 rng) 상태와 task 크기 sampler의 pool도 넣어서
+    # restore 후 같은 도착이 다시 나오게 함.
+    # 같은 env나, 같은 reset_infos로 만든 다른 Environment_sosam에 restore할 수 있음.
+    def snapshot(self, include_rng=False):
+        random = np.random if self.rng is None else self.rng
+        return {'nodes': [node.snapshot() for node in list(self.clients.values()) + list(self.servers.values())],
+                'rng': (random.get_state(), sampler_states(self.sampler_cache)) if include_rng else None}
+
+    def restore(self, snapshot):
+        nodes = list(self.clients.values()) + list(self.servers.values())
+        if len(nodes) != len(snapshot['nodes']):
+            raise ValueError('snapshot has {} nodes, this environment has {}'.format(len(snapshot['nodes']), len(nodes)))
+        for node, node_state in zip(nodes, snapshot['nodes']):
+            node.restore(node_state)
+        if snapshot['rng'] is not None:
+            (np.random if self.rng is None else self.rng).set_state(snapshot['rng'][0])
+            set_sampler_states(snapshot['rng'][1], self.sampler_cache)
+
+    # 이 env의 도착 (poisson 개수와 task 크기)을 np.random 대신 rng (np.random.RandomState)에서 뽑음.
+    # task 크기 sampler의 pool도 새로 만듦. rng=None이면 다시 np.random을 씀.
+    # client마다 미리 뽑아 둔 도착 (generation_block)은 버림
+    def set_rng(self, rng):
+        self.rng = rng
+        self.sampler_cache = dict()
+        for node in list(self.clients.values()) + list(self.servers.values()):
+            node.rng, node.sampler_cache = self.rng, self.sampler_cache
+            node.arrival_generator = None
+
+    # 지금 상태에서 갈라진 Environment_sosam n개를 Environment_sosamForks로 돌려줌.
+    # deepcopy하지 않고 같은 reset_infos로 env를 만든 뒤 snapshot을 restore함. reset하면 이 env와 같은 처음 상태로 돌아감.
+    # fork마다 np.random.RandomState(seeds[i])에서 도착을 뽑고 np.random은 건드리지 않음.
+    # seeds를 안 주면 np.random에서 뽑음. seeds를 모두 같게 주면 모든 fork에 같은 도착이 오므로
+    # (common random numbers) action이나 policy끼리 비교할 때 cost 차이의 분산이 줄어듦.
+    def fork(self, n, seeds=None):
+        if seeds is None:
+            seeds = np.random.randint(2**31, size=n)
+        if len(seeds) != n:
+            raise ValueError('{} seeds for {} forks'.format(len(seeds), n))
+        snapshot = self.snapshot()
+        envs = list()
+        for seed in seeds:
+            env = Environment_sosam(self.task_rate, *self.applications, use_beta=self.use_beta, empty_reward=self.empty_reward,
+                                    generation_block=self.generation_block, size_dist=self.size_dist)
+            for reset_info in self.reset_infos:
+                env.init_for_sosam(*reset_info)
+            env.restore(snapshot)
+            env.set_rng(np.random.RandomState(seed))
+            env.initial_snapshot, env.initial_state = self.initial_snapshot, self.initial_state
+            envs.append(env)
+        return Environment_sosamForks(envs)
+
     def add_client(self, cap):
-        client = ServerNode(cap, True)
+        client = ServerNode(cap, True, self.generation_block, self.size_dist)
+        client.rng, client.sampler_cache = self.rng, self.sampler_cache
         self.clients[client.get_uuid()] = client
         return client
 
@@ -84,6 +162,7 @@ class Environment_sosam:
 
 
     def init_for_sosam(self, edge_capability, cloud_capability, channel):
+        self.initial_snapshot = None
         client = self.add_client(edge_capability)
         client.make_application_queues(*self.applications)
 
@@ -249,3 +328,31 @@ class Environment_sosam:
 
     def get_fail_cost(self, time, failed_to_offload, failed_to_generate):
          return float((failed_to_offload+failed_to_generate)>0)*self.action_dim
+
+
+# Environment_sosam.fork가 돌려주는 env 묶음. step_together는 fork마다 action 하나씩 받아서 모두 한 step 진행하고
+# (states, costs, failed)를 fork 순서대로 쌓아서 돌려줌. fork 하나는 envs[i]로 따로 써도 됨
+class Environment_sosamForks:
+    def __init__(self, envs):
+        self.envs = envs
+
+    def __len__(self):
+        return len(self.envs)
+
+    def __getitem__(self, index):
+        return self.envs[index]
+
+    def __iter__(self):
+        return iter(self.envs)
+
+    # actions: (n, action_dim). cloud는 모든 fork가 같이 쓰는 (apps,)나 fork마다 하나씩 (n, apps)
+    def step_together(self, time, actions, cloud):
+        cloud = np.asarray(cloud)
+        if cloud.ndim == 1:
+            cloud = [cloud]*len(self.envs)
+        states, costs, failed = zip(*[env.step_together(time, np.asarray(action).reshape(1, -1), env_cloud)
+                                      for env, action, env_cloud in zip(self.envs, actions, cloud)])
+        return np.stack(states), np.array(costs), np.array(failed)
+
+    def reset(self):
+        return np.stack([env.reset() for env in self.envs])
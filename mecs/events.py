@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import math
+
+import numpy
+
+# 한 tick 안에서 WholeMap.simulate_one_time이 처리하는 순서
+ARRIVAL = 0
+DEPARTURE = 1
+MOVE = 2
+PROCEED = 3
+SERVER = 4
+
+
+def waiting_ticks(rng, p):
+    """ tick마다 p 확률로 일어나는 일이 처음 일어날 때까지의 tick 수 (0부터) """
+    if p >= 1:
+        return 0
+    if p <= 0:
+        return math.inf
+    return int(math.log(1.0 - rng.random()) / math.log1p(-p))
+
+
+def departure_tick(rng, start, arrival_time, rate, chunk=16384):
+    """
+    start tick부터 tick마다 rate * log(living_time + 1) 확률로 떠날 때,
+    처음 떠나는 tick을 한 번에 뽑음. (living_time = tick - arrival_time)
+    """
+    if rate <= 0:
+        return math.inf
+    threshold = math.log(1.0 - rng.random())
+    log_survival = 0.
+    while True:
+        ticks = numpy.arange(start, start + chunk)
+        hazard = numpy.minimum(rate * numpy.log(ticks - arrival_time + 1.), 1.)
+        survival = log_survival + numpy.cumsum(numpy.log1p(-hazard))
+        departed = numpy.flatnonzero(survival < threshold)
+        if departed.size > 0:
+            return start + int(departed[0])
+        log_survival = survival[-1]
+        start += chunk
+
+
+class EventSimulator:
+    """
+    WholeMap.simulate_one_time을 매 tick 부르는 대신, 무언가 일어나는 tick만 heap에서 꺼내 처리함.
+    한 tick 안에서는 simulate_one_time과 같은 순서 (arrival, departure, move, proceed, server),
+    같은 단계 안에서는 모바일 index 순서로 처리하므로 같은 seed면 tick 방식과 결과가 같음.
+      - 쉬고 있는 모바일은 미리 뽑아 둔 작업 시작 시각이나 떠나는 시각에만 깨움.
+      - 작업 중인 모바일은 전송이나 처리가 끝나는 tick까지 혼자 진행해 두고 (log, server 호출 없음) 그 tick에 깨움.
+        모바일끼리는 서로 영향을 주지 않으므로 먼저 진행해 두어도 결과가 같음.
+      - 위치(move)는 생성될 때와 run이 끝날 때만 따라잡음.
+      - server는 시작된 task가 있을 때만 다음 event 전까지 do_tick을 돌림.
+    """
+
+    def __init__(self, whole_map, start_time=0):
+        self.map = whole_map
+        self.time = start_time
+        self.end_time = start_time
+        self.queue = []
+        self.count = itertools.count()
+        self.server_wakeup = {}
+        self.push(whole_map.next_arrival_time, ARRIVAL, 0, self.arrive)
+        # 지금 map 상태(start_time - 1 tick까지 진행된 상태)에서 시작
+        for index, mobile in whole_map.mobiles.items():
+            if mobile.living_time == 0:
+                # add_mobiles로 넣고 아직 한 tick도 돌지 않은 모바일. 첫 move에서 생성 log를 남김
+                self.push(start_time, MOVE, index, self.appear, index)
+            elif mobile.is_idle():
+                self.schedule_idle(index, mobile)
+            else:
+                self.push(start_time, PROCEED, index, self.resume, index)
+        for server in whole_map.servers:
+            self.wake_server(server, start_time)
+
+    def push(self, t, phase, order, handler, *args):
+        heapq.heappush(self.queue,
+                       (t, phase, order, next(self.count), handler, args))
+
+    def run(self, end_time):
+        """ end_time 전 tick까지 진행하고 마지막 tick의 log를 돌려줌 """
+        self.end_time = end_time
+        while self.queue and self.queue[0][0] < end_time:
+            t, _, _, _, handler, args = heapq.heappop(self.queue)
+            self.time = t
+            handler(t, *args)
+        self.time = end_time
+        for mobile in self.map.mobiles.values():
+            mobile.catch_up(end_time - 1)
+        log = self.map.all_servers_log(end_time - 1)
+        log.update(self.map.all_mobiles_log(end_time - 1))
+        return log
+
+    def arrive(self, t):
+        self.map.mobile_arrive(t)
+        index = self.map.index - 1
+        self.push(t, MOVE, index, self.appear, index)
+        self.push(self.map.next_arrival_time, ARRIVAL, 0, self.arrive)
+
+    def appear(self, t, index):
+        mobile = self.map.mobiles[index]
+        mobile.move(t)
+        self.schedule_idle(index, mobile)
+
+    def schedule_idle(self, index, mobile):
+        if mobile.departure_time <= mobile.next_job_time:
+            self.push(mobile.departure_time, DEPARTURE, index,
+                      self.depart, index)
+        else:
+            self.push(mobile.next_job_time, PROCEED, index,
+                      self.start_job, index)
+
+    def depart(self, t, index):
+        self.map.log_departure(t, index)
+        self.map.remove_mobiles([index])
+
+    def start_job(self, t, index):
+        mobile = self.map.mobiles[index]
+        mobile.start_job(t)
+        if mobile.is_idle():
+            self.schedule_idle(index, mobile)
+        else:
+            self.proceed_from(index, mobile, t + 1)
+
+    def resume(self, t, index):
+        self.proceed_from(index, self.map.mobiles[index], t)
+
+    def proceed_from(self, index, mobile, start):
+        done = mobile.proceed_silently(start, self.end_time)
+        if done is None:
+            # 이번 run이 끝날 때까지 끝나는 일이 없음. 다음 run에서 이어서 진행
+            self.push(self.end_time, PROCEED, index, self.resume, index)
+        else:
+            t, transmitted = done
+            self.push(t, PROCEED, index, self.finish, index, transmitted)
+
+    def finish(self, t, index, transmitted):
+        mobile = self.map.mobiles[index]
+        if transmitted:
+            mobile.transmission_done(t)
+            self.wake_server(mobile.server, t)
+            # 이 tick의 처리는 아직 안 했음
+            if mobile.amount_of_data_to_proceed != 0 \
+                    and mobile.proceed_one_tick():
+                mobile.proceeding_done(t)
+        else:
+            mobile.proceeding_done(t)
+        if mobile.is_idle():
+            mobile.become_idle(t + 1)
+            self.schedule_idle(index, mobile)
+        else:
+            self.proceed_from(index, mobile, t + 1)
+
+    @staticmethod
+    def is_busy(server):
+        return any(task.is_start for task in server.tasks.values())
+
+    def wake_server(self, server, t):
+        wakeup = self.server_wakeup.get(server)
+        if (wakeup is None or wakeup > t) and self.is_busy(server):
+            self.server_wakeup[server] = t
+            self.push(t, SERVER, self.map.servers.index(server),
+                      self.server_tick, server)
+
+    def server_tick(self, t, server):
+        if self.server_wakeup.get(server) != t:
+            return
+        del self.server_wakeup[server]
+        # 다음 event 전까지는 server에 새로 들어오는 일이 없음
+        stop = self.queue[0][0] if self.queue else self.end_time
+        stop = max(min(stop, self.end_time), t + 1)
+        while t < stop and self.is_busy(server):
+            server.do_tick(t)
+            t += 1
+        if t == stop:
+            self.wake_server(server, stop)
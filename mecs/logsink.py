@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import logging
+import pathlib
+import queue
+import threading
+
+import numpy
+
+logger = logging.getLogger(__name__)
+
+mobile_fields = ('x', 'y', 'living_time', 'battery',
+                 'amount_of_data_to_proceed', 'amount_of_data_to_offload',
+                 'channel_gain')
+server_fields = ('computation_capability', 'tasks')
+
+
+class StatusLogSink:
+    """
+    WholeMap의 tick별 상태를 메모리에 모아 두는 대신, interval tick마다 골라 둔 field만
+    column으로 모아서 chunk_rows 줄마다 npz 파일 하나로 씀.
+      - <directory>/mobiles-00000.npz : time, mobile, mobile_fields
+      - <directory>/servers-00000.npz : time, server, server_fields
+    (dict나 list인 field는 길이를 씀. 예: server의 tasks -> task 수)
+    파일 쓰기는 background thread가 하고, 밀려 있는 chunk가 max_pending개를 넘으면
+    record가 기다리므로 오래 돌려도 메모리는 chunk 몇 개 크기로 유지됨.
+    with 문으로 쓰거나 끝날 때 close를 불러야 마지막 chunk까지 써짐.
+    """
+
+    def __init__(self, directory, interval=1, mobile_fields=mobile_fields,
+                 server_fields=server_fields, chunk_rows=100000,
+                 max_pending=2, compress=True):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.mobile_fields = tuple(mobile_fields)
+        self.server_fields = tuple(server_fields)
+        self.chunk_rows = chunk_rows
+        self.save = numpy.savez_compressed if compress else numpy.savez
+        self.tables = {'mobiles': Table('mobile', self.mobile_fields),
+                       'servers': Table('server', self.server_fields)}
+        self.chunks = {name: 0 for name in self.tables}
+        self.pending = queue.Queue(max_pending)
+        self.error = None
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, t, whole_map):
+        """ t가 interval의 배수면 지금 whole_map의 상태를 한 줄씩 추가함 """
+        if t % self.interval != 0:
+            return
+        if self.error is not None:
+            raise self.error
+        if whole_map.population is not None:
+            columns = whole_map.population.columns(self.mobile_fields)
+            keys = columns.pop('index')
+        else:
+            keys = list(whole_map.mobiles)
+            mobiles = list(whole_map.mobiles.values())
+            columns = {field: [getattr(mobile, field) for mobile in mobiles]
+                       for field in self.mobile_fields}
+        self.add('mobiles', t, keys, columns)
+        servers = [server.get_status() for server in whole_map.servers]
+        columns = {field: [status[field] for status in servers]
+                   for field in self.server_fields}
+        self.add('servers', t, range(len(servers)), columns)
+
+    def add(self, name, t, keys, columns):
+        table = self.tables[name]
+        table.append(t, keys, columns)
+        if table.rows >= self.chunk_rows:
+            self.flush(name)
+
+    def flush(self, name):
+        table = self.tables[name]
+        if table.rows == 0:
+            return
+        path = self.directory / '{}-{:05d}.npz'.format(name, self.chunks[name])
+        self.chunks[name] += 1
+        self.pending.put((path, table.take()))
+
+    def write_chunks(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            path, arrays = item
+            try:
+                self.save(path, **arrays)
+            except Exception as e:
+                logger.exception('failed to write %s', path)
+                self.error = e
+
+    def close(self):
+        if not self.writer.is_alive():
+            return
+        for name in self.tables:
+            self.flush(name)
+        self.pending.put(None)
+        self.writer.join()
+        if self.error is not None:
+            raise self.error
+
+
+class Table:
+    """ 한 종류(mobiles, servers)의 column들을 chunk 하나만큼 모아 두는 곳 """
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+        self.rows = 0
+        self.parts = []
+
+    def append(self, t, keys, columns):
+        keys = numpy.asarray(keys, dtype=numpy.int64)
+        if len(keys) == 0:
+            return
+        part = {'time': numpy.full(len(keys), t, dtype=numpy.int64),
+                self.key: keys}
+        for field in self.fields:
+            part[field] = self.as_column(columns[field])
+        self.parts.append(part)
+        self.rows += len(keys)
+
+    @staticmethod
+    def as_column(values):
+        if isinstance(values, numpy.ndarray):
+            return values
+        return numpy.array([len(value) if isinstance(value, (dict, list))
+                            else value for value in values])
+
+    def take(self):
+        names = ('time', self.key) + self.fields
+        arrays = {name: numpy.concatenate([part[name] for part in self.parts])
+                  for name in names}
+        self.parts = []
+        self.rows = 0
+        return arrays
+
+
+def read_log(directory, name='mobiles'):
+    """ StatusLogSink가 쓴 chunk들을 이어 붙여 column dict로 돌려줌 """
+    paths = sorted(pathlib.Path(directory).glob(name + '-*.npz'))
+    chunks = []
+    for path in paths:
+        with numpy.load(path) as chunk:
+            chunks.append({key: chunk[key] for key in chunk.files})
+    if not chunks:
+        return {}
+    return {key: numpy.concatenate([chunk[key] for chunk in chunks])
+            for key in chunks[0]}
@@ -1,33 +1,38 @@
-import json
 import logging
 import os
 import shutil
 
 from mecs import scheduler, config
+from mecs.logsink import StatusLogSink
 from mecs.wholemap import WholeMap
 
 logger = logging.getLogger(__name__)
 
 
-def main():
+def main(event_driven=True, log_interval=1000):
     my_map = WholeMap(300, 300, 0.0003, 0.00001)
     server_capability = 30000  # clock per tick
     schedule_method = scheduler.RRScheduler().schedule
     my_map.add_server(150, 150, server_capability, schedule_method)
     log_dir = 'result'
-    mobile_log = {}
+    end_time = 200001
     if os.path.isdir(log_dir):
         shutil.rmtree(log_dir)
     os.mkdir(log_dir)
 
-    for t in range(200001):
-        # if t % 1000 == 0:
-        #     logger.info(
-        #         "================= << [%d,%d] second >> =================",
-        #         t // 1000, t // 1000 + 1)
-        #     logger.debug(json.dumps(mobile_log))
-        #     mobile_log = {}
-        mobile_log[t] = my_map.simulate_one_time(t)
+    # tick별 상태를 메모리에 쌓지 않고 log_interval tick마다 result/*.npz로 흘려 보냄
+    # (logsink.read_log(log_dir)로 다시 읽을 수 있음)
+    with StatusLogSink(log_dir, interval=log_interval) as sink:
+        if event_driven:
+            # 아무 일도 없는 tick은 건너뜀. 아래 tick loop와 결과가 같음.
+            for t in range(0, end_time, log_interval):
+                my_map.simulate_until(t + 1)
+                sink.record(t, my_map)
+            my_map.simulate_until(end_time)
+        else:
+            for t in range(end_time):
+                my_map.simulate_one_time(t)
+                sink.record(t, my_map)
 
     my_map.print_all_mobiles()
 
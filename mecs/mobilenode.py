@@ -4,7 +4,7 @@ import random
 
 import numpy
 
-from mecs import mobility
+from mecs import events, mobility
 from mecs.node import Node
 
 logger = logging.getLogger(__name__)
@@ -12,6 +12,7 @@ logger = logging.getLogger(__name__)
 # Watt second 기준: Ws = Wh * 3600, LG G5 배터리 기준 10.8 Wh
 battery_max = 10.8 * 3600
 unit_time = 0.001  # (second)
+job_start_probability = 0.0001  # 쉬고 있을 때 tick마다 헤비한 작업을 시작할 확률
 
 
 class MobileNode(Node):
@@ -19,13 +20,19 @@ class MobileNode(Node):
     def __init__(self, t, index, whole_map):
         super().__init__()
         self.map = whole_map
-        self.walk = mobility.truncated_levy_walk(
-            1, dimensions=(self.map.maxX, self.map.maxY))
-        self.x = next(self.walk)[0][0]
-        self.y = next(self.walk)[0][1]
+        # 모바일마다 따로 random stream을 가짐.
+        # 다른 모바일이 몇 번 뽑았는지와 상관 없이 같은 seed면 같은 움직임, 같은 작업이 나오므로
+        # event 방식(WholeMap.simulate_until)에서 모바일을 필요할 때만 진행시켜도 tick 방식과 결과가 같음.
+        self.random = random.Random(whole_map.random.getrandbits(64))
+        self.walk = mobility.TruncatedLevyWalkNode(
+            (self.map.maxX, self.map.maxY),
+            rng=numpy.random.RandomState(self.random.getrandbits(32)))
+        self.x = self.walk.step()[0]
+        self.y = self.walk.step()[1]
         self.index = index + 1
+        self.arrival_time = t
         self.living_time = 0  # [millisecond]
-        self.battery = random.randrange(battery_max / 2, battery_max)
+        self.battery = self.random.randrange(battery_max / 2, battery_max)
         # [cycles/millisecond]
         self.number_of_cpu_cycles_per_millisecond = 2 * 10 ** 9 * unit_time
 
@@ -57,6 +64,39 @@ class MobileNode(Node):
         self.total_data = 0
         # TODO : separation of AP and server
 
+        # 쉬고 있는 동안 다음 작업을 시작할 시각과 떠날 시각 (작업 중에는 None)
+        self.next_job_time = None
+        self.departure_time = None
+        self.become_idle(t)
+
+    def is_idle(self):
+        return self.amount_of_data_to_proceed == 0 \
+            and self.amount_of_data_to_offload == 0
+
+    def become_idle(self, t):
+        """
+        t tick부터 쉬기 시작할 때, 다음 작업 시작 시각과 떠날 시각을 미리 뽑아 둠.
+        tick마다 확률로 뽑던 것과 분포는 같고, 쉬는 동안의 tick을 건너뛸 수 있음.
+        """
+        self.next_job_time = t + events.waiting_ticks(self.random,
+                                                      job_start_probability)
+        if self.battery < self.map.battery_limit:
+            self.departure_time = t
+        else:
+            self.departure_time = events.departure_tick(
+                self.random, t, self.arrival_time, self.map.departure_rate)
+
+    def start_job(self, t):
+        self.next_job_time = None
+        self.departure_time = None
+        # 어떠한 무거운 작업을 시작할 것인지 선택하러 함수로 들어가자.
+        self.determine_which_job_to_start(t)
+        # 이제 얼마나 오프로딩을 할 지 최적의 결정을 하러 함수로 들어가자.
+        self.determine_how_much_to_offload()
+        if self.is_idle():
+            # 고른 작업이 없으면 계속 쉼
+            self.become_idle(t + 1)
+
     def determine_how_much_to_offload(self):
         self.amount_of_data_to_offload = self.amount_of_data_to_proceed // 2
         self.amount_of_data_to_proceed -= self.amount_of_data_to_offload
@@ -73,17 +113,12 @@ class MobileNode(Node):
             self.index, self.application_type, self.amount_of_data_to_offload)
 
     def transmit_and_proceed(self, t):
-        random_to_start = random.random()
-        if self.amount_of_data_to_proceed == 0 \
-                and self.amount_of_data_to_offload == 0:
+        if self.is_idle():
             # 프로세싱할 무거운 작업이 없을 때
             # (웹서핑 등 간단한 작업만 하고 있음)
 
-            if random_to_start < 0.0001:  # 일정 확률로 헤비한 작업을 시작한다.
-                # 어떠한 무거운 작업을 시작할 것인지 선택하러 함수로 들어가자.
-                self.determine_which_job_to_start(t)
-                # 이제 얼마나 오프로딩을 할 지 최적의 결정을 하러 함수로 들어가자.
-                self.determine_how_much_to_offload()
+            if t >= self.next_job_time:  # 미리 뽑아 둔 시각에 헤비한 작업을 시작한다.
+                self.start_job(t)
             # (가정에 따라 지금 한번만) 오프로딩을 위한 데이터를 전송하는
             # 최적의 파워를 결정하러 가자.
             # self.determine_how_much_trans_power_for_offloading()
@@ -118,6 +153,29 @@ class MobileNode(Node):
             # if self.living_time % 1000 == 0:
             #     logger.debug('%d번째 모바일의 헤비작업 후의 배터리 양: '
             #                  '[%d] mWs', self.index, self.battery)
+            if self.is_idle():
+                self.become_idle(t + 1)
+
+    def proceed_silently(self, start, end):
+        """
+        transmit_and_proceed의 작업 중 부분을 start tick부터 end tick 전까지
+        log와 server 호출 없이 돌림 (event 방식에서 씀).
+        전송이나 처리가 끝나는 tick에서 멈추고 (tick, 전송이 끝났는지)를 돌려줌.
+        전송이 끝났으면 그 tick의 처리는 아직 하지 않은 상태이고,
+        끝나는 일이 없으면 None을 돌려줌.
+        """
+        living_time = start - self.arrival_time + 1
+        for t in range(start, end):
+            if living_time % 1000 == 0:
+                self.determine_how_much_trans_power_for_offloading()
+            living_time += 1
+            if self.amount_of_data_to_offload != 0 \
+                    and self.transmit_one_tick():
+                return t, True
+            if self.amount_of_data_to_proceed != 0 \
+                    and self.proceed_one_tick():
+                return t, False
+        return None
 
     def determine_how_much_trans_power_for_offloading(self):
         """
@@ -126,7 +184,7 @@ class MobileNode(Node):
         self.transmission_power_to_offload = 3
 
     def determine_which_job_to_start(self, t):
-        random_for_selecting_application_type = random.random()
+        random_for_selecting_application_type = self.random.random()
         popularity_sum = 0
         for app_type in self.map.applications:
             popularity_sum += self.map.applications[app_type][1]
@@ -134,8 +192,8 @@ class MobileNode(Node):
                 self.application_type = app_type
                 min_byte = self.map.applications[app_type][2]
                 max_byte = self.map.applications[app_type][3]
-                self.amount_of_data_to_proceed = random.randrange(min_byte,
-                                                                  max_byte)
+                self.amount_of_data_to_proceed = self.random.randrange(
+                    min_byte, max_byte)
                 self.total_data = self.amount_of_data_to_proceed
 
                 logger.info(
@@ -146,21 +204,33 @@ class MobileNode(Node):
                 return
 
     def transmit_offloading_data(self, t):
+        if self.transmit_one_tick():
+            self.transmission_done(t)
+
+    def transmit_one_tick(self):
+        """ 한 tick 만큼 전송하고, 다 보냈으면 True """
         self.battery -= self.transmission_power_to_offload * unit_time
         maximum_data_rate = unit_time * self.bandwidth * numpy.log(
             1 + self.transmission_power_to_offload * (
-                    self.channel_gain ** 2) / random.randrange(1, 2))
+                    self.channel_gain ** 2) / self.random.randrange(1, 2))
         self.amount_of_data_to_offload -= min(self.amount_of_data_to_offload,
                                               maximum_data_rate)
-        if self.amount_of_data_to_offload == 0:
-            self.server.task_ready(self.task_index)
-            logger.info(
-                '[%f]초에 %d번째 모바일의 [%s] 타입의 오프로딩 데이터의 '
-                '전송 작업이 끝났습니다. 배터리 잔량: [%d mWs] ',
-                float(t) / 1000, self.index, self.application_type,
-                self.battery)
+        return self.amount_of_data_to_offload == 0
+
+    def transmission_done(self, t):
+        self.server.task_ready(self.task_index)
+        logger.info(
+            '[%f]초에 %d번째 모바일의 [%s] 타입의 오프로딩 데이터의 '
+            '전송 작업이 끝났습니다. 배터리 잔량: [%d mWs] ',
+            float(t) / 1000, self.index, self.application_type,
+            self.battery)
 
     def proceed_heavy_data_myself(self, t):
+        if self.proceed_one_tick():
+            self.proceeding_done(t)
+
+    def proceed_one_tick(self):
+        """ 한 tick 만큼 직접 처리하고, 다 처리했으면 True """
         cpu_cycles_for_one_byte_process = \
             self.map.applications[self.application_type][0]
         bytes_per_millisecond = self.number_of_cpu_cycles_per_millisecond \
@@ -169,32 +239,34 @@ class MobileNode(Node):
                                               bytes_per_millisecond)
         self.battery -= self.energy_for_one_cpu_cycle \
             * cpu_cycles_for_one_byte_process * bytes_per_millisecond
-        if self.amount_of_data_to_proceed == 0:
-            logger.info(
-                '[%f]초에 %d번째 모바일의 [%s] 타입의 헤비 프로세스가 '
-                '끝났습니다. 배터리 잔량: [%d mWs]',
-                float(t) / 1000, self.index, self.application_type,
-                self.battery)
+        return self.amount_of_data_to_proceed == 0
+
+    def proceeding_done(self, t):
+        logger.info(
+            '[%f]초에 %d번째 모바일의 [%s] 타입의 헤비 프로세스가 '
+            '끝났습니다. 배터리 잔량: [%d mWs]',
+            float(t) / 1000, self.index, self.application_type,
+            self.battery)
 
     def calculate_channel_gain(self):
-        dist = self.map.distance(self.server, self)
-        return random.randrange(3000, 4000) / dist ** 2
+        dist = float(self.map.server_grid.distance(self.server_number,
+                                                   self.x, self.y))
+        return self.random.randrange(3000, 4000) / dist ** 2
 
     def return_result(self, t, task_id):
         logger.info('[%d] Mobile %d - Offloaded Task %s is over',
                     t, self.index, task_id)
 
     def select_server(self):
-        for server in self.map.servers:
-            selected_server = server
-            return selected_server
+        # 가장 가까운 server
+        indices, _ = self.map.server_grid.nearest(self.x, self.y)
+        self.server_number = int(indices[0, 0])
+        return self.map.servers[self.server_number]
 
     def move(self, t):
         prev_x = self.x
         prev_y = self.y
-        walk_now = next(self.walk)
-        self.x = walk_now[0][0]
-        self.y = walk_now[0][1]
+        self.x, self.y = self.walk.step()
         if self.living_time == 0:
             logger.info(
                 '[%f]초에 %d번째 새로운 모바일이 (%f,%f)에서 [%d mWs]의 '
@@ -207,6 +279,12 @@ class MobileNode(Node):
         #                  self.index, prev_x, prev_y, self.x, self.y)
         self.living_time += 1
 
+    def catch_up(self, t):
+        """ event 방식에서 건너뛴 move를 t tick까지 한꺼번에 함 """
+        for _ in range(t - self.arrival_time + 1 - self.living_time):
+            self.x, self.y = self.walk.step()
+            self.living_time += 1
+
     def print_me(self):
         logger.info(
             '%d번째 모바일이 (%f,%f)에 있으며, [%d/%d]-bytes의 [%s] 타입 '
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import numpy
+
+from mecs import mobility
+from mecs.mobilenode import battery_max, unit_time, job_start_probability
+
+logger = logging.getLogger(__name__)
+
+
+class MobilePopulation:
+    """
+    WholeMap의 모바일 전체를 MobileNode 객체 대신 numpy column으로 들고 있음.
+    (위치, 배터리, 남은 데이터, channel gain, app type, ...)
+    모든 모바일을 하나의 multi-node walk로 움직이고, 전송/처리에 따른 에너지와 데이터 양을
+    array 연산으로 한 번에 계산하므로 모바일이 10^4 ~ 10^5개여도 tick당 numpy 연산 몇 번으로 끝남.
+    작업 시작/전송 끝/처리 끝/떠남처럼 server나 log가 필요한 모바일만 python으로 하나씩 처리함.
+
+    MobileNode와 모델(확률, 에너지, 전송량)은 같지만 모든 모바일이 random stream 하나를 같이 쓰므로
+    같은 seed라도 MobileNode로 돌린 결과와 값이 같지는 않음.
+    WholeMap(..., vectorized=True)로 쓰면 map.mobiles 자리에 들어가서
+    `index in mobiles`, `mobiles[index]`, `mobiles.items()`처럼 dict와 같은 방식으로 접근할 수 있음.
+    """
+
+    def __init__(self, whole_map, capacity=16):
+        self.map = whole_map
+        self.rng = numpy.random.RandomState(whole_map.random.getrandbits(32))
+        self.walk = mobility.TruncatedLevyWalkNodes(
+            (whole_map.maxX, whole_map.maxY), rng=self.rng, capacity=capacity)
+
+        # application 정보. app type은 이 순서의 번호로 들고 있음 (-1: 작업 없음)
+        self.app_names = list(whole_map.applications)
+        info = numpy.array([whole_map.applications[name]
+                            for name in self.app_names]).reshape(-1, 4)
+        self.app_cycles = info[:, 0]
+        self.app_popularity_sum = numpy.cumsum(info[:, 1])
+        self.app_min_byte = info[:, 2].astype(numpy.int64)
+        self.app_max_byte = info[:, 3].astype(numpy.int64)
+
+        self.number_of_cpu_cycles_per_millisecond = 2 * 10 ** 9 * unit_time
+        self.bandwidth = 5 * 10 ** 6  # [Hz]
+        self.energy_for_one_cpu_cycle = 2 * 10 ** (-9)  # ( Ws / cycle )
+
+        self.n = 0
+        self.ids = numpy.zeros(capacity, dtype=numpy.int64)
+        self.arrival_time = numpy.zeros(capacity, dtype=numpy.int64)
+        self.living_time = numpy.zeros(capacity, dtype=numpy.int64)
+        self.battery = numpy.zeros(capacity)
+        self.transmission_power_to_offload = numpy.zeros(capacity)
+        self.amount_of_data_to_proceed = numpy.zeros(capacity)
+        self.amount_of_data_to_offload = numpy.zeros(capacity)
+        self.total_data = numpy.zeros(capacity)
+        self.application_type = numpy.zeros(capacity, dtype=numpy.int64)
+        self.channel_gain = numpy.zeros(capacity)
+        self.server = numpy.zeros(capacity, dtype=numpy.int64)
+        self.next_job_time = numpy.zeros(capacity, dtype=numpy.int64)
+        self.task_index = numpy.empty(capacity, dtype=object)
+
+    _columns = ('ids', 'arrival_time', 'living_time', 'battery',
+                'transmission_power_to_offload', 'amount_of_data_to_proceed',
+                'amount_of_data_to_offload', 'total_data', 'application_type',
+                'channel_gain', 'server', 'next_job_time', 'task_index')
+
+    # dict처럼 쓰기 위한 부분 (key는 WholeMap의 모바일 index)
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.ids[:self.n].tolist())
+
+    def __contains__(self, index):
+        return self.row(index) is not None
+
+    def __getitem__(self, index):
+        row = self.row(index)
+        if row is None:
+            raise KeyError(index)
+        return MobileRow(self, index)
+
+    def items(self):
+        return [(index, MobileRow(self, index)) for index in self]
+
+    def row(self, index):
+        # index 순서대로 추가하고 지울 때도 순서를 지키므로 ids는 항상 정렬되어 있음
+        row = int(numpy.searchsorted(self.ids[:self.n], index))
+        if row < self.n and self.ids[row] == index:
+            return row
+        return None
+
+    def statuses(self):
+        """ WholeMap.all_mobiles_log와 같은 모양의 모든 모바일 status """
+        return {'m' + str(index): self.get_status(row)
+                for row, index in enumerate(self.ids[:self.n].tolist())}
+
+    def _grow(self, size):
+        capacity = len(self.ids)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name in self._columns:
+            old = getattr(self, name)
+            new = numpy.zeros(capacity, dtype=old.dtype) \
+                if old.dtype != object else numpy.empty(capacity, dtype=object)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    @property
+    def x(self):
+        return self.walk.xy[:self.n, 0]
+
+    @property
+    def y(self):
+        return self.walk.xy[:self.n, 1]
+
+    def idle(self):
+        n = self.n
+        return (self.amount_of_data_to_proceed[:n] == 0) \
+            & (self.amount_of_data_to_offload[:n] == 0)
+
+    def draw_next_job_time(self, rows, t):
+        # tick마다 job_start_probability로 시작하는 것과 같은 분포 (geometric은 1부터)
+        self.next_job_time[rows] = t - 1 + self.rng.geometric(
+            job_start_probability, len(rows))
+
+    def add(self, t, first_index, count=1):
+        """ first_index부터 count개의 모바일을 t tick에 추가함 """
+        start, stop = self.n, self.n + count
+        self._grow(stop)
+        self.walk.add(count)
+        self.n = stop
+        rows = numpy.arange(start, stop)
+        self.ids[rows] = numpy.arange(first_index, first_index + count)
+        self.arrival_time[rows] = t
+        self.living_time[rows] = 0  # [millisecond]
+        self.battery[rows] = self.rng.randint(int(battery_max / 2),
+                                              int(battery_max), count)
+        self.transmission_power_to_offload[rows] = 3  # [W]
+        self.amount_of_data_to_proceed[rows] = 0  # [bytes]
+        self.amount_of_data_to_offload[rows] = 0  # [bytes]
+        self.total_data[rows] = 0
+        self.application_type[rows] = -1
+        self.task_index[rows] = ''
+        self.server[rows] = self.select_server(rows)
+        self.channel_gain[rows] = self.calculate_channel_gain(rows)
+        self.draw_next_job_time(rows, t)
+        return rows
+
+    def remove(self, keep):
+        count = int(numpy.count_nonzero(keep))
+        # 처음 지워지는 row 뒤쪽만 당기면 됨
+        first = int(numpy.argmin(keep)) if count < self.n else count
+        for name in self._columns:
+            column = getattr(self, name)
+            column[first:count] = column[first:self.n][keep[first:]]
+        self.walk.remove(keep)
+        self.n = count
+
+    def select_server(self, rows):
+        # MobileNode.select_server처럼 가장 가까운 server
+        indices, _ = self.map.server_grid.nearest(self.walk.xy[rows, 0],
+                                                  self.walk.xy[rows, 1])
+        return indices[:, 0]
+
+    def distance_to_server(self, rows=None):
+        rows = numpy.arange(self.n) if rows is None else rows
+        return self.map.server_grid.distance(
+            self.server[rows], self.walk.xy[rows, 0], self.walk.xy[rows, 1])
+
+    def calculate_channel_gain(self, rows=None):
+        dist = self.distance_to_server(rows)
+        return self.rng.randint(3000, 4000, len(dist)) / dist ** 2
+
+    def depart(self, t):
+        n = self.n
+        idle = self.idle()
+        rows = numpy.flatnonzero(idle)
+        hazard = self.map.departure_rate \
+            * numpy.log(self.living_time[rows] + 1)
+        leaving = (self.rng.random_sample(len(rows)) < hazard) \
+            | (self.battery[rows] < self.map.battery_limit)
+        rows = rows[leaving]
+        if rows.size == 0:
+            return []
+        indices = self.ids[rows].tolist()
+        for index in indices:
+            self.map.log_departure(t, index)
+        keep = numpy.ones(n, dtype=bool)
+        keep[rows] = False
+        self.remove(keep)
+        # TODO : abort the offloaded task
+        return indices
+
+    def move(self, t):
+        n = self.n
+        new = numpy.flatnonzero(self.living_time[:n] == 0)
+        self.walk.step()
+        for row in new.tolist():
+            logger.info(
+                '[%f]초에 %d번째 새로운 모바일이 (%f,%f)에서 [%d mWs]의 '
+                '에너지를 가지고 생성되었습니다.',
+                float(t) / 1000, self.ids[row] + 1, self.walk.xy[row, 0],
+                self.walk.xy[row, 1], self.battery[row])
+        self.living_time[:n] += 1
+
+    def transmit_and_proceed(self, t):
+        n = self.n
+        starting = numpy.flatnonzero(self.idle()
+                                     & (self.next_job_time[:n] <= t))
+
+        # 오프로딩 할 데이터가 남아있으면 전송하자.
+        rows = numpy.flatnonzero(self.amount_of_data_to_offload[:n] != 0)
+        power = self.transmission_power_to_offload[rows]
+        self.battery[rows] -= power * unit_time
+        maximum_data_rate = unit_time * self.bandwidth * numpy.log(
+            1 + power * self.channel_gain[rows] ** 2)
+        offload = self.amount_of_data_to_offload[rows]
+        offload -= numpy.minimum(offload, maximum_data_rate)
+        self.amount_of_data_to_offload[rows] = offload
+        transmitted = rows[offload == 0]
+
+        # 헤비한 작업이 남아 있으면 직접 수행하자.
+        rows = numpy.flatnonzero(self.amount_of_data_to_proceed[:n] != 0)
+        cpu_cycles_for_one_byte_process = \
+            self.app_cycles[self.application_type[rows]]
+        bytes_per_millisecond = self.number_of_cpu_cycles_per_millisecond \
+            / cpu_cycles_for_one_byte_process
+        proceed = self.amount_of_data_to_proceed[rows]
+        proceed -= numpy.minimum(proceed, bytes_per_millisecond)
+        self.amount_of_data_to_proceed[rows] = proceed
+        self.battery[rows] -= self.energy_for_one_cpu_cycle \
+            * cpu_cycles_for_one_byte_process * bytes_per_millisecond
+        proceeded = rows[proceed == 0]
+
+        for row in transmitted.tolist():
+            self.map.servers[self.server[row]].task_ready(self.task_index[row])
+            logger.info(
+                '[%f]초에 %d번째 모바일의 [%s] 타입의 오프로딩 데이터의 '
+                '전송 작업이 끝났습니다. 배터리 잔량: [%d mWs] ',
+                float(t) / 1000, self.ids[row] + 1,
+                self.app_names[self.application_type[row]], self.battery[row])
+        for row in proceeded.tolist():
+            logger.info(
+                '[%f]초에 %d번째 모바일의 [%s] 타입의 헤비 프로세스가 '
+                '끝났습니다. 배터리 잔량: [%d mWs]',
+                float(t) / 1000, self.ids[row] + 1,
+                self.app_names[self.application_type[row]], self.battery[row])
+        finished = numpy.union1d(transmitted, proceeded)
+        finished = finished[(self.amount_of_data_to_proceed[finished] == 0)
+                            & (self.amount_of_data_to_offload[finished] == 0)]
+        self.draw_next_job_time(finished, t + 1)
+
+        if starting.size > 0:
+            self.start_jobs(starting, t)
+
+    def start_jobs(self, rows, t):
+        # 어떠한 무거운 작업을 시작할 것인지 popularity에 따라 고르자.
+        apps = numpy.searchsorted(self.app_popularity_sum,
+                                  self.rng.random_sample(len(rows)),
+                                  side='right')
+        chosen = apps < len(self.app_names)
+        # 고른 작업이 없으면 계속 쉼
+        self.draw_next_job_time(rows[~chosen], t + 1)
+        rows, apps = rows[chosen], apps[chosen]
+        amount = self.rng.randint(self.app_min_byte[apps],
+                                  self.app_max_byte[apps]).astype(float)
+        self.application_type[rows] = apps
+        self.total_data[rows] = amount
+        # 이제 얼마나 오프로딩을 할 지 결정하자.
+        offload = amount // 2
+        self.amount_of_data_to_offload[rows] = offload
+        self.amount_of_data_to_proceed[rows] = amount - offload
+        for row in rows.tolist():
+            index = self.ids[row] + 1
+            app_type = self.app_names[self.application_type[row]]
+            logger.info(
+                '[%f]초에 %d번째 모바일이 [%s] type의 [%d] bytes에 '
+                '해당하는 작업을 시작하였습니다. 배터리 잔량: [%d mWs]',
+                float(t) / 1000, index, app_type, self.total_data[row],
+                self.battery[row])
+            logger.info(
+                '오프로딩할 데이터의 양은 [%d]-bytes, 직접 처리할 데이터의 양은 '
+                '[%d]-bytes로 결정하였습니다.',
+                self.amount_of_data_to_offload[row],
+                self.amount_of_data_to_proceed[row])
+            self.task_index[row] = \
+                self.map.servers[self.server[row]].get_info_about_offload(
+                    index, app_type, self.amount_of_data_to_offload[row])
+
+    def columns(self, fields):
+        """ 모바일 index와 fields의 column 복사본 (StatusLogSink에서 씀) """
+        n = self.n
+        columns = {'index': self.ids[:n].copy()}
+        for field in fields:
+            if field in ('x', 'y'):
+                columns[field] = getattr(self, field).copy()
+            elif field == 'application_type':
+                # -1 (작업 없음)은 마지막의 ''
+                names = numpy.array(self.app_names + [''])
+                columns[field] = names[self.application_type[:n]]
+            else:
+                columns[field] = getattr(self, field)[:n].copy()
+        return columns
+
+    def get_status(self, row):
+        app_type = self.application_type[row]
+        return {
+            'x': float(self.walk.xy[row, 0]),
+            'y': float(self.walk.xy[row, 1]),
+            'living_time': int(self.living_time[row]),
+            'battery': float(self.battery[row]),
+            'number_of_cpu_cycles_per_millisecond':
+                self.number_of_cpu_cycles_per_millisecond,
+            'transmission_power_to_offload':
+                float(self.transmission_power_to_offload[row]),
+            'amount_of_data_to_proceed':
+                float(self.amount_of_data_to_proceed[row]),
+            'application_type': self.app_names[app_type] if app_type >= 0 else '',
+            'amount_of_data_to_offload':
+                float(self.amount_of_data_to_offload[row]),
+            'money_to_pay': 0,
+            'happiness': 0,
+            'bandwidth': self.bandwidth,
+            'node_type': 2,
+            'target_server': self.map.servers[self.server[row]].get_uuid(),
+            'channel_gain': float(self.channel_gain[row]),
+            'energy_for_one_cpu_cycle': self.energy_for_one_cpu_cycle
+        }
+
+
+class MobileRow:
+    """ MobilePopulation의 모바일 하나를 MobileNode처럼 보이게 하는 view """
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index + 1
+
+    def _row(self):
+        return self.population.row(self.index - 1)
+
+    def __getattr__(self, name):
+        if name == 'population':
+            raise AttributeError(name)
+        status = self.get_status()
+        if name in status:
+            return status[name]
+        if name == 'server':
+            return self.population.map.servers[
+                self.population.server[self._row()]]
+        if name in MobilePopulation._columns:
+            return getattr(self.population, name)[self._row()]
+        raise AttributeError(name)
+
+    def get_status(self):
+        return self.population.get_status(self._row())
+
+    def return_result(self, t, task_id):
+        logger.info('[%d] Mobile %d - Offloaded Task %s is over',
+                    t, self.index, task_id)
+
+    def print_me(self):
+        status = self.get_status()
+        logger.info(
+            '%d번째 모바일이 (%f,%f)에 있으며, [%d/%d]-bytes의 [%s] 타입 '
+            '데이터를 처리중입니다. 배터리 잔량: [%d mWs], Task ID %s',
+            self.index, status['x'], status['y'],
+            status['amount_of_data_to_proceed'],
+            self.population.total_data[self._row()],
+            status['application_type'], status['battery'],
+            self.population.task_index[self._row()])
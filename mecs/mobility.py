@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 from numpy.random import rand
 
@@ -429,6 +431,235 @@ class TruncatedLevyWalk(StochasticWalk):
                                 border_policy=border_policy)
 
 
+class TruncatedLevyWalkNode(object):
+    def __init__(self, dimensions, FL_EXP=-2.6, FL_MAX=50., WT_EXP=-1.8, WT_MAX=100., rng=None):
+        '''
+        Truncated Levy Walk of a single node with the 'reflect' border policy.
+        Steps the same way as TruncatedLevyWalk(1, dimensions), but with plain floats instead of
+        numpy arrays, and draws from its own *rng* so that nodes can be stepped in any order
+        (or lazily, only when their position is needed).
+        Given the same numpy random state, step() gives exactly the positions of truncated_levy_walk(1, ...).
+
+        Required arguments:
+          *dimensions*:
+            Tuple of Integers, the x and y dimensions of the simulation area.
+
+        keyword arguments:
+          *FL_EXP*, *FL_MAX*, *WT_EXP*, *WT_MAX*:
+            Same as TruncatedLevyWalk.
+          *rng*:
+            numpy.random.RandomState to draw from. Default is the global numpy random state.
+        '''
+        self.dimensions = dimensions
+        self.rand = (rng if rng is not None else np.random).rand
+        self.fl_scale = FL_MAX ** (FL_EXP + 1.) - 1.
+        self.fl_power = 1. / (FL_EXP + 1.)
+        if WT_EXP and WT_MAX:
+            self.wt_scale = WT_MAX ** (WT_EXP + 1.) - 1.
+            self.wt_power = 1. / (WT_EXP + 1.)
+        else:
+            self.wt_scale = None
+
+        max_x, max_y = dimensions
+        self.x = self.rand() * max_x
+        self.y = self.rand() * max_y
+        self.new_flight()
+        # starts with no wating time
+        self.wt = 0.
+
+    def new_flight(self):
+        # power of a length-1 array, so that the result matches the numpy version bit for bit
+        self.fl = float(((self.fl_scale * self.rand(1) + 1.) ** self.fl_power)[0])
+        self.velocity = math.sqrt(self.fl) / 10.
+        dx = self.rand() - 0.5
+        dy = self.rand() - 0.5
+        norm = math.sqrt(dx * dx + dy * dy)
+        self.mx = dx / norm * self.velocity
+        self.my = dy / norm * self.velocity
+
+    def step(self):
+        self.x += self.mx
+        self.y += self.my
+        self.fl -= self.velocity
+
+        # step back if the node surpassed fl
+        arrived = self.velocity > 0. and self.fl <= 0.
+        if arrived:
+            diff = self.fl / self.velocity
+            self.x += diff * self.mx
+            self.y += diff * self.my
+
+        # node bounces on the margins
+        max_x, max_y = self.dimensions
+        if self.x < 0:
+            self.x = - self.x
+            self.mx = -self.mx
+        if self.x > max_x:
+            self.x = 2 * max_x - self.x
+            self.mx = -self.mx
+        if self.y < 0:
+            self.y = - self.y
+            self.my = -self.my
+        if self.y > max_y:
+            self.y = 2 * max_y - self.y
+            self.my = -self.my
+
+        if self.wt_scale is not None:
+            if arrived:
+                self.velocity = 0.
+                self.wt = float(((self.wt_scale * self.rand(1) + 1.) ** self.wt_power)[0])
+            # update info for paused node
+            if self.velocity == 0.:
+                self.wt -= 1.
+            arrived = self.velocity == 0. and self.wt < 0.
+
+        # update info for moving node
+        if arrived:
+            self.new_flight()
+
+        return self.x, self.y
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.step()
+
+
+class TruncatedLevyWalkNodes(object):
+    def __init__(self, dimensions, FL_EXP=-2.6, FL_MAX=50., WT_EXP=-1.8, WT_MAX=100., rng=None, capacity=16):
+        '''
+        Truncated Levy Walk with the 'reflect' border policy for a set of nodes that can grow and shrink.
+        All nodes are stepped together with array operations, as in TruncatedLevyWalk,
+        but nodes can be added (add) and removed (remove) between steps.
+        Adding n nodes to an empty walk and stepping it gives exactly the positions of truncated_levy_walk(n, ...)
+        with the same numpy random state.
+
+        Required arguments:
+          *dimensions*:
+            Tuple of Integers, the x and y dimensions of the simulation area.
+
+        keyword arguments:
+          *FL_EXP*, *FL_MAX*, *WT_EXP*, *WT_MAX*:
+            Same as TruncatedLevyWalk.
+          *rng*:
+            numpy.random.RandomState to draw from. Default is the global numpy random state.
+          *capacity*:
+            Integer, the number of nodes to allocate for. Grows as needed.
+        '''
+        self.dimensions = dimensions
+        self.rand = (rng if rng is not None else np.random).rand
+        self.FL_DISTR = lambda SAMPLES: ((FL_MAX ** (FL_EXP + 1.) - 1.) * self.rand(*SAMPLES.shape) + 1.) ** (1. / (FL_EXP + 1.))
+        if WT_EXP and WT_MAX:
+            self.WT_DISTR = lambda SAMPLES: ((WT_MAX ** (WT_EXP + 1.) - 1.) * self.rand(*SAMPLES.shape) + 1.) ** (1. / (WT_EXP + 1.))
+        else:
+            self.WT_DISTR = None
+        self.VELOCITY_DISTR = lambda FD: np.sqrt(FD) / 10.
+
+        ndim = len(dimensions)
+        self.n = 0
+        self.xy = np.zeros((capacity, ndim))
+        self.movement = np.zeros((capacity, ndim))
+        self.fl = np.zeros(capacity)
+        self.velocity = np.zeros(capacity)
+        self.wt = np.zeros(capacity)
+
+    _columns = ('xy', 'movement', 'fl', 'velocity', 'wt')
+
+    def __len__(self):
+        return self.n
+
+    def positions(self):
+        return self.xy[:self.n]
+
+    def directions(self, count):
+        direction = self.rand(count, len(self.dimensions)) - 0.5
+        direction /= np.linalg.norm(direction, axis=1)[:, np.newaxis]
+        return direction
+
+    def add(self, count):
+        '''
+        Adds *count* nodes at uniformly random positions and returns their indices.
+        '''
+        start, stop = self.n, self.n + count
+        if stop > len(self.fl):
+            capacity = max(stop, 2 * len(self.fl))
+            for name in self._columns:
+                old = getattr(self, name)
+                new = np.zeros((capacity,) + old.shape[1:])
+                new[:start] = old[:start]
+                setattr(self, name, new)
+        NODES = np.arange(count)
+        ndim = len(self.dimensions)
+        self.xy[start:stop] = self.rand(count, ndim) * np.array(self.dimensions)
+        fl = self.FL_DISTR(NODES)
+        velocity = self.VELOCITY_DISTR(fl)
+        self.fl[start:stop] = fl
+        self.velocity[start:stop] = velocity
+        self.movement[start:stop] = self.directions(count) * velocity[:, np.newaxis]
+        # starts with no wating time
+        self.wt[start:stop] = 0.
+        self.n = stop
+        return np.arange(start, stop)
+
+    def remove(self, keep):
+        '''
+        Keeps only the nodes where the boolean array *keep* is True, in the same order.
+        '''
+        count = int(np.count_nonzero(keep))
+        # only the rows after the first removed one move
+        first = int(np.argmin(keep[:self.n])) if count < self.n else count
+        for name in self._columns:
+            column = getattr(self, name)
+            column[first:count] = column[first:self.n][keep[first:self.n]]
+        self.n = count
+
+    def step(self):
+        n = self.n
+        xy = self.xy[:n]
+        movement = self.movement[:n]
+        fl = self.fl[:n]
+        velocity = self.velocity[:n]
+        wt = self.wt[:n]
+        ndim = len(self.dimensions)
+
+        xy += movement
+        fl -= velocity
+
+        # step back for nodes that surpassed fl
+        arrived = np.where(np.logical_and(velocity > 0., fl <= 0.))[0]
+        if arrived.size > 0:
+            diff = fl.take(arrived) / velocity.take(arrived)
+            xy[arrived] += np.dstack((diff,) * ndim)[0] * movement[arrived]
+
+        # node bounces on the margins
+        for dim, max_d in enumerate(self.dimensions):
+            b = np.where(xy[:, dim] < 0)[0]
+            if b.size > 0:
+                xy[b, dim] = - xy[b, dim]
+                movement[b, dim] = -movement[b, dim]
+            b = np.where(xy[:, dim] > max_d)[0]
+            if b.size > 0:
+                xy[b, dim] = 2 * max_d - xy[b, dim]
+                movement[b, dim] = -movement[b, dim]
+
+        if self.WT_DISTR:
+            velocity[arrived] = 0.
+            wt[arrived] = self.WT_DISTR(arrived)
+            # update info for paused nodes
+            wt[np.where(velocity == 0.)[0]] -= 1.
+            arrived = np.where(np.logical_and(velocity == 0., wt < 0.))[0]
+
+        # update info for moving nodes
+        if arrived.size > 0:
+            fl[arrived] = self.FL_DISTR(arrived)
+            velocity[arrived] = self.VELOCITY_DISTR(fl[arrived])
+            v = velocity[arrived]
+            movement[arrived] = v[:, np.newaxis] * self.directions(arrived.size)
+
+        return xy
+
+
 class HeterogeneousTruncatedLevyWalk(StochasticWalk):
     def __init__(self, nr_nodes, dimensions, WT_EXP=-1.8, WT_MAX=100., FL_EXP=-2.6, FL_MAX=50.,
                  border_policy='reflect'):
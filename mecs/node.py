@@ -1,11 +1,16 @@
-import uuid
 from abc import abstractmethod, ABCMeta
 
+try:
+    from mecs.id_provider import new_id
+except ImportError:
+    # mecs/만 sys.path에 있을 때 (agents_ppo에서 servernode_w_queue가 flat으로 import함)
+    from id_provider import new_id
+
 
 class Node(metaclass=ABCMeta):
 
     def __init__(self, *args, **kwargs):
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.node_type = 0
 
     @abstractmethod
@@ -13,7 +18,7 @@ class Node(metaclass=ABCMeta):
         pass
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     @abstractmethod
     def get_status(self):
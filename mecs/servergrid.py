@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import numpy
+
+
+class ServerGrid:
+    """
+    server 좌표를 uniform grid에 넣어 두고 모바일 위치 batch에 대해
+    가장 가까운 k개의 server, 반경 안의 server를 찾음.
+    server 번호는 추가된 순서 (WholeMap.servers의 index)와 같음.
+
+    add는 좌표를 뒤에 붙이기만 하고, cell별 정렬(CSR)은 다음 query 때 한 번만 다시 만듦.
+    server가 cell 수보다 많아지면 cell 크기를 반으로 줄여서 cell당 server 수를 일정하게 유지함.
+    query는 모바일이 있는 cell에서 시작해 주변 cell을 한 겹씩 넓혀 가므로
+    server가 많아도 모바일 하나당 주변 cell 몇 개만 봄.
+    """
+
+    def __init__(self, maxX, maxY, cell_size=None, servers_per_cell=2):
+        self.maxX = maxX
+        self.maxY = maxY
+        self.fixed_cell_size = cell_size is not None
+        self.cell_size = float(cell_size if cell_size is not None
+                               else max(maxX, maxY, 1))
+        self.servers_per_cell = servers_per_cell
+        self.n = 0
+        self.xy = numpy.zeros((16, 2))
+        self.cell = numpy.zeros(16, dtype=numpy.int64)
+        self.order = None
+        self.start = None
+        self.shape_grid()
+
+    def __len__(self):
+        return self.n
+
+    def shape_grid(self):
+        self.nx = int(self.maxX // self.cell_size) + 1
+        self.ny = int(self.maxY // self.cell_size) + 1
+
+    def cell_of(self, xs, ys):
+        cx = numpy.floor(xs / self.cell_size).astype(numpy.int64)
+        cy = numpy.floor(ys / self.cell_size).astype(numpy.int64)
+        return cx, cy
+
+    def cell_id(self, cx, cy):
+        cx = numpy.clip(cx, 0, self.nx - 1)
+        cy = numpy.clip(cy, 0, self.ny - 1)
+        return cx * self.ny + cy
+
+    def add(self, x, y):
+        """ server 좌표를 추가하고 그 server 번호를 돌려줌 """
+        if self.n == len(self.xy):
+            self.xy = numpy.concatenate([self.xy, numpy.zeros_like(self.xy)])
+            self.cell = numpy.concatenate([self.cell,
+                                           numpy.zeros_like(self.cell)])
+        index = self.n
+        self.xy[index] = (x, y)
+        self.cell[index] = self.cell_id(*self.cell_of(self.xy[index, 0],
+                                                      self.xy[index, 1]))
+        self.n += 1
+        if not self.fixed_cell_size and self.cell_size > 1 \
+                and self.n > self.servers_per_cell * self.nx * self.ny:
+            self.cell_size /= 2
+            self.shape_grid()
+            self.cell[:self.n] = self.cell_id(
+                *self.cell_of(self.xy[:self.n, 0], self.xy[:self.n, 1]))
+        self.order = None
+        return index
+
+    def build(self):
+        # cell 번호 순서로 server를 정렬하고 cell마다 시작 위치를 적어 둠
+        self.order = numpy.argsort(self.cell[:self.n], kind='stable')
+        self.start = numpy.searchsorted(self.cell[:self.n][self.order],
+                                        numpy.arange(self.nx * self.ny + 1))
+
+    def gather(self, queries, cx, cy):
+        """ (query, cell) 쌍마다 그 cell의 server를 모두 꺼내 (query, server) 쌍으로 돌려줌 """
+        valid = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+        queries = queries[valid]
+        cells = cx[valid] * self.ny + cy[valid]
+        begin = self.start[cells]
+        count = self.start[cells + 1] - begin
+        total = int(count.sum())
+        offset = numpy.arange(total) - numpy.repeat(numpy.cumsum(count) - count,
+                                                    count)
+        servers = self.order[numpy.repeat(begin, count) + offset]
+        return numpy.repeat(queries, count), servers
+
+    @staticmethod
+    def ring(r):
+        if r == 0:
+            return numpy.zeros(1, dtype=numpy.int64), \
+                numpy.zeros(1, dtype=numpy.int64)
+        d = numpy.arange(-r, r + 1)
+        dx, dy = numpy.meshgrid(d, d, indexing='ij')
+        edge = numpy.maximum(abs(dx), abs(dy)) == r
+        return dx[edge], dy[edge]
+
+    def distance(self, servers, xs, ys):
+        """ servers[i]와 (xs[i], ys[i]) 사이의 거리 """
+        servers = numpy.asarray(servers)
+        return numpy.hypot(numpy.asarray(xs, dtype=float) - self.xy[servers, 0],
+                           numpy.asarray(ys, dtype=float) - self.xy[servers, 1])
+
+    @staticmethod
+    def first_k(queries, servers, dist, m, k):
+        """ query마다 거리가 가까운 순서로 k개까지 골라 (m, k) 배열로 만듦 (없으면 -1, inf) """
+        order = numpy.lexsort((servers, dist, queries))
+        queries, servers, dist = queries[order], servers[order], dist[order]
+        first = numpy.searchsorted(queries, numpy.arange(m))
+        rank = numpy.arange(len(queries)) - first[queries]
+        keep = rank < k
+        indices = numpy.full((m, k), -1, dtype=numpy.int64)
+        distances = numpy.full((m, k), numpy.inf)
+        indices[queries[keep], rank[keep]] = servers[keep]
+        distances[queries[keep], rank[keep]] = dist[keep]
+        return indices, distances
+
+    def nearest(self, xs, ys, k=1):
+        """
+        (xs[i], ys[i])마다 가장 가까운 server k개의 번호와 거리를 (m, k) 배열로 돌려줌.
+        server가 k개보다 적으면 남는 칸은 -1과 inf.
+        """
+        if self.n == 0:
+            raise ValueError('no server to select')
+        xs = numpy.atleast_1d(numpy.asarray(xs, dtype=float))
+        ys = numpy.atleast_1d(numpy.asarray(ys, dtype=float))
+        m = len(xs)
+        if self.order is None:
+            self.build()
+        c = self.cell_size
+        cx, cy = self.cell_of(xs, ys)
+        # 지금까지 본 cell들이 (xs, ys)에서 적어도 이만큼은 덮고 있음
+        margin = numpy.minimum.reduce([xs - cx * c, (cx + 1) * c - xs,
+                                       ys - cy * c, (cy + 1) * c - ys])
+        want = min(k, self.n)
+        # 끝난 query의 후보는 done_*로 옮기고, 아직 찾는 중인 query의 후보만 계속 다시 정렬함
+        done_q, done_s = [], []
+        q = s = numpy.zeros(0, dtype=numpy.int64)
+        pending = numpy.arange(m)
+        r = 0
+        while pending.size > 0:
+            dx, dy = self.ring(r)
+            ring_q, ring_s = self.gather(
+                numpy.repeat(pending, len(dx)),
+                (cx[pending, None] + dx).ravel(),
+                (cy[pending, None] + dy).ravel())
+            q = numpy.concatenate([q, ring_q])
+            s = numpy.concatenate([s, ring_s])
+            # 덮은 범위 안에 want개가 있거나 grid 전체를 봤으면 끝
+            _, dist = self.first_k(q, s, self.distance(s, xs[q], ys[q]), m,
+                                   want)
+            kth = dist[pending, want - 1]
+            covered = (cx[pending] - r <= 0) & (cx[pending] + r >= self.nx - 1) \
+                & (cy[pending] - r <= 0) & (cy[pending] + r >= self.ny - 1)
+            finished = numpy.zeros(m, dtype=bool)
+            finished[pending] = covered | (kth <= r * c + margin[pending])
+            done_q.append(q[finished[q]])
+            done_s.append(s[finished[q]])
+            q, s = q[~finished[q]], s[~finished[q]]
+            pending = pending[~finished[pending]]
+            r += 1
+        q = numpy.concatenate(done_q)
+        s = numpy.concatenate(done_s)
+        indices, distances = self.first_k(q, s, self.distance(s, xs[q], ys[q]),
+                                          m, want)
+        if want < k:
+            indices = numpy.pad(indices, ((0, 0), (0, k - want)),
+                                constant_values=-1)
+            distances = numpy.pad(distances, ((0, 0), (0, k - want)),
+                                  constant_values=numpy.inf)
+        return indices, distances
+
+    def within(self, xs, ys, radius):
+        """ (xs[i], ys[i])마다 radius 안에 있는 server 번호들을 가까운 순서로 list에 담아 돌려줌 """
+        xs = numpy.atleast_1d(numpy.asarray(xs, dtype=float))
+        ys = numpy.atleast_1d(numpy.asarray(ys, dtype=float))
+        m = len(xs)
+        if self.n == 0:
+            return [numpy.zeros(0, dtype=numpy.int64) for _ in range(m)]
+        if self.order is None:
+            self.build()
+        cx, cy = self.cell_of(xs, ys)
+        reach = int(numpy.ceil(radius / self.cell_size))
+        d = numpy.arange(-reach, reach + 1)
+        dx, dy = [a.ravel() for a in numpy.meshgrid(d, d, indexing='ij')]
+        q, s = self.gather(numpy.repeat(numpy.arange(m), len(dx)),
+                           (cx[:, None] + dx).ravel(),
+                           (cy[:, None] + dy).ravel())
+        dist = self.distance(s, xs[q], ys[q])
+        inside = dist <= radius
+        q, s, dist = q[inside], s[inside], dist[inside]
+        order = numpy.lexsort((s, dist, q))
+        q, s = q[order], s[order]
+        return numpy.split(s, numpy.searchsorted(q, numpy.arange(1, m)))
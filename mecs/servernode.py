@@ -1,6 +1,7 @@
 import logging
-import uuid
 
+from mecs.id_provider import new_id
+from mecs.config import hot_path_logging
 from mecs.node import Node
 
 from mecs.task import Task
@@ -17,7 +18,7 @@ class ServerNode(Node):
         self.y = y
         self.channels = {}
         self.tasks = {}
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.node_type = 1  # 1 : server node
         self.schedule_method = schedule_method
         self.computation_capability = computation_capability  # clocks/tick
@@ -25,7 +26,8 @@ class ServerNode(Node):
     def get_info_about_offload(self, index, application_type,
                                amount_of_offload):
         # task creation
-        t = Task(index, self.get_uuid(), application_type, amount_of_offload)
+        t = Task(application_type, amount_of_offload, client_index=index,
+                 server_index=self.get_uuid())
         self.tasks[t.uuid] = t
         logging.debug('task %s of %d for %d created',
                       t.uuid, amount_of_offload, index)
@@ -42,7 +44,8 @@ class ServerNode(Node):
 
     def remove_multiple_tasks(self, task_list):
         for index in task_list:
-            logger.debug('Task %s removed', index)
+            if hot_path_logging:
+                logger.debug('Task %s removed', index)
             del self.tasks[index]
 
     def print_me(self):
@@ -60,7 +63,7 @@ class ServerNode(Node):
                     task.client_index)
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     def abort_task(self, task_id):
         logger.info('Task %s aborted', task_id)
@@ -76,14 +79,16 @@ class ServerNode(Node):
                     # % (t, task.client_index, task.share))
                     task.computation_over += \
                         (task.share * self.computation_capability)
-                    logger.debug('[%d] Task %s : %f/%d with share %f',
-                                 t, index, task.computation_over,
-                                 task.data_size, task.share)
+                    if hot_path_logging:
+                        logger.debug('[%d] Task %s : %f/%d with share %f',
+                                     t, index, task.computation_over,
+                                     task.data_size, task.share)
 
                     if task.computation_over >= task.data_size:
-                        logger.debug(
-                            '[%d] Server : task of %d - %f data over',
-                            t, task.client_index, task.data_size)
+                        if hot_path_logging:
+                            logger.debug(
+                                '[%d] Server : task of %d - %f data over',
+                                t, task.client_index, task.data_size)
                         if task.client_index - 1 in self.map.mobiles:
                             self.map.mobiles[task.client_index - 1] \
                                 .return_result(t, task.uuid)
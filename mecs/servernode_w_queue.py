@@ -1,10 +1,14 @@
 import logging
-import uuid
 import copy
 import numpy as np
 from node import Node
 from task import Task
-from task_queue import TaskQueue
+try:
+    from mecs.id_provider import new_id
+except ImportError:
+    # mecs/만 sys.path에 있을 때 (agents_ppo). 이때는 mecs.id_provider도 올라올 수 없으므로 id_provider가 하나뿐임
+    from id_provider import new_id
+from task_queue import TaskQueue, ArrayTaskQueue
 from channels import *
 import applications
 from utilities import *
@@ -13,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 
 class ServerNode(Node):
-    def __init__(self, computation_capability, is_random_task_generating=False):
+    def __init__(self, computation_capability, is_random_task_generating=False, generation_block=1, size_dist='deterministic'):
         super().__init__()
         # self.map = whole_map
         # self.x = x
@@ -21,13 +25,21 @@ class ServerNode(Node):
         # 연결된 uuid와 그와 통신하는 protocol과 그 해당하는 rate?이 필요함..protocol에 포함될수도.
         self.links_to_lower = {} # 하위 device와 통신
         self.links_to_higher = {} # 상위 device와 통신
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.mobility = False
         # self.schedule_method = schedule_method
         self.computation_capability = computation_capability  # clocks/tick
         self.number_of_applications = 0
         self.queue_list = {} # 어플마다 각자의 큐가 필요함.
         self.is_random_task_generating = is_random_task_generating
+        # random_task_generation이 몇 step 분량의 poisson 개수를 미리 뽑아 둘지 (applications.ArrivalGenerator)
+        self.generation_block = generation_block
+        # task 크기 분포 ('deterministic', 'normal', 'lognormal', 'pareto')
+        self.size_dist = size_dist
+        # 도착을 뽑을 np.random.RandomState와 그 size sampler cache. None이면 np.random (env.set_rng)
+        self.rng = None
+        self.sampler_cache = None
+        self.arrival_generator = None
 
     def __del__(self):
         iter = list(self.queue_list.keys())
@@ -35,10 +47,12 @@ class ServerNode(Node):
             del self.queue_list[app_type]
         del self
 
-    def make_application_queues(self, *application_types):
+    # queue_class=ArrayTaskQueue 이면 numpy ring buffer 기반 queue를 씀
+    def make_application_queues(self, *application_types, queue_class=TaskQueue):
         for application_type in application_types:
-            self.queue_list[application_type] = TaskQueue(application_type)
+            self.queue_list[application_type] = queue_class(application_type)
             self.number_of_applications += 1
+        self.arrival_generator = None
         return
 
     # 모든 application에 대한 액션 alpha, 실제 활용한 총 cpu 비율 return
@@ -121,27 +135,17 @@ class ServerNode(Node):
     # 사실 하위 device에서 offload 받은 task를 전해 받아야 함.
     # 일단 simulation을 위해 그냥 만들어 놓음. 하..
     def random_task_generation(self, task_rate, arrival_timestamp, *app_types):
-        app_type_list = applications.app_type_list()
-        app_type_pop = applications.app_type_pop()
-        this_app_type_list = list(self.queue_list.keys())
-        random_id = uuid.uuid4()
-        # queue_list = {}
-        # task_type = np.random.choice(app_type_list, app_type_pop)
+        if self.arrival_generator is None:
+            self.arrival_generator = applications.ArrivalGenerator(self.queue_list, self.generation_block, self.size_dist,
+                                                                   self.rng, self.sampler_cache)
+        random_id = new_id()
         arrival_size = np.zeros(len(app_types))
         failed_to_generate = 0
-        for app_type, population in app_type_pop:
-            if app_type in this_app_type_list:
-                data_size = np.random.poisson(task_rate*population)*applications.arrival_bits(app_type)
-                if data_size >0:
-                    task = Task(app_type, data_size, client_index = random_id.hex, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
-                    failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
-                    arrival_size[app_type-1]= data_size
-                    # print("arrival of app_type{} : {}".format(app_type, data_size))
-                else:
-                    pass
-                    # print("no arrival of app_type{} occured".format(app_type))
-            else:
-                pass
+        for app_type, data_size in self.arrival_generator.next(task_rate):
+            if data_size > 0:
+                task = Task(app_type, data_size, client_index = random_id, server_index = self.get_uuid(), arrival_timestamp=arrival_timestamp)
+                failed_to_generate += (not self.queue_list[app_type].arrived(task, arrival_timestamp))
+                arrival_size[app_type-1]= data_size
         # self.arrival_size_buffer.add(arrival_size)
         return arrival_size, failed_to_generate
     #
@@ -185,6 +189,21 @@ class ServerNode(Node):
                     index, task.computation_over, task.data_size,
                     task.client_index)
 
+    # queue들과 미리 뽑아 둔 도착 개수 (ArrivalGenerator)의 상태. link와 capability는 바뀌지 않으므로 넣지 않음
+    def snapshot(self):
+        generator = self.arrival_generator
+        return {'queues': {app_type: queue.snapshot() for app_type, queue in self.queue_list.items()},
+                'generator': None if generator is None else (generator.task_rate, generator.counts, generator.next_row)}
+
+    def restore(self, state):
+        for app_type, queue_state in state['queues'].items():
+            self.queue_list[app_type].restore(queue_state)
+        self.arrival_generator = None
+        if state['generator'] is not None:
+            self.arrival_generator = applications.ArrivalGenerator(self.queue_list, self.generation_block, self.size_dist,
+                                                                   self.rng, self.sampler_cache)
+            self.arrival_generator.task_rate, self.arrival_generator.counts, self.arrival_generator.next_row = state['generator']
+
     def get_higher_node_ids(self):
         return list(self.links_to_higher.keys())
 
@@ -1,12 +1,22 @@
-import uuid
 import logging
 from abc import abstractmethod, ABCMeta
 import collections
 import copy
+import operator
 import numpy as np
 import applications
 # from mecs.task import Task
 from task import *
+try:
+    from mecs.id_provider import new_id
+except ImportError:
+    # mecs/만 sys.path에 있을 때 (agents_ppo). 이때는 mecs.id_provider도 올라올 수 없으므로 id_provider가 하나뿐임
+    from id_provider import new_id
+try:
+    from mecs.config import hot_path_logging
+except ImportError:
+    # mecs/만 sys.path에 있을 때 (agents_ppo). 이때는 mecs.config도 올라올 수 없으므로 config가 하나뿐임
+    from config import hot_path_logging
 from utilities import *
 from constants import *
 
@@ -15,12 +25,12 @@ logger = logging.getLogger(__name__)
 class TaskQueue(object):
 
     def __init__(self, app_type, max_length=10*GB):
-        self.uuid = uuid.uuid4()
+        self.uuid = new_id()
         self.max_length = max_length
         self.tasks = collections.OrderedDict()
         self.length = 0
         self.app_type = app_type
-        self.arrival_size_buffer = Lyapunov_buffer(max_size=100)
+        self.arrival_size_buffer = ArrivalStats(max_size=100)
         self.exploded = 0
 
     def __del__(self):
@@ -42,7 +52,8 @@ class TaskQueue(object):
 
     def remove_multiple_tasks(self, task_list):
         for task_id in task_list:
-            logger.debug('Task %s removed', task_id)
+            if hot_path_logging:
+                logger.debug('Task %s removed', task_id)
             del self.tasks[task_id]
 
     def abort_task(self, task_id):
@@ -63,7 +74,8 @@ class TaskQueue(object):
             self.exploded = max(0, self.exploded-1)
             return True
         else:
-            logger.info('queue exploded, app type {}, queuelength {}'.format(self.app_type, self.length))
+            if hot_path_logging:
+                logger.info('queue exploded, app type %s, queuelength %s', self.app_type, self.length)
             del task
             self.exploded = min(10, self.exploded+1)
             return False
@@ -119,14 +131,20 @@ class TaskQueue(object):
             if not silence: print("########### task_queue.served ends ###########")
             return resource, offloaded_tasks
 
+    # 길이, exploded, 도착 기록과 task들을 slot별 array로 (Environment_sosam.snapshot)
+    def snapshot(self):
+        return {'tasks': tasks_to_columns(self.tasks.values()), 'length': self.length, 'exploded': self.exploded,
+                'arrivals': self.arrival_size_buffer.snapshot()}
+
+    # Task 객체는 새로 만듦
+    def restore(self, state):
+        self.tasks = collections.OrderedDict((task.uuid, task) for task in columns_to_tasks(state['tasks']))
+        self.length = state['length']
+        self.exploded = state['exploded']
+        self.arrival_size_buffer.restore(state['arrivals'])
+
     def mean_arrival(self, t, interval=10, normalize=100):
-        # import pdb; pdb.set_trace()
-        result = 0
-        for time, data_size in self.arrival_size_buffer.get_buffer():
-            if time > t - interval:
-                result += data_size
-            else:
-                break
+        result = self.arrival_size_buffer.window_sum(t, interval)
         if not normalize:
             return result/min(t+1,interval)
         else:
@@ -143,12 +161,7 @@ class TaskQueue(object):
     #         return 0
 
     def last_arrival(self, t, normalize=100):
-        result = 0
-        for time, data_size in self.arrival_size_buffer.get_buffer():
-            if time==t:
-                result += data_size
-            else:
-                break
+        result = self.arrival_size_buffer.time_sum(t)
         if not normalize:
             return result
         else:
@@ -161,7 +174,7 @@ class TaskQueue(object):
         pass
 
     def get_uuid(self):
-        return self.uuid.hex
+        return self.uuid
 
     def get_length(self, normalize=100):
         if not normalize:
@@ -182,3 +195,228 @@ class TaskQueue(object):
         # if self.exploded ==True:
         #     import pdb; pdb.set_trace()
         return self.exploded
+
+
+# TaskQueue와 같은 인터페이스. task를 Task 객체 대신 미리 할당한 numpy ring buffer의 row로 저장함.
+# served()는 queue 앞부분의 cumsum + searchsorted로 처리하므로 task 수만큼 python loop를 돌지 않음.
+# offload(type=0)로 나가는 task만 Task 객체로 다시 만들어서 넘겨줌.
+class ArrayTaskQueue(TaskQueue):
+
+    def __init__(self, app_type, max_length=10*GB, capacity=1024):
+        self.uuid = new_id()
+        self.max_length = max_length
+        self.length = 0
+        self.app_type = app_type
+        self.arrival_size_buffer = ArrivalStats(max_size=100)
+        self.exploded = 0
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+        # TaskQueue처럼 정수 크기는 int로 돌려주도록 int64로 둠. 정수가 아닌 크기가 오면 float64로 바꿈 (_fit_size)
+        self.sizes = np.zeros(capacity, dtype=np.int64)
+        self.arrival_times = np.zeros(capacity, dtype=np.int64)
+        self.app_types = np.zeros(capacity, dtype=np.int64)
+        self.is_starts = np.zeros(capacity, dtype=bool)
+        self.ids = np.empty(capacity, dtype=object)
+        # Task로 되돌릴 때 필요한 나머지 slot들 (_extra_slots 순서의 tuple). 값을 type까지 그대로 돌려줌
+        self.extras = np.empty(capacity, dtype=object)
+
+    _extra_slots = ('parent_uuid', 'child_uuid', 'client_index', 'server_index', 'computation_over',
+                    'received_data_size', 'start_timestamp', 'end_timestamp', 'share')
+    _get_extras = operator.attrgetter(*_extra_slots)
+    _columns = ('sizes', 'arrival_times', 'app_types', 'is_starts', 'ids', 'extras')
+    _object_columns = ('ids', 'extras')
+
+    def __del__(self):
+        for name in self._columns:
+            setattr(self, name, None)
+        self.count = 0
+        self.length = 0
+        del self.arrival_size_buffer
+
+    # head부터 n개 row의 실제 index
+    def _rows(self, n):
+        return (self.head + np.arange(n)) % self.capacity
+
+    def _grow(self):
+        rows = self._rows(self.count)
+        new_capacity = self.capacity*2
+        for name in self._columns:
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=old.dtype) if old.dtype != object else np.empty(new_capacity, dtype=object)
+            new[:self.count] = old[rows]
+            setattr(self, name, new)
+        self.head = 0
+        self.capacity = new_capacity
+
+    def _fit_size(self, size):
+        if self.sizes.dtype != np.float64 and size != int(size):
+            self.sizes = self.sizes.astype(np.float64)
+
+    def _find(self, task_id):
+        for i in self._rows(self.count):
+            if self.ids[i] == task_id:
+                return i
+        raise KeyError(task_id)
+
+    # Task()는 new_id()를 하나 쓰므로 __new__로 만들고 slot을 직접 채움
+    def _to_task(self, i, data_size):
+        task = Task.__new__(Task)
+        arrival_timestamp = int(self.arrival_times[i])
+        task.application_type = int(self.app_types[i])
+        task.data_size = data_size
+        task.arrival_timestamp = arrival_timestamp if arrival_timestamp >= 0 else None
+        task.is_start = bool(self.is_starts[i])
+        task.uuid = self.ids[i]
+        for slot, value in zip(self._extra_slots, self.extras[i]):
+            setattr(task, slot, value)
+        return task
+
+    def _remove_rows(self, rows_to_remove):
+        rows = self._rows(self.count)
+        kept = rows[~np.isin(rows, rows_to_remove)]
+        for name in self._columns:
+            column = getattr(self, name)
+            column[:len(kept)] = column[kept]
+            if name in self._object_columns:
+                column[len(kept):] = None
+        self.head = 0
+        self.count = len(kept)
+
+    def task_ready(self, task_id):
+        self.is_starts[self._find(task_id)] = True
+        logger.debug('task %s ready', task_id)
+
+    def remove_task(self, task_id):
+        logger.debug('Task %s removed', task_id)
+        self._remove_rows([self._find(task_id)])
+
+    # id마다 _find를 부르지 않고 queue를 한 번만 훑어서 지울 row를 찾음
+    def remove_multiple_tasks(self, task_list):
+        if hot_path_logging:
+            for task_id in task_list:
+                logger.debug('Task %s removed', task_id)
+        to_remove = set(task_list)
+        rows = self._rows(self.count)
+        mask = np.fromiter((task_id in to_remove for task_id in self.ids[rows]), dtype=bool, count=len(rows))
+        if mask.sum() != len(to_remove):
+            raise KeyError(next(iter(to_remove - set(self.ids[rows[mask]]))))
+        self._remove_rows(rows[mask])
+
+    def arrived(self, task, arrival_timestamp):
+        task_length = task.data_size
+        self.arrival_size_buffer.add((arrival_timestamp, task_length))
+        new_length = self.length + task_length
+        if new_length <= self.max_length:
+            if self.count == self.capacity:
+                self._grow()
+            i = (self.head + self.count) % self.capacity
+            self._fit_size(task_length)
+            self.sizes[i] = task_length
+            self.arrival_times[i] = -1 if task.arrival_timestamp is None else task.arrival_timestamp
+            self.app_types[i] = task.application_type
+            self.is_starts[i] = task.is_start
+            self.ids[i] = task.uuid
+            self.extras[i] = ArrayTaskQueue._get_extras(task)
+            self.count += 1
+            self.length = new_length
+            self.exploded = max(0, self.exploded-1)
+            return True
+        else:
+            if hot_path_logging:
+                logger.info('queue exploded, app type %s, queuelength %s', self.app_type, self.length)
+            del task
+            self.exploded = min(10, self.exploded+1)
+            return False
+
+    # TaskQueue.served와 같은 결과. 앞에서부터 다 처리되는 task 수는 cumsum에 대한 searchsorted로 구하고,
+    # 마지막 하나만 부분적으로 처리(type=0이면 child task로 쪼개서 offload)함.
+    def served(self, resource, type = 1, silence=True):
+        if resource == 0:
+            return
+        if not type:
+            to_be_served = resource
+        else:
+            to_be_served = int(resource/applications.app_info[self.app_type]['workload'])
+        offloaded_tasks = {}
+        if not self.count:
+            return 0, offloaded_tasks
+
+        # budget을 넘어서는 지점이 나올 때까지 보는 범위를 두 배씩 늘림
+        n = min(self.count, 64)
+        while True:
+            rows = self._rows(n)
+            cum_sizes = np.cumsum(self.sizes[rows])
+            if cum_sizes[-1] > to_be_served or n == self.count:
+                break
+            n = min(self.count, 2*n)
+
+        done = int(np.searchsorted(cum_sizes, to_be_served, side='right'))
+        served_task_bits = cum_sizes[done-1].item() if done else 0
+        remained = to_be_served - served_task_bits
+        if not type:
+            for i in rows[:done]:
+                offloaded_tasks[self.ids[i]] = self._to_task(i, self.sizes[i].item())
+        if done < n and remained > 0:
+            i = rows[done]
+            if not type:
+                # Task.make_child_task와 같음
+                new_task = self._to_task(i, remained)
+                new_task.uuid = new_id()
+                new_task.parent_uuid = self.ids[i]
+                extras = list(self.extras[i])
+                extras[self._extra_slots.index('child_uuid')] = new_task.uuid
+                self.extras[i] = tuple(extras)
+                offloaded_tasks[new_task.get_uuid()] = new_task
+            self._fit_size(remained)
+            self.sizes[i] -= remained
+            served_task_bits += remained
+        self.length -= served_task_bits
+
+        for name in self._object_columns:
+            getattr(self, name)[rows[:done]] = None
+        self.head = (self.head + done) % self.capacity
+        self.count -= done
+
+        if type:
+            resource = served_task_bits * applications.app_info[self.app_type]['workload']
+        else:
+            resource = served_task_bits
+        return resource, offloaded_tasks
+
+    # 호출 시점의 snapshot. 여기서 받은 Task를 고쳐도 queue에는 반영되지 않음.
+    def get_tasks(self):
+        tasks = collections.OrderedDict()
+        for i in self._rows(self.count):
+            tasks[self.ids[i]] = self._to_task(i, self.sizes[i].item())
+        return tasks
+
+    @property
+    def tasks(self):
+        return self.get_tasks()
+
+    # ring buffer의 column들을 그대로 (head부터 count개) 복사함
+    def snapshot(self):
+        rows = self._rows(self.count)
+        return {'columns': {name: getattr(self, name)[rows] for name in self._columns}, 'length': self.length,
+                'exploded': self.exploded, 'arrivals': self.arrival_size_buffer.snapshot()}
+
+    def restore(self, state):
+        columns = state['columns']
+        count = len(columns['sizes'])
+        while self.capacity < count:
+            self._grow()
+        self.sizes = self.sizes.astype(columns['sizes'].dtype, copy=False)
+        for name in self._columns:
+            column = getattr(self, name)
+            column[:count] = columns[name]
+            if name in self._object_columns:
+                column[count:] = None
+        self.head = 0
+        self.count = count
+        self.length = state['length']
+        self.exploded = state['exploded']
+        self.arrival_size_buffer.restore(state['arrivals'])
+
+    def get_status(self):
+        return self.get_tasks(), self.exploded
@@ -4,9 +4,10 @@ import logging
 import pathlib
 import random
 
-import numpy
-
+from mecs import events
 from mecs.mobilenode import MobileNode
+from mecs.mobilepopulation import MobilePopulation
+from mecs.servergrid import ServerGrid
 from mecs.servernode import ServerNode
 
 logger = logging.getLogger(__name__)
@@ -14,7 +15,8 @@ _parent = pathlib.Path(__file__).parent
 
 
 class WholeMap:
-    def __init__(self, maxX, maxY, arrival_rate, departure_rate):
+    def __init__(self, maxX, maxY, arrival_rate, departure_rate, seed=None,
+                 vectorized=False):
         self.unit_time = 0.001  # (second)
         self.minX = 0
         self.minY = 0
@@ -26,10 +28,25 @@ class WholeMap:
         self.departure_rate = departure_rate
         self.mobiles = {}
         self.servers = []
+        # 모바일이 server를 고를 때 쓰는 server 좌표 index (servers와 같은 순서)
+        self.server_grid = ServerGrid(maxX, maxY)
         self.applications = {}
         self.applications_initialize()
         self.index = 0
         self.battery_limit = 250
+        # 모바일 도착과 모바일마다의 random stream을 만드는 random.
+        # 같은 seed면 tick 방식과 event 방식(simulate_until)의 결과가 같음.
+        self.random = random.Random(seed)
+        self.next_arrival_time = events.waiting_ticks(self.random,
+                                                      self.arrival_rate)
+        self.time = 0
+        self.events = None
+        # vectorized면 모바일을 MobileNode 대신 MobilePopulation의 numpy column으로 들고 있음.
+        # 모바일이 많을 때 빠르지만 random stream을 같이 쓰므로 MobileNode로 돌린 것과 값은 다름.
+        self.population = None
+        if vectorized:
+            self.population = MobilePopulation(self)
+            self.mobiles = self.population
 
     def applications_initialize(self):
         with (_parent / 'applications.csv').open(mode='r') as f:
@@ -47,20 +64,41 @@ class WholeMap:
     def add_server(self, x, y, server_capability, schedule_method):
         server = ServerNode(x, y, self, server_capability, schedule_method)
         self.servers.append(server)
+        self.server_grid.add(x, y)
 
     def add_mobile(self, t):
-        self.mobiles[self.index] = MobileNode(t, self.index, self)
+        if self.population is not None:
+            self.population.add(t, self.index)
+        else:
+            self.mobiles[self.index] = MobileNode(t, self.index, self)
         self.index += 1
 
+    def add_mobiles(self, t, count):
+        """ 모바일 count개를 t tick에 한꺼번에 추가함 """
+        if self.population is not None:
+            self.population.add(t, self.index, count)
+            self.index += count
+            return
+        for _ in range(count):
+            self.add_mobile(t)
+
     def mobile_arrive(self, t):
-        if random.random() < self.arrival_rate:
+        if t >= self.next_arrival_time:
             self.add_mobile(t)
+            self.next_arrival_time = t + 1 + events.waiting_ticks(
+                self.random, self.arrival_rate)
 
     def all_mobiles_move(self, t):
+        if self.population is not None:
+            self.population.move(t)
+            return
         for _, mobile in self.mobiles.items():
             mobile.move(t)
 
     def all_mobiles_proceed_and_offload(self, t):
+        if self.population is not None:
+            self.population.transmit_and_proceed(t)
+            return
         for _, mobile in self.mobiles.items():
             mobile.transmit_and_proceed(t)
 
@@ -69,6 +107,8 @@ class WholeMap:
             server.do_tick(t)
 
     def all_mobiles_log(self, t):
+        if self.population is not None:
+            return self.population.statuses()
         status = {}
         for i, mobile in self.mobiles.items():
             status['m' + str(i)] = mobile.get_status()
@@ -77,7 +117,7 @@ class WholeMap:
     def all_servers_log(self, t):
         status = {}
         for server in self.servers:
-            status[server.uuid.hex] = server.get_status()
+            status[server.get_uuid()] = server.get_status()
         return status
 
     def print_all_mobiles(self):
@@ -91,37 +131,72 @@ class WholeMap:
         logger.info("================ Printing is done ================")
 
     def mobile_departure(self, t):
+        if self.population is not None:
+            self.population.depart(t)
+            return
+        # 떠나는 시각은 모바일이 쉬기 시작할 때 미리 뽑아 둠 (MobileNode.become_idle)
         mobiles_departing = []
         for index, mobile in self.mobiles.items():
-            r = random.random()
-            if (r < self.departure_rate * numpy.log(mobile.living_time + 1)
-                or mobile.battery < self.battery_limit) \
-                    and mobile.amount_of_data_to_proceed <= 0 \
-                    and mobile.amount_of_data_to_offload <= 0:
-                logger.info(
-                    '[%f]초에 %d번째 모바일이 사라졌습니다: '
-                    '[%f] Ws, [%s] types of [%d] bytes',
-                    float(t) / 1000, index, mobile.battery,
-                    mobile.application_type, mobile.amount_of_data_to_proceed)
+            if mobile.departure_time is not None \
+                    and t >= mobile.departure_time:
+                self.log_departure(t, index)
                 mobiles_departing.append(index)
         self.remove_mobiles(mobiles_departing)
         # TODO : abort the offloaded task
 
+    def log_departure(self, t, index):
+        mobile = self.mobiles[index]
+        logger.info(
+            '[%f]초에 %d번째 모바일이 사라졌습니다: '
+            '[%f] Ws, [%s] types of [%d] bytes',
+            float(t) / 1000, index, mobile.battery,
+            mobile.application_type, mobile.amount_of_data_to_proceed)
+
     def remove_mobiles(self, mobiles):
         for index in mobiles:
             del self.mobiles[index]
 
     def calculate_all_channel_gain(self):
+        if self.population is not None:
+            self.population.calculate_channel_gain()
+            return
         for _, mobile in self.mobiles.items():
             mobile.calculate_channel_gain()
 
     def simulate_one_time(self, t):
+        # channel gain은 모바일이 생길 때 정한 값을 계속 쓰므로 (calculate_channel_gain의
+        # 결과는 저장되지 않았음) tick마다 다시 계산하지 않음.
+        self.events = None
         self.mobile_arrive(t)
         self.mobile_departure(t)
         self.all_mobiles_move(t)
-        self.calculate_all_channel_gain()
         self.all_mobiles_proceed_and_offload(t)
         self.all_servers_do_tick(t)
+        self.time = t + 1
         log = self.all_servers_log(t)
         log.update(self.all_mobiles_log(t))
         return log
+
+    def simulate_until(self, end_time):
+        """
+        지금부터 end_time 전 tick까지를 event 방식으로 한꺼번에 진행함.
+        simulate_one_time을 end_time 전까지 부른 것과 결과가 같고,
+        마지막 tick의 log만 돌려줌.
+        """
+        if self.population is not None:
+            # numpy column은 tick마다 한꺼번에 진행하는 것이 빠르므로 event 방식을 쓰지 않음
+            for t in range(self.time, end_time):
+                self.mobile_arrive(t)
+                self.mobile_departure(t)
+                self.all_mobiles_move(t)
+                self.all_mobiles_proceed_and_offload(t)
+                self.all_servers_do_tick(t)
+            self.time = end_time
+            log = self.all_servers_log(end_time - 1)
+            log.update(self.all_mobiles_log(end_time - 1))
+            return log
+        if self.events is None:
+            self.events = events.EventSimulator(self, self.time)
+        log = self.events.run(end_time)
+        self.time = end_time
+        return log
@@ -3,7 +3,7 @@ from setuptools import setup
 install_requires = [
     'numpy'
 ]
-test_requires = install_requires + []
+test_requires = install_requires + ['pytest']
 
 setup(
     name='mecs',
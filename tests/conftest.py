@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import importlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# mecs/와 MEC_v1/mecs/는 같은 이름의 flat module(task_queue, constants, ...)을 쓰므로
+# test마다 쓰는 tree의 module만 올려 둠 (benchmarks/common.py의 trees와 같음)
+trees = {
+    'mecs': [root, os.path.join(root, 'mecs')],
+    'MEC_v1': [os.path.join(root, 'MEC_v1', 'mecs')],
+}
+tree_dirs = (os.path.join(root, 'mecs'), os.path.join(root, 'MEC_v1'))
+
+
+def load_tree(tree):
+    """ 이전 test가 올린 두 tree의 module을 모두 내리고 tree의 경로를 sys.path 앞에 둠 """
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if name == 'mecs' or name.startswith('mecs.') or path.startswith(tree_dirs):
+            del sys.modules[name]
+    for paths in trees.values():
+        for path in paths:
+            while path in sys.path:
+                sys.path.remove(path)
+    sys.path[:0] = trees[tree]
+    importlib.invalidate_caches()
+
+
+@pytest.fixture
+def mecs_tree():
+    load_tree('mecs')
+
+
+@pytest.fixture
+def mec_v1_tree():
+    load_tree('MEC_v1')
+
+
+def make_env(tree, **kwargs):
+    """ tree의 env (mecs: Environment_sosam, MEC_v1: MEC_v1)를 apps 1, 2, 3과 wired link 하나로 만듦 """
+    load_tree(tree)
+    from constants import GHZ, WIRED
+    if tree == 'mecs':
+        from environment_ppo import Environment_sosam
+        env = Environment_sosam(10, 1, 2, 3, use_beta=True, **kwargs)
+        env.init_for_sosam(3e2*GHZ, 2.1e3*GHZ, WIRED)
+    else:
+        from environment_ppo_under1latent_cost1_univ import MEC_v1
+        env = MEC_v1(10, 1, 2, 3, cost_type=0, **kwargs)
+        env.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, WIRED)
+    return env
+
+
+def run_env(env, actions, start=0):
+    """ actions를 한 step씩 넣고 (states, costs)를 돌려줌. Environment_sosam은 start부터 시간을 넘김 """
+    states, costs = [], []
+    for t, action in enumerate(actions, start):
+        if hasattr(env, 'step_together'):
+            state, cost, _ = env.step_together(t, action, [1/3]*3)
+        else:
+            state, cost, _ = env.step(action.reshape(1, -1), [1/3]*3)
+        states.append(state)
+        costs.append(cost)
+    return np.array(states), costs
+
+
+def random_actions(env, steps, seed=1):
+    rng = np.random.RandomState(seed)
+    return rng.dirichlet(np.ones(env.action_dim//2), (steps, 2)).reshape(steps, -1)
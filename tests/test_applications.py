@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from conftest import load_tree
+
+
+def run_mec_v1(env, seed, steps=300):
+    np.random.seed(seed)
+    env.reset()
+    rng = np.random.RandomState(1)
+    costs = []
+    for _ in range(steps):
+        action = rng.dirichlet(np.ones(env.action_dim//2), 2).reshape(1, -1)
+        _, cost, _ = env.step(action, [1/3]*3)
+        costs.append(cost)
+    return costs
+
+
+def run_sosam(env, seed, steps=300):
+    np.random.seed(seed)
+    env.reset()
+    rng = np.random.RandomState(1)
+    costs = []
+    for t in range(steps):
+        action = rng.dirichlet(np.ones(env.action_dim//2), 2).flatten()
+        _, cost, _ = env.step_together(t, action, [1/3]*3)
+        costs.append(cost)
+    return costs
+
+
+def make_mec_v1(size_dist, generation_block):
+    load_tree('MEC_v1')
+    from constants import GHZ, WIRED
+    from environment_ppo_under1latent_cost1_univ import MEC_v1
+
+    def make():
+        env = MEC_v1(10, 1, 2, 3, cost_type=0, size_dist=size_dist, generation_block=generation_block)
+        env.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, WIRED)
+        return env
+    return make, run_mec_v1
+
+
+def make_sosam(size_dist, generation_block):
+    load_tree('mecs')
+    from constants import GHZ, WIRED
+    from environment_ppo import Environment_sosam
+
+    def make():
+        env = Environment_sosam(10, 1, 2, 3, use_beta=True, size_dist=size_dist, generation_block=generation_block)
+        env.init_for_sosam(3e2*GHZ, 2.1e3*GHZ, WIRED)
+        return env
+    return make, run_sosam
+
+
+# 앞서 다른 seed로 episode를 돌린 env도 np.random.seed(s) 후 reset하면 새로 만든 env와 같아야 함
+@pytest.mark.parametrize('size_dist', ['normal', 'lognormal', 'pareto'])
+@pytest.mark.parametrize('generation_block', [1, 16])
+@pytest.mark.parametrize('make_env', [make_mec_v1, make_sosam])
+def test_seeded_reset_matches_fresh_env(make_env, size_dist, generation_block):
+    make, run = make_env(size_dist, generation_block)
+    expected = run(make(), 3)
+    env = make()
+    run(env, 1)
+    run(env, 2, steps=17)
+    assert run(env, 3) == expected
+    # 같은 process에서 다른 env가 먼저 돌아도 같아야 함
+    run(make(), 4)
+    assert run(make(), 3) == expected
+
+
+def test_seeded_reset_matches_fresh_batched_env():
+    load_tree('MEC_v1')
+    from constants import GHZ, WIRED
+    from environment_batched import BatchedMEC_v1
+
+    def run(env, seed, steps=300):
+        np.random.seed(seed)
+        env.reset()
+        action = np.full((2, env.action_dim), 2/env.action_dim)
+        return [env.step(action, [1/3]*3)[1].tolist() for _ in range(steps)]
+
+    def make():
+        env = BatchedMEC_v1(2, 10, 1, 2, 3, cost_type=0, size_dist='normal')
+        env.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, WIRED)
+        return env
+
+    expected = run(make(), 3)
+    env = make()
+    run(env, 1, steps=17)
+    assert run(env, 3) == expected
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from conftest import load_tree
+
+
+@pytest.fixture(params=[('mecs', 'utilities'), ('MEC_v1', 'buffers')])
+def arrival_stats(request):
+    tree, module = request.param
+    load_tree(tree)
+    return __import__(module).ArrivalStats
+
+
+# window_sum/time_sum을 buffer에 남아 있는 값들을 직접 더한 것과 비교함 (TaskQueue.mean_arrival의 원래 loop와 같은 조건)
+@pytest.mark.parametrize('max_size', [5, 100])
+def test_sums_match_brute_force(arrival_stats, max_size):
+    stats = arrival_stats(max_size=max_size)
+    stored = []
+    rng = np.random.RandomState(0)
+    t = 0
+    for _ in range(3000):
+        t += int(rng.choice([0, 0, 1, 2, 7]))
+        size = int(rng.randint(1, 1000))
+        stats.add((t, size))
+        stored = (stored + [(t, size)])[-max_size:]
+        # window cache가 앞뒤로 움직이도록 과거 시점도 물어봄
+        query = t - int(rng.randint(0, 5))
+        for interval in (1, 10, 100):
+            expected = sum(s for time, s in stored if time > query - interval)
+            assert stats.window_sum(query, interval) == expected
+        assert stats.time_sum(t) == sum(s for time, s in stored if time == t)
+        assert stats.time_sum(t+1) == 0
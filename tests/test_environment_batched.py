@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.usefixtures('mec_v1_tree')
+
+
+# N=1일 때 MEC_v1.step과 state, cost, failed 수가 매 step 같아야 함.
+# 두 env가 같은 poisson 값을 뽑도록 step마다 global RNG state를 되돌림
+@pytest.mark.parametrize('cost_type', [0, 1, 2])
+@pytest.mark.parametrize('empty_reward', [True, False])
+@pytest.mark.parametrize('task_rate, channel', [(10, 'WIRED'), (40, 'LTE'), (3, 'WIFI')])
+def test_single_env_matches_mec_v1(cost_type, empty_reward, task_rate, channel):
+    import constants
+    from constants import GHZ
+    from environment_batched import BatchedMEC_v1
+    from environment_ppo_under1latent_cost1_univ import MEC_v1
+
+    apps = (1, 2, 3)
+    env = MEC_v1(task_rate, *apps, cost_type=cost_type)
+    env.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, getattr(constants, channel))
+    batched = BatchedMEC_v1(1, task_rate, *apps, cost_type=cost_type)
+    batched.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, getattr(constants, channel))
+    state = env.reset(empty_reward)
+    batched_state = batched.reset(empty_reward)
+    assert env.action_dim == batched.action_dim
+    np.testing.assert_array_equal(state, batched_state[0])
+
+    np.random.seed(0)
+    rng = np.random.RandomState(1)
+    for t in range(500):
+        action = rng.dirichlet(np.ones(env.action_dim//2), 2).reshape(1, -1)
+        if t % 7 == 0:
+            # edge에서 전부 처리하는 step도 섞음
+            action[0, :env.action_dim//2] = 0
+            action[0, 0] = 1
+        cloud = [1/3]*len(apps)
+        rng_state = np.random.get_state()
+        state, cost, failed = env.step(action, cloud)
+        np.random.set_state(rng_state)
+        batched_state, batched_cost, batched_failed = batched.step(action, cloud)
+        np.testing.assert_array_equal(state, batched_state[0])
+        assert cost == batched_cost[0]
+        assert failed == batched_failed[0]
+
+
+def test_partial_reset():
+    from constants import GHZ, WIRED
+    from environment_batched import BatchedMEC_v1
+
+    batched = BatchedMEC_v1(4, 10, 1, 2, 3)
+    batched.init_linked_pair(4e2*GHZ, 2.4e3*GHZ, WIRED)
+    initial = batched.reset()
+    np.random.seed(0)
+    action = np.random.dirichlet(np.ones(batched.action_dim//2), (4, 2)).reshape(4, -1)
+    for _ in range(20):
+        batched.step(action, [1/3]*3)
+    state = batched.reset(env_ids=np.array([1, 3]))
+    np.testing.assert_array_equal(state[[1, 3]], initial[[1, 3]])
+    assert not np.array_equal(state[0], initial[0])
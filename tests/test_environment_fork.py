@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import copy
+
+import numpy as np
+import pytest
+
+from conftest import make_env, random_actions, run_env
+
+trees = ['mecs', 'MEC_v1']
+
+
+def step_forks(forks, t, actions):
+    if hasattr(forks, 'step_together'):
+        return forks.step_together(t, actions, [1/3]*3)
+    return forks.step(actions, [1/3]*3)
+
+
+def started_env(tree, **kwargs):
+    env = make_env(tree, **kwargs)
+    np.random.seed(0)
+    env.reset()
+    run_env(env, random_actions(env, 40))
+    return env
+
+
+# seed가 같은 fork들은 같은 action에 같은 cost를 내고, np.random은 건드리지 않음
+@pytest.mark.parametrize('tree', trees)
+@pytest.mark.parametrize('size_dist', ['deterministic', 'normal'])
+def test_forks_with_equal_seeds_match(tree, size_dist):
+    env = started_env(tree, size_dist=size_dist)
+    forks = env.fork(3, seeds=[7, 7, 7])
+    actions = random_actions(env, 200, seed=2)
+    global_state = np.random.get_state()
+    for t, action in enumerate(actions, 40):
+        states, costs, failed = step_forks(forks, t, np.stack([action]*3))
+        assert costs[0] == costs[1] == costs[2]
+        np.testing.assert_array_equal(states[0], states[1])
+        np.testing.assert_array_equal(states[0], states[2])
+    after = np.random.get_state()
+    assert global_state[0] == after[0] and global_state[2:] == after[2:]
+    np.testing.assert_array_equal(global_state[1], after[1])
+
+
+# fork 하나는 원래 env를 deepcopy해서 같은 seed의 rng를 준 것과 같아야 함
+@pytest.mark.parametrize('tree', trees)
+def test_fork_matches_deepcopy_with_rng(tree):
+    env = started_env(tree, size_dist='normal')
+    copied = copy.deepcopy(env)
+    copied.set_rng(np.random.RandomState(11))
+    fork = env.fork(1, seeds=[11])[0]
+    actions = random_actions(env, 200, seed=3)
+    expected_states, expected_costs = run_env(copied, actions, start=40)
+    states, costs = run_env(fork, actions, start=40)
+    np.testing.assert_array_equal(states, expected_states)
+    assert costs == expected_costs
+
+
+@pytest.mark.parametrize('tree', trees)
+def test_fork_reset_returns_initial_state(tree):
+    env = started_env(tree)
+    forks = env.fork(2, seeds=[1, 2])
+    step_forks(forks, 40, random_actions(env, 2))
+    for state in forks.reset():
+        np.testing.assert_array_equal(state, env.initial_state)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from conftest import make_env, random_actions, run_env
+
+trees = ['mecs', 'MEC_v1']
+
+
+# 두 번째 reset부터는 initial_snapshot을 restore함. 새로 만든 env의 첫 reset과 같아야 함
+@pytest.mark.parametrize('tree', trees)
+@pytest.mark.parametrize('generation_block', [1, 16])
+def test_reset_matches_fresh_env(tree, generation_block):
+    env = make_env(tree, generation_block=generation_block)
+    actions = random_actions(env, 300)
+    np.random.seed(0)
+    fresh_state = env.reset()
+    expected_states, expected_costs = run_env(env, actions)
+
+    env = make_env(tree, generation_block=generation_block)
+    for seed in (1, 2):
+        np.random.seed(seed)
+        env.reset()
+        run_env(env, actions[:137])
+    assert env.initial_snapshot is not None
+    np.random.seed(0)
+    np.testing.assert_array_equal(env.reset(), fresh_state)
+    states, costs = run_env(env, actions)
+    np.testing.assert_array_equal(states, expected_states)
+    assert costs == expected_costs
+
+
+# snapshot(include_rng=True)을 restore하면 그 뒤의 도착과 cost가 똑같이 다시 나와야 함.
+# 같은 reset_info로 만든 다른 env에 restore해도 같음
+@pytest.mark.parametrize('tree', trees)
+@pytest.mark.parametrize('size_dist, generation_block', [('deterministic', 1), ('normal', 16)])
+def test_restore_replays(tree, size_dist, generation_block):
+    env = make_env(tree, size_dist=size_dist, generation_block=generation_block)
+    actions = random_actions(env, 250)
+    np.random.seed(0)
+    env.reset()
+    run_env(env, actions[:50])
+    snapshot = env.snapshot(include_rng=True)
+    expected_states, expected_costs = run_env(env, actions[50:], start=50)
+
+    other = make_env(tree, size_dist=size_dist, generation_block=generation_block)
+    other.reset()
+    for target in (env, other):
+        target.restore(snapshot)
+        states, costs = run_env(target, actions[50:], start=50)
+        np.testing.assert_array_equal(states, expected_states)
+        assert costs == expected_costs
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytestmark = pytest.mark.usefixtures('mecs_tree')
+
+
+def is_hex(value):
+    return isinstance(value, str) and len(value) == 32 and all(c in '0123456789abcdef' for c in value)
+
+
+# node, queue, task가 모두 같은 provider를 써야 UUIDProvider로 바꾼 것이 전부에 적용됨
+def test_uuid_provider_reaches_every_id():
+    from mecs import id_provider
+    from mecs.id_provider import UUIDProvider, set_id_provider
+    from servernode_w_queue import ServerNode
+    from task import Task
+    from task_queue import ArrayTaskQueue, TaskQueue
+
+    provider = id_provider.get_id_provider()
+    set_id_provider(UUIDProvider())
+    try:
+        node = ServerNode(1e9)
+        node.make_application_queues(1, 2)
+        task = Task(1, 1000)
+        child = task.make_child_task(400)
+        ids = [node.get_uuid(), task.get_uuid(), child.get_uuid(), TaskQueue(1).get_uuid(), ArrayTaskQueue(1).get_uuid()]
+        ids += [queue.get_uuid() for queue in node.queue_list.values()]
+        assert all(is_hex(value) for value in ids), ids
+        assert len(set(ids)) == len(ids)
+    finally:
+        set_id_provider(provider)
+
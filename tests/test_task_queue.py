@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import copy
+
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.usefixtures('mecs_tree')
+
+
+def assert_same_tasks(tasks, array_tasks):
+    assert list(tasks) == list(array_tasks)
+    for task_id, task in tasks.items():
+        array_task = array_tasks[task_id]
+        # child task id는 두 queue가 new_id()를 번갈아 쓰므로 다름
+        for slot in set(type(task).__slots__) - {'child_uuid'}:
+            assert getattr(task, slot) == getattr(array_task, slot), slot
+        assert type(task.data_size) is type(array_task.data_size)
+
+
+# 같은 도착/처리 순서를 주면 ArrayTaskQueue가 TaskQueue와 값, type까지 같아야 함
+@pytest.mark.parametrize('capacity', [4, 1024])
+def test_array_task_queue_matches_task_queue(capacity):
+    from task import Task
+    from task_queue import ArrayTaskQueue, TaskQueue
+
+    queue = TaskQueue(1, max_length=1e6)
+    array_queue = ArrayTaskQueue(1, max_length=1e6, capacity=capacity)
+    rng = np.random.RandomState(0)
+    for t in range(2000):
+        for _ in range(rng.poisson(2)):
+            task = Task(1, int(rng.randint(1, 5000)), t)
+            assert queue.arrived(task, t) == array_queue.arrived(copy.copy(task), t)
+        type_ = int(rng.rand() < 0.5)
+        resource = int(rng.randint(0, 8000))
+        result = queue.served(resource, type_)
+        array_result = array_queue.served(resource, type_)
+        if result is None:
+            assert array_result is None
+            continue
+        assert result[0] == array_result[0]
+        assert type(result[0]) is type(array_result[0])
+        assert [task.data_size for task in result[1].values()] == [task.data_size for task in array_result[1].values()]
+        assert queue.length == array_queue.length
+        assert type(queue.length) is type(array_queue.length)
+        assert queue.exploded == array_queue.exploded
+        tasks = queue.get_tasks()
+        assert_same_tasks(tasks, array_queue.get_tasks())
+        if t % 7 == 0 and len(tasks) > 3:
+            task_ids = list(tasks)[1:4]
+            queue.remove_multiple_tasks(task_ids)
+            array_queue.remove_multiple_tasks(task_ids)
+
+
+def test_array_task_queue_offload_split():
+    from task import Task
+    from task_queue import ArrayTaskQueue, TaskQueue
+
+    queue = TaskQueue(1)
+    array_queue = ArrayTaskQueue(1, capacity=2)
+    for size in (300, 500, 200):
+        task = Task(1, size, 0)
+        queue.arrived(task, 0)
+        array_queue.arrived(copy.copy(task), 0)
+    _, offloaded = queue.served(600, 0)
+    _, array_offloaded = array_queue.served(600, 0)
+    assert [task.data_size for task in offloaded.values()] == [task.data_size for task in array_offloaded.values()] == [300, 300]
+    child = list(array_offloaded.values())[-1]
+    parent = array_queue.get_tasks()[child.parent_uuid]
+    assert parent.child_uuid == child.uuid
+    assert parent.data_size == 200
+
+
+def test_array_task_queue_float_sizes():
+    from task import Task
+    from task_queue import ArrayTaskQueue
+
+    array_queue = ArrayTaskQueue(1, capacity=2)
+    for size in (3, 2.5, 4):
+        array_queue.arrived(Task(1, size, 0), 0)
+    assert array_queue.length == 9.5
+    assert array_queue.served(5.5, 0)[0] == 5.5
+    assert [task.data_size for task in array_queue.get_tasks().values()] == [4]
+    with pytest.raises(KeyError):
+        array_queue.remove_multiple_tasks(['missing'])
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import pytest
+
+pytestmark = pytest.mark.usefixtures('mecs_tree')
+
+
+def make_map(seed, mobiles=20):
+    from mecs import scheduler
+    from mecs.id_provider import reset_ids
+    from mecs.wholemap import WholeMap
+
+    # server uuid가 log key로 들어가므로 두 map의 id를 맞춤
+    reset_ids()
+    my_map = WholeMap(300, 300, 0.003, 0.00001, seed=seed)
+    my_map.add_server(150, 150, 30000, scheduler.RRScheduler().schedule)
+    my_map.add_mobiles(0, mobiles)
+    return my_map
+
+
+def run(caplog, simulate):
+    caplog.clear()
+    log = simulate()
+    return log, [record.getMessage() for record in caplog.records]
+
+
+# 같은 seed면 simulate_until이 simulate_one_time을 tick마다 부른 것과 마지막 log, log line이 같아야 함
+@pytest.mark.parametrize('seed', [0, 1])
+def test_simulate_until_matches_tick_loop(caplog, seed):
+    caplog.set_level(logging.INFO)
+    end_time = 3000
+
+    def tick_loop():
+        my_map = make_map(seed)
+        for t in range(end_time):
+            log = my_map.simulate_one_time(t)
+        return log
+
+    def event_loop():
+        return make_map(seed).simulate_until(end_time)
+
+    def mixed_loop():
+        # event 방식을 나눠서 부르고 중간에 tick 방식을 섞어도 같아야 함
+        my_map = make_map(seed)
+        my_map.simulate_until(700)
+        for t in range(700, 1000):
+            my_map.simulate_one_time(t)
+        my_map.simulate_until(2000)
+        return my_map.simulate_until(end_time)
+
+    expected, expected_lines = run(caplog, tick_loop)
+    for simulate in (event_loop, mixed_loop):
+        log, lines = run(caplog, simulate)
+        assert log == expected
+        assert lines == expected_lines